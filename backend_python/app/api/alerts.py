@@ -0,0 +1,75 @@
+"""
+Alerts API
+รายการใบอนุญาต / สัญญาที่ใกล้หมดอายุสำหรับหน้า Dashboard
+"""
+from datetime import date, timedelta
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import Optional
+
+from app.database import get_db
+from app.models.user import User
+from app.models.alert import Alert
+from app.core.deps import get_current_active_user, require_role
+from app.core.cache import make_etag, etag_matches
+from app.core.expiry_alerts import ALERT_SOURCES, ALERT_WINDOW_DAYS
+from app.core.periodic import periodic_jobs
+from app.core.serialization import dumps
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_alerts(  # type: ignore
+    type: Optional[str] = Query(None, description="license_expiry / contract_end"),
+    days: int = Query(ALERT_WINDOW_DAYS, ge=0, le=ALERT_WINDOW_DAYS, description="หมดอายุภายในกี่วัน"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    รายการที่หมดอายุแล้วหรือจะหมดอายุภายใน days วัน เรียงตามวันหมดอายุ
+
+    Response: {"refreshedAt": "...", "alerts": [
+        {"type": "license_expiry", "entity": "guards", "entityId": 12, "code": "PG-0012",
+         "name": "นายสมชาย ใจดี", "expiresOn": "2025-02-01", "daysLeft": 5}
+    ]}
+    """
+    if type is not None and type not in ALERT_SOURCES:
+        raise HTTPException(status_code=400, detail=f"ไม่รู้จักประเภทการแจ้งเตือน: {type}")
+
+    today = date.today()
+    query = (
+        select(Alert.type, Alert.entity, Alert.entityId, Alert.code, Alert.name, Alert.expiresOn)
+        .where(Alert.expiresOn <= today + timedelta(days=days))
+        .order_by(Alert.expiresOn, Alert.id)
+    )
+    if type is not None:
+        query = query.where(Alert.type == type)
+    rows = (await db.execute(query)).all()
+    refreshed_at = (await db.execute(select(func.max(Alert.refreshedAt)))).scalar()
+
+    body = dumps({
+        "refreshedAt": refreshed_at,
+        "alerts": [
+            {**r._mapping, "daysLeft": (r.expiresOn - today).days}
+            for r in rows
+        ]
+    })
+    etag = make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/refresh", dependencies=[Depends(require_role("Admin"))])
+async def refresh_alerts_now():  # type: ignore
+    """คำนวณรายการแจ้งเตือนใหม่ทันที (ปกติรันอัตโนมัติทุกชั่วโมง)"""
+    counts = await periodic_jobs.run_now("expiry_alerts")
+    if counts is None:
+        raise HTTPException(status_code=409, detail="กำลังคำนวณการแจ้งเตือนอยู่ กรุณาลองใหม่ภายหลัง")
+    return {"counts": counts}
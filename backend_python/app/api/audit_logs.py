@@ -1,16 +1,19 @@
 from fastapi import APIRouter, HTTPException, Depends, Request  # type: ignore
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
-from sqlalchemy import select, desc, func  # type: ignore
+from sqlalchemy import select, desc, func, insert  # type: ignore
 from datetime import datetime, timedelta
 from app.schemas.audit_log import AuditLogResponse, AuditLogCreate
 from app.core.deps import get_current_active_user
 from app.database import get_db
 from app.models.audit_log import AuditLog
 from app.models.user import User
+from app.core.serialization import RowSerializer, wants_ndjson, stream_ndjson
 
 router = APIRouter()
 
+audit_log_serializer = RowSerializer(AuditLogResponse)
+
 
 async def create_audit_log(
     db: AsyncSession,
@@ -46,8 +49,23 @@ async def create_audit_log(
     return log
 
 
+async def create_audit_logs(db: AsyncSession, current_user: User, entries: List[dict]) -> None:  # type: ignore
+    """
+    Bulk insert หลายรายการในคำสั่งเดียว (ไม่ commit - ใช้ transaction เดียวกับการแก้ไข)
+
+    entries: dict ที่มี action, entityType, entityId, entityName, description, oldData, newData, changes
+    """
+    if not entries:
+        return
+    await db.execute(
+        insert(AuditLog),
+        [{**entry, "userId": current_user.id, "username": current_user.username} for entry in entries]
+    )
+
+
 @router.get("/logs", response_model=List[AuditLogResponse])
 async def get_audit_logs(
+    request: Request,
     entity_type: Optional[str] = None,
     action: Optional[str] = None,
     user_id: Optional[int] = None,
@@ -56,7 +74,7 @@ async def get_audit_logs(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get audit logs with filters"""
+    """Get audit logs with filters (Accept: application/x-ndjson -> stream ทั้งหมดโดยไม่ใช้ limit)"""
     query = select(AuditLog)
     
     # Filter by date (last N days)
@@ -72,7 +90,14 @@ async def get_audit_logs(
         query = query.where(AuditLog.userId == user_id)
     
     # Order by latest first and limit
-    query = query.order_by(desc(AuditLog.createdAt)).limit(limit)
+    query = query.order_by(desc(AuditLog.createdAt))
+    if wants_ndjson(request):
+        return await stream_ndjson(
+            db,
+            query.with_only_columns(*audit_log_serializer.columns(AuditLog)),
+            audit_log_serializer.to_dicts
+        )
+    query = query.limit(limit)
     
     result = await db.execute(query)
     logs = result.scalars().all()
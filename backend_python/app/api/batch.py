@@ -0,0 +1,36 @@
+"""
+Batch API
+รวม GET หลายรายการ (เช่นข้อมูลทั้งหมดที่ SiteFormModal ต้องใช้) ไว้ใน HTTP request เดียว
+"""
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.core.deps import get_current_active_user
+from app.core.batch import BatchContext, run_batch
+from app.schemas.batch import BatchRequest
+
+
+router = APIRouter()
+
+
+@router.post("")
+async def batch(  # type: ignore
+    batch_request: BatchRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    รัน sub-request แบบ GET ผ่าน router เดิม - ยืนยันตัวตนครั้งเดียว ใช้ session เดียวกัน
+
+    Body: {"requests": [{"id": "site", "path": "/api/sites/1"},
+                        {"id": "shifts", "path": "/api/shifts"}]}
+    Response: {"responses": [{"id": "site", "status": 200, "headers": {}, "body": {...}}, ...]}
+    (sub-request ที่ผิดพลาดคืน status / body ของตัวเอง ไม่ทำให้ทั้ง batch ล้มเหลว)
+    """
+    context = BatchContext(current_user, db)
+    content = await run_batch(request.app, request.scope, context, batch_request.requests)
+    return Response(content=content, media_type="application/json")
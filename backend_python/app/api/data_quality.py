@@ -0,0 +1,98 @@
+"""
+Data Quality API
+สแกนและดูรายการปัญหาคุณภาพข้อมูลของพนักงาน รปภ. และพนักงาน
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import Optional
+
+from app.database import get_db
+from app.models.user import User
+from app.models.data_quality import DataQualityIssue, DataQualityScan
+from app.core.deps import get_current_active_user, require_role
+from app.core.data_quality import run_scan
+from app.core.serialization import FastJSONResponse
+
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 1000
+
+
+@router.post("/scan", dependencies=[Depends(require_role("Admin"))])
+async def scan_data_quality(  # type: ignore
+    full: bool = Query(False, description="true = สแกนทั้งหมด, false = เฉพาะที่เปลี่ยนหลังการสแกนครั้งก่อน"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    สแกนข้อมูลและแทนที่รายการปัญหาของแถวที่สแกน
+
+    Response: {"mode": "incremental", "watermark": 1234, "banksChanged": false, "entities": {"guards": {"scanned": 3, "issues": 1}, ...}}
+    """
+    summary = await run_scan(db, incremental=not full)
+    if summary is None:
+        raise HTTPException(status_code=409, detail="กำลังสแกนข้อมูลอยู่ กรุณาลองใหม่ภายหลัง")
+    return summary
+
+
+@router.get("/summary")
+async def get_data_quality_summary(  # type: ignore
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """จำนวนปัญหาแยกตาม entity / rule และการสแกนล่าสุด"""
+    result = await db.execute(
+        select(DataQualityIssue.entity, DataQualityIssue.rule, func.count())
+        .group_by(DataQualityIssue.entity, DataQualityIssue.rule)
+        .order_by(DataQualityIssue.entity, DataQualityIssue.rule)
+    )
+    counts: dict = {}
+    for entity, rule, count in result.all():
+        counts.setdefault(entity, {})[rule] = count
+
+    last = (await db.execute(
+        select(DataQualityScan).order_by(DataQualityScan.id.desc()).limit(1)
+    )).scalar_one_or_none()
+    return {
+        "counts": counts,
+        "lastScan": None if last is None else {
+            "mode": last.mode,
+            "scanned": last.scanned,
+            "issues": last.issues,
+            "startedAt": last.startedAt,
+            "finishedAt": last.finishedAt,
+        }
+    }
+
+
+@router.get("/issues")
+async def get_data_quality_issues(  # type: ignore
+    entity: Optional[str] = Query(None, description="guards / staff"),
+    rule: Optional[str] = Query(None, description="id_card_invalid, phone_invalid, bank_code_unknown, license_expired"),
+    entity_id: Optional[int] = Query(None, alias="entityId"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="id สุดท้ายของหน้าก่อน (จาก header X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """รายการปัญหา กรองตาม entity / rule / entityId - หน้าถัดไปใน header X-Next-Cursor"""
+    query = select(
+        DataQualityIssue.id, DataQualityIssue.entity, DataQualityIssue.entityId, DataQualityIssue.code,
+        DataQualityIssue.rule, DataQualityIssue.field, DataQualityIssue.value, DataQualityIssue.message,
+        DataQualityIssue.detectedAt
+    ).order_by(DataQualityIssue.id).limit(limit)
+    if entity:
+        query = query.where(DataQualityIssue.entity == entity)
+    if rule:
+        query = query.where(DataQualityIssue.rule == rule)
+    if entity_id is not None:
+        query = query.where(DataQualityIssue.entityId == entity_id)
+    if cursor is not None:
+        query = query.where(DataQualityIssue.id > cursor)
+
+    rows = [dict(r._mapping) for r in (await db.execute(query)).all()]
+    result = FastJSONResponse(rows)
+    if len(rows) == limit:
+        result.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return result
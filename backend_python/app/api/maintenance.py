@@ -0,0 +1,38 @@
+"""
+Maintenance API
+สถานะและการสั่งงานของ background job ดูแลข้อมูล
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.core.deps import get_current_active_user, require_role
+from app.core.denormalized import consistency_checker
+from app.core.periodic import periodic_jobs
+
+
+router = APIRouter()
+
+
+@router.get("/jobs")
+async def get_periodic_jobs(  # type: ignore
+    current_user: User = Depends(get_current_active_user)
+):
+    """งานที่รันเป็นรอบและสถิติของ worker นี้ (runs = รันจริง, skipped = worker อื่นถือ lock)"""
+    return periodic_jobs.stats()
+
+
+@router.get("/denormalized")
+async def get_denormalized_status(  # type: ignore
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """สถานะตัวตรวจชื่อที่คัดลอกไว้ (ตำแหน่งที่ตรวจถึง / จำนวนแถวที่ซ่อม / จำนวนรอบที่ตรวจครบ) - ใช้ร่วมกันทุก worker"""
+    return await consistency_checker.stats(db)
+
+
+@router.post("/denormalized/check", dependencies=[Depends(require_role("Admin"))])
+async def check_denormalized():  # type: ignore
+    """ตรวจและซ่อมชื่อที่คัดลอกไว้ทั้งตาราง (เช่นหลังแก้ไขข้อมูลผ่าน SQL โดยตรง)"""
+    return {"repaired": await consistency_checker.check_all()}
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File # type: ignore
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request, Query # type: ignore
 from fastapi.responses import FileResponse
 import pandas as pd
 from io import BytesIO
 import os
 import re
-from typing import List
+from typing import Any, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, or_
+from fastapi.encoders import jsonable_encoder
 from app.schemas.master_data import (
     CustomerCreate, CustomerUpdate, CustomerResponse,
     SiteCreate, SiteUpdate, SiteResponse,
@@ -15,7 +16,9 @@ from app.schemas.master_data import (
     BankCreate, BankUpdate, BankResponse,
     ProductCreate, ProductUpdate, ProductResponse,
     ServiceCreate, ServiceUpdate, ServiceResponse,
-    ShiftCreate, ShiftUpdate, ShiftResponse
+    ShiftCreate, ShiftUpdate, ShiftResponse,
+    EmploymentDetail, ShiftAssignment, ContractedService,
+    GuardBatchUpdate, StaffBatchUpdate, BatchUpdateResponse
 )
 from app.core.deps import get_current_active_user
 from app.database import get_db
@@ -29,12 +32,159 @@ from app.models.product import Product
 from app.models.service import Service
 from app.models.shift import Shift
 from app.models.schedule import Schedule
-from app.api.audit_logs import create_audit_log
+from app.api.audit_logs import create_audit_log, create_audit_logs
+from app.core.schedule_codec import shift_entry_counts
+from app.core.schedule_events import publish_guards_changed, publish_shifts_changed
+from app.core.schedule_conflicts import retime_shift
+from app.core.denormalized import schedule_propagation
+from app.core.file_store import receive_upload, store_upload, file_response
+from app.core.previews import schedule_preview, get_preview, preview_paths
+from app.core.reference_data import reference_cache, bump_reference_version
+from app.core.serialization import (
+    RowSerializer, FastJSONResponse, json_list, optional_str, wants_ndjson, stream_ndjson
+)
 import json
 
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 5000
+
+# List endpoints serialize rows straight to JSON (ไม่ validate ซ้ำกับ response_model)
+customer_serializer = RowSerializer(CustomerResponse, {"id": str})
+site_serializer = RowSerializer(SiteResponse, {
+    "id": str,
+    "customerId": optional_str,
+    "employmentDetails": json_list(EmploymentDetail),
+    "shiftAssignments": json_list(ShiftAssignment),
+    "contractedServices": json_list(ContractedService),
+})
+guard_serializer = RowSerializer(GuardResponse, {"id": str})
+staff_serializer = RowSerializer(StaffResponse, {"id": str})
+
+
+def _select_fields(serializer: RowSerializer, fields: Optional[str]) -> RowSerializer:
+    """?fields= -> serializer เฉพาะฟิลด์ที่ขอ (400 ถ้ามีฟิลด์ที่ไม่อนุญาต)"""
+    try:
+        return serializer.only(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"ไม่รู้จักฟิลด์: {exc}")
+
+
+async def _list_response(
+    request: Request,
+    db: AsyncSession,
+    model: Any,
+    serializer: RowSerializer,
+    limit: Optional[int],
+    cursor: Optional[int]
+):
+    """
+    รายการเรียงตาม id - SELECT เฉพาะคอลัมน์ของ serializer
+    limit/cursor: แบ่งหน้าแบบ keyset (หน้าถัดไปใน header X-Next-Cursor), ไม่ระบุ = ทั้งหมด
+    """
+    query = select(*serializer.columns(model)).order_by(model.id)
+    if cursor is not None:
+        query = query.where(model.id > cursor)
+    if wants_ndjson(request):
+        return await stream_ndjson(db, query, serializer.to_dicts)
+    if limit is None:
+        result = await db.execute(query)
+        return serializer.response(result.all())
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    response = serializer.response(rows[:limit])
+    if len(rows) > limit:
+        response.headers["X-Next-Cursor"] = str(rows[limit - 1].id)
+    return response
+
+
+async def _detail_response(
+    db: AsyncSession,
+    model: Any,
+    serializer: RowSerializer,
+    record_id: int,
+    not_found: str
+):
+    """รายการเดียวแบบ sparse fieldset (?fields=)"""
+    result = await db.execute(select(*serializer.columns(model)).where(model.id == record_id))
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return FastJSONResponse(serializer.to_dicts([row])[0])
+
+
+async def _batch_update(
+    db: AsyncSession,
+    current_user: User,
+    model: Any,
+    code_field: str,
+    entity_type: str,
+    label: str,
+    batch: GuardBatchUpdate
+) -> dict:
+    """
+    แก้ไขหลายแถวด้วย UPDATE ... FROM (ค่าเดิม) ... RETURNING คำสั่งเดียว
+    และบันทึก audit log ทุกแถวด้วย bulk insert - commit ครั้งเดียว
+    แถวที่ค่าเหมือนเดิมอยู่แล้วไม่ถูกแก้ไข (ไม่มี audit log)
+    """
+    values = batch.changes.model_dump(exclude_unset=True)
+    if values.get("bankCode"):
+        bank = await db.execute(select(Bank.id).where(Bank.code == values["bankCode"]))
+        if bank.scalar_one_or_none() is None:
+            raise HTTPException(status_code=400, detail=f"ไม่พบรหัสธนาคาร: {values['bankCode']}")
+
+    conditions = []
+    if batch.ids is not None:
+        try:
+            conditions.append(model.id.in_([int(i) for i in batch.ids]))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ID")
+    else:
+        for field, value in batch.filter.model_dump(exclude_unset=True).items():  # type: ignore[union-attr]
+            conditions.append(getattr(model, field) == value)
+    # ข้ามแถวที่ค่าเหมือนเดิมทุกฟิลด์
+    conditions.append(or_(*[getattr(model, field).is_distinct_from(value) for field, value in values.items()]))
+
+    # ค่าเดิม (lock แถวไว้จนจบ transaction) สำหรับ audit log
+    old = (
+        select(model.id, *[getattr(model, field) for field in values])
+        .where(*conditions)
+        .with_for_update()
+        .subquery("old")
+    )
+    code_column = getattr(model, code_field)
+    result = await db.execute(
+        update(model)
+        .where(model.id == old.c.id)
+        .values(**values)
+        .returning(
+            model.id, code_column, model.title, model.firstName, model.lastName,
+            *[old.c[field].label(f"old_{field}") for field in values]
+        )
+    )
+    rows = result.all()
+
+    fields = list(values)
+    await create_audit_logs(db, current_user, [
+        {
+            "action": "UPDATE",
+            "entityType": entity_type,
+            "entityId": getattr(r, code_field),
+            "entityName": f"{getattr(r, code_field)} - {r.title or ''}{r.firstName} {r.lastName}",
+            "description": f"แก้ไขข้อมูล{label}แบบกลุ่ม: {getattr(r, code_field)} - {r.title or ''}{r.firstName} {r.lastName}",
+            "oldData": jsonable_encoder({field: getattr(r, f"old_{field}") for field in fields}),
+            "newData": jsonable_encoder(values),
+            "changes": fields,
+        }
+        for r in rows
+    ])
+    if rows and model is Guard:
+        await publish_guards_changed(db)
+    await db.commit()
+    return {"updated": len(rows), "ids": [str(r.id) for r in rows]}
+
 
 # ========== CUSTOMER ENDPOINTS ==========
 
@@ -105,35 +255,16 @@ async def download_site_template(
 
 @router.get("/customers", response_model=List[CustomerResponse])
 async def get_customers(  # type: ignore
+    request: Request,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์ เช่น id,code,name,isActive"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="id สุดท้ายของหน้าก่อน (จาก X-Next-Cursor)"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all customers"""
-    result = await db.execute(select(Customer).order_by(Customer.id))
-    customers = result.scalars().all()
-    
-    return [
-        {
-            "id": str(c.id),
-            "code": c.code,
-            "businessType": c.businessType if hasattr(c, 'businessType') else None,
-            "name": c.name,
-            "taxId": c.taxId if hasattr(c, 'taxId') else None,
-            "address": c.address,
-            "subDistrict": c.subDistrict if hasattr(c, 'subDistrict') else None,
-            "district": c.district if hasattr(c, 'district') else None,
-            "province": c.province if hasattr(c, 'province') else None,
-            "postalCode": c.postalCode if hasattr(c, 'postalCode') else None,
-            "contactPerson": c.contactPerson,
-            "phone": c.phone,
-            "email": c.email,
-            "secondaryContact": c.secondaryContact if hasattr(c, 'secondaryContact') else None,
-            "paymentTerms": c.paymentTerms if hasattr(c, 'paymentTerms') else None,
-            "isActive": c.isActive,
-            "createdAt": c.createdAt
-        }
-        for c in customers
-    ] # type: ignore
+    """Get all customers (Accept: application/x-ndjson -> stream ทีละแถว)"""
+    serializer = _select_fields(customer_serializer, fields)
+    return await _list_response(request, db, Customer, serializer, limit, cursor)
 
 
 @router.post("/customers", response_model=CustomerResponse)
@@ -212,6 +343,7 @@ async def create_customer( # type: ignore
 @router.get("/customers/{customer_id}", response_model=CustomerResponse)
 async def get_customer(  # type: ignore
     customer_id: str,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -221,6 +353,9 @@ async def get_customer(  # type: ignore
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid customer ID")
         
+    if fields:
+        return await _detail_response(db, Customer, _select_fields(customer_serializer, fields), cid, "Customer not found")
+        
     result = await db.execute(select(Customer).where(Customer.id == cid))
     customer = result.scalar_one_or_none()
     
@@ -334,6 +469,8 @@ async def update_customer(  # type: ignore
         
     await db.commit()
     await db.refresh(customer)
+    # อัปเดตรหัส/ชื่อลูกค้าที่คัดลอกไว้ในหน่วยงาน (background)
+    schedule_propagation("customers", [customer.id], changes)  # type: ignore[list-item]
     
     # Create audit log if there are changes
     if changes:
@@ -849,47 +986,16 @@ async def import_sites_from_excel(
 
 @router.get("/sites", response_model=List[SiteResponse])
 async def get_sites(  # type: ignore
+    request: Request,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์ เช่น id,siteCode,name,customerId,isActive"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="id สุดท้ายของหน้าก่อน (จาก X-Next-Cursor)"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all sites"""
-    result = await db.execute(select(Site).order_by(Site.id))
-    sites = result.scalars().all()
-    
-    # Get customers for mapping
-    customers_result = await db.execute(select(Customer))
-    customers = customers_result.scalars().all()
-    customer_map = {c.id: c for c in customers}
-    
-    result_list = []
-    for site in sites:
-        customer = customer_map.get(site.customerId)
-        result_list.append({ # type: ignore
-            "id": str(site.id),
-            "siteCode": site.siteCode if hasattr(site, 'siteCode') else "",
-            "name": site.name,
-            "customerId": str(site.customerId) if site.customerId else "",  # type: ignore[arg-type]
-            "customerCode": site.customerCode if hasattr(site, 'customerCode') else (customer.code if customer else None),
-            "customerName": site.customerName if hasattr(site, 'customerName') else (customer.name if customer else None),
-            "contractStartDate": site.contractStartDate.isoformat() if hasattr(site, 'contractStartDate') and site.contractStartDate else None,  # type: ignore[arg-type]
-            "contractEndDate": site.contractEndDate.isoformat() if hasattr(site, 'contractEndDate') and site.contractEndDate else None,  # type: ignore[arg-type]
-            "contractFilePath": site.contractFilePath if hasattr(site, 'contractFilePath') else None,
-            "contractFileName": site.contractFileName if hasattr(site, 'contractFileName') else None,
-            "address": site.address,
-            "subDistrict": site.subDistrict if hasattr(site, 'subDistrict') else None,
-            "district": site.district if hasattr(site, 'district') else None,
-            "province": site.province if hasattr(site, 'province') else None,
-            "postalCode": site.postalCode if hasattr(site, 'postalCode') else None,
-            "contactPerson": site.contactPerson,
-            "phone": site.phone,
-            "employmentDetails": json.loads(site.employmentDetails) if hasattr(site, 'employmentDetails') and site.employmentDetails else [],  # type: ignore[arg-type]
-            "shiftAssignments": json.loads(site.shiftAssignments) if hasattr(site, 'shiftAssignments') and site.shiftAssignments else [],  # type: ignore[arg-type]
-            "contractedServices": json.loads(site.contractedServices) if site.contractedServices else [],  # type: ignore[arg-type]
-            "isActive": site.isActive,
-            "createdAt": site.createdAt
-        })
-    
-    return result_list # type: ignore
+    """Get all sites (Accept: application/x-ndjson -> stream ทีละแถว)"""
+    serializer = _select_fields(site_serializer, fields)
+    return await _list_response(request, db, Site, serializer, limit, cursor)
 
 
 @router.get("/sites/next-code/{customer_id}")
@@ -1038,6 +1144,7 @@ async def create_site(  # type: ignore
 @router.get("/sites/{site_id}", response_model=SiteResponse)
 async def get_site( # type: ignore
     site_id: str,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -1047,6 +1154,9 @@ async def get_site( # type: ignore
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid site ID")
         
+    if fields:
+        return await _detail_response(db, Site, _select_fields(site_serializer, fields), sid, "Site not found")
+        
     result = await db.execute(select(Site).where(Site.id == sid))
     site = result.scalar_one_or_none()
     
@@ -1103,9 +1213,8 @@ async def check_site_has_schedule(
     for schedule in schedules:
         if schedule.shifts:
             try:
-                shifts_data = json.loads(schedule.shifts)
-                for shift_code, guards in shifts_data.items():
-                    if guards and len(guards) > 0:
+                for shift_code, count in shift_entry_counts(json.loads(schedule.shifts)).items():
+                    if count > 0:
                         shifts_with_guards.add(shift_code)
             except:
                 pass
@@ -1238,6 +1347,8 @@ async def update_site(  # type: ignore
         
     await db.commit()
     await db.refresh(site)
+    # อัปเดตชื่อหน่วยงานที่คัดลอกไว้ในตารางงาน (background)
+    schedule_propagation("sites", [site.id], changes)  # type: ignore[list-item]
     
     # Get customer info before audit log
     result = await db.execute(select(Customer).where(Customer.id == site.customerId))
@@ -1366,61 +1477,58 @@ async def delete_site(
 
 # ========== SITE CONTRACT FILE ENDPOINTS ==========
 
-UPLOAD_DIR = "uploads/contracts"
+CONTRACT_FILE_EXTENSIONS = ['.pdf', '.doc', '.docx', '.jpg', '.jpeg', '.png']
 
 @router.post("/sites/{site_id}/contract-file")
 async def upload_contract_file(
     site_id: str,
-    file: UploadFile = File(...),
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Upload contract file for a site"""
+    """
+    Upload contract file for a site (multipart field "file", สูงสุด 50 MB)
+    ไฟล์เก็บตาม SHA-256 ของเนื้อหา - ไฟล์เดิมถูกลบโดยงาน contract_file_gc เมื่อไม่มีหน่วยงานใดใช้
+    """
     try:
         sid = int(site_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid site ID")
-    
-    result = await db.execute(select(Site).where(Site.id == sid))
-    site = result.scalar_one_or_none()
-    
-    if not site:
-        raise HTTPException(status_code=404, detail="Site not found")
-    
+
+    # คืน connection (transaction จากการตรวจผู้ใช้) ให้ pool ก่อนรับไฟล์ - client ที่ส่งช้า
+    # จะไม่ถือ connection ค้างแบบ idle in transaction ระหว่างอัปโหลด
+    await db.close()
+
+    file = await receive_upload(request)
+
     # Validate file type
-    allowed_extensions = ['.pdf', '.doc', '.docx', '.jpg', '.jpeg', '.png']
     file_ext = os.path.splitext(file.filename)[1].lower() if file.filename else ''
     
-    if file_ext not in allowed_extensions:
+    if file_ext not in CONTRACT_FILE_EXTENSIONS:
+        await file.close()
         raise HTTPException(
             status_code=400, 
-            detail=f"ไฟล์ไม่ถูกต้อง กรุณาอัปโหลดไฟล์ประเภท: {', '.join(allowed_extensions)}"
+            detail=f"ไฟล์ไม่ถูกต้อง กรุณาอัปโหลดไฟล์ประเภท: {', '.join(CONTRACT_FILE_EXTENSIONS)}"
         )
     
-    # Create upload directory if not exists
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    # Delete old file if exists
-    if site.contractFilePath and os.path.exists(site.contractFilePath):
-        try:
-            os.remove(site.contractFilePath)
-        except Exception:
-            pass  # Ignore error if file doesn't exist
-    
-    # Generate unique filename
-    import uuid
-    unique_filename = f"{site.siteCode}_{uuid.uuid4().hex[:8]}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    # Save file (ไฟล์เดิมไม่ลบทันที - หน่วยงานอื่นอาจใช้เอกสารเดียวกัน)
+    stored = await store_upload(file)
+    file_path = stored.path
+
+    # ไม่พบหน่วยงาน - ไฟล์ที่เพิ่งเก็บถูกลบโดยงาน contract_file_gc
+    result = await db.execute(select(Site).where(Site.id == sid))
+    site = result.scalar_one_or_none()
     
-    # Save file
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    if not site:
+        raise HTTPException(status_code=404, detail="Site not found")
     
     # Update database
     site.contractFilePath = file_path
     site.contractFileName = file.filename
     await db.commit()
+
+    # ภาพตัวอย่าง + จำนวนหน้า (background)
+    schedule_preview(file_path, file.filename)
     
     # Audit log
     await create_audit_log(
@@ -1444,17 +1552,23 @@ async def upload_contract_file(
 @router.get("/sites/{site_id}/contract-file")
 async def download_contract_file(
     site_id: str,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Download contract file for a site"""
+    """
+    Download contract file for a site
+    รองรับ Range (เปิด PDF ทีละส่วน), ETag = SHA-256 ของเนื้อหา และ 304 เมื่อไฟล์ไม่เปลี่ยน
+    """
     try:
         sid = int(site_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid site ID")
     
-    result = await db.execute(select(Site).where(Site.id == sid))
-    site = result.scalar_one_or_none()
+    result = await db.execute(
+        select(Site.contractFilePath, Site.contractFileName).where(Site.id == sid)
+    )
+    site = result.one_or_none()
     
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
@@ -1462,13 +1576,51 @@ async def download_contract_file(
     if not site.contractFilePath:
         raise HTTPException(status_code=404, detail="ไม่พบเอกสารสัญญา")
     
-    if not os.path.exists(site.contractFilePath):
-        raise HTTPException(status_code=404, detail="ไฟล์เอกสารไม่พบในระบบ")
-    
-    return FileResponse(
-        path=site.contractFilePath,
-        filename=site.contractFileName or "contract_file",
-        media_type="application/octet-stream"
+    return await file_response(request, site.contractFilePath, site.contractFileName)
+
+
+@router.get("/sites/{site_id}/contract-file/preview")
+async def get_contract_file_preview(
+    site_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ภาพตัวอย่างหน้าแรกของเอกสารสัญญา (JPEG) - จำนวนหน้าอยู่ใน header X-Page-Count
+    ยังสร้างไม่เสร็จ -> 202 (ลองใหม่ตาม Retry-After)
+    """
+    try:
+        sid = int(site_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid site ID")
+
+    result = await db.execute(
+        select(Site.contractFilePath, Site.contractFileName).where(Site.id == sid)
+    )
+    site = result.one_or_none()
+
+    if not site:
+        raise HTTPException(status_code=404, detail="Site not found")
+
+    if not site.contractFilePath:
+        raise HTTPException(status_code=404, detail="ไม่พบเอกสารสัญญา")
+
+    status, meta = await get_preview(site.contractFilePath, site.contractFileName)
+    if status == "unsupported":
+        raise HTTPException(status_code=404, detail="ไม่มีภาพตัวอย่างสำหรับไฟล์ประเภทนี้")
+    if status == "failed":
+        raise HTTPException(status_code=422, detail=f"สร้างภาพตัวอย่างไม่สำเร็จ: {meta['error']}")  # type: ignore[index]
+    if status == "pending":
+        return FastJSONResponse({"status": "pending"}, status_code=202, headers={"Retry-After": "1"})
+
+    sha256 = os.path.basename(site.contractFilePath)
+    return await file_response(
+        request,
+        preview_paths(sha256)[0],
+        "preview.jpg",
+        etag=f'"{sha256}-preview"',
+        extra_headers={"X-Page-Count": str(meta["pageCount"])}  # type: ignore[index]
     )
 
 
@@ -1495,14 +1647,7 @@ async def delete_contract_file(
     
     old_filename = site.contractFileName
     
-    # Delete physical file
-    if os.path.exists(site.contractFilePath):
-        try:
-            os.remove(site.contractFilePath)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"ไม่สามารถลบไฟล์ได้: {str(e)}")
-    
-    # Update database
+    # Update database (ไฟล์ที่ไม่มีหน่วยงานใดใช้แล้วถูกลบโดยงาน contract_file_gc)
     site.contractFilePath = None
     site.contractFileName = None
     await db.commit()
@@ -1526,58 +1671,16 @@ async def delete_contract_file(
 
 @router.get("/guards", response_model=List[GuardResponse])
 async def get_guards(  # type: ignore
+    request: Request,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์ เช่น id,guardId,firstName,lastName,isActive"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="id สุดท้ายของหน้าก่อน (จาก X-Next-Cursor)"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all guards"""
-    result = await db.execute(select(Guard).order_by(Guard.id))
-    guards = result.scalars().all()
-    
-    return [
-        {
-            "id": str(g.id),
-            "guardId": g.guardId,
-            # Personal Information
-            "title": g.title,
-            "firstName": g.firstName,
-            "lastName": g.lastName,
-            "birthDate": g.birthDate,
-            "nationality": g.nationality,
-            "religion": g.religion,
-            "idCardNumber": g.idCardNumber,
-            # Addresses
-            "addressIdCard": g.addressIdCard,
-            "addressCurrent": g.addressCurrent,
-            "phone": g.phone,
-            # Education & License
-            "education": g.education,
-            "licenseNumber": g.licenseNumber,
-            "licenseExpiry": g.licenseExpiry,
-            # Employment
-            "startDate": g.startDate,
-            "isActive": g.isActive,
-            # Banking
-            "bankAccountName": g.bankAccountName,
-            "bankAccountNo": g.bankAccountNo,
-            "bankCode": g.bankCode,
-            # Family Status
-            "maritalStatus": g.maritalStatus,
-            "spouseName": g.spouseName,
-            # Emergency Contact
-            "emergencyContactName": g.emergencyContactName,
-            "emergencyContactPhone": g.emergencyContactPhone,
-            "emergencyContactRelation": g.emergencyContactRelation,
-            # Legacy fields
-            "address": g.address,
-            "position": g.position,
-            "department": g.department,
-            "salary": g.salary,
-            "salaryType": g.salaryType,
-            "paymentMethod": g.paymentMethod,
-            "createdAt": g.createdAt
-        }
-        for g in guards
-    ] # type: ignore
+    """Get all guards (Accept: application/x-ndjson -> stream ทีละแถว)"""
+    serializer = _select_fields(guard_serializer, fields)
+    return await _list_response(request, db, Guard, serializer, limit, cursor)
 
 
 @router.post("/guards", response_model=GuardResponse)
@@ -1726,6 +1829,7 @@ async def create_guard( # type: ignore
 @router.get("/guards/{guard_id}", response_model=GuardResponse)
 async def get_guard(  # type: ignore
     guard_id: str,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -1735,6 +1839,9 @@ async def get_guard(  # type: ignore
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid guard ID")
         
+    if fields:
+        return await _detail_response(db, Guard, _select_fields(guard_serializer, fields), gid, "Guard not found")
+        
     result = await db.execute(select(Guard).where(Guard.id == gid))
     guard = result.scalar_one_or_none()
     
@@ -1785,6 +1892,21 @@ async def get_guard(  # type: ignore
     }
 
 
+@router.patch("/guards/batch", response_model=BatchUpdateResponse)
+async def batch_update_guards(  # type: ignore
+    batch: GuardBatchUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    แก้ไขพนักงาน รปภ. หลายคนพร้อมกัน (เช่นปิดการใช้งานหลังสิ้นสุดสัญญา, เปลี่ยนธนาคาร)
+
+    Body: {"ids": ["1", "2"]} หรือ {"filter": {"bankCode": "KTB", "isActive": true}}
+          + {"changes": {"bankCode": "SCB"}}
+    """
+    return await _batch_update(db, current_user, Guard, "guardId", "guards", "พนักงาน", batch)
+
+
 @router.put("/guards/{guard_id}", response_model=GuardResponse)
 async def update_guard(  # type: ignore
     guard_id: str,
@@ -1928,9 +2050,13 @@ async def update_guard(  # type: ignore
         guard.salaryType = guard_data.salaryType  # type: ignore[assignment]
     if guard_data.paymentMethod is not None:
         guard.paymentMethod = guard_data.paymentMethod  # type: ignore[assignment]
-        
+    
+    # ชื่อพนักงานในตารางงานดึงจากตาราง guards - แจ้ง cache ของทุก worker
+    await publish_guards_changed(db)
     await db.commit()
     await db.refresh(guard)
+    # อัปเดตชื่อพนักงานที่คัดลอกไว้ใน schedule_guards (background)
+    schedule_propagation("guards", [guard.id], changes)  # type: ignore[list-item]
     
     # Create audit log for all updates (with detailed tracking)
     await create_audit_log(
@@ -2045,6 +2171,7 @@ async def delete_guard(
     }
         
     await db.delete(guard)
+    await publish_guards_changed(db)
     await db.commit()
     
     # Create audit log
@@ -2066,38 +2193,17 @@ async def delete_guard(
 
 @router.get("/staff", response_model=List[StaffResponse])
 async def get_staff(  # type: ignore
+    request: Request,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์ เช่น id,staffId,firstName,lastName,isActive"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="id สุดท้ายของหน้าก่อน (จาก X-Next-Cursor)"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all staff"""
-    result = await db.execute(select(Staff).order_by(Staff.id))
-    staff_list = result.scalars().all()
-    return [
-        {
-            "id": str(s.id),
-            "staffId": s.staffId,
-            "title": s.title,
-            "firstName": s.firstName,
-            "lastName": s.lastName,
-            "idCardNumber": s.idCardNumber,
-            "birthDate": s.birthDate,
-            "phone": s.phone,
-            "email": s.email,
-            "address": s.address,
-            "position": s.position,
-            "department": s.department,
-            "startDate": s.startDate,
-            "salary": s.salary,
-            "bankAccountNo": s.bankAccountNo,
-            "bankCode": s.bankCode,
-            "emergencyContactName": s.emergencyContactName,
-            "emergencyContactPhone": s.emergencyContactPhone,
-            "emergencyContactRelation": s.emergencyContactRelation,
-            "isActive": s.isActive,
-            "createdAt": s.createdAt
-        }
-        for s in staff_list
-    ]
+    """Get all staff (Accept: application/x-ndjson -> stream ทีละแถว)"""
+    serializer = _select_fields(staff_serializer, fields)
+    return await _list_response(request, db, Staff, serializer, limit, cursor)
+
 
 @router.post("/staff", response_model=StaffResponse)
 async def create_staff(  # type: ignore
@@ -2201,6 +2307,7 @@ async def create_staff(  # type: ignore
 @router.get("/staff/{staff_id}", response_model=StaffResponse)
 async def get_staff_member(  # type: ignore
     staff_id: str,
+    fields: Optional[str] = Query(None, description="เลือกเฉพาะฟิลด์"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -2209,6 +2316,10 @@ async def get_staff_member(  # type: ignore
         sid = int(staff_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid staff ID")
+        
+    if fields:
+        return await _detail_response(db, Staff, _select_fields(staff_serializer, fields), sid, "Staff not found")
+        
     result = await db.execute(select(Staff).where(Staff.id == sid))
     staff = result.scalar_one_or_none()
     if not staff:
@@ -2237,6 +2348,16 @@ async def get_staff_member(  # type: ignore
         "createdAt": staff.createdAt
     }
 
+@router.patch("/staff/batch", response_model=BatchUpdateResponse)
+async def batch_update_staff(  # type: ignore
+    batch: StaffBatchUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """แก้ไขพนักงานหลายคนพร้อมกัน (body เหมือน PATCH /guards/batch)"""
+    return await _batch_update(db, current_user, Staff, "staffId", "staff", "พนักงานภายใน", batch)
+
+
 @router.put("/staff/{staff_id}", response_model=StaffResponse)
 async def update_staff(  # type: ignore
     staff_id: str,
@@ -2440,18 +2561,7 @@ async def get_banks(  # type: ignore
     db: AsyncSession = Depends(get_db)
 ):
     """Get all banks"""
-    result = await db.execute(select(Bank).order_by(Bank.id))
-    banks = result.scalars().all()
-    
-    return [  # type: ignore
-        {
-            "id": str(b.id),
-            "code": b.code,
-            "name": b.name,
-            "shortNameEN": b.shortNameEN
-        }
-        for b in banks
-    ]
+    return await reference_cache.rows(db, "banks")  # type: ignore
 
 
 @router.post("/banks", response_model=BankResponse)
@@ -2473,6 +2583,7 @@ async def create_bank(  # type: ignore
     )
     
     db.add(new_bank)
+    await bump_reference_version(db, "banks")
     await db.commit()
     await db.refresh(new_bank)
     
@@ -2534,6 +2645,7 @@ async def update_bank(  # type: ignore
     if bank_data.shortNameEN is not None:
         bank.shortNameEN = bank_data.shortNameEN  # type: ignore[assignment]
         
+    await bump_reference_version(db, "banks")
     await db.commit()
     await db.refresh(bank)
     
@@ -2564,6 +2676,7 @@ async def delete_bank(
         raise HTTPException(status_code=404, detail="Bank not found")
         
     await db.delete(bank)
+    await bump_reference_version(db, "banks")
     await db.commit()
     
     return {"message": "Bank deleted successfully"}
@@ -2572,11 +2685,7 @@ async def delete_bank(
 
 @router.get("/products", response_model=List[ProductResponse])
 async def get_products(db: AsyncSession = Depends(get_db)):  # type: ignore
-    result = await db.execute(select(Product).order_by(Product.code))
-    return [  # type: ignore
-        {"id": str(p.id), "code": p.code, "name": p.name, "category": p.category, "price": p.price, "isActive": p.isActive, "createdAt": p.createdAt}  # type: ignore
-        for p in result.scalars().all()
-    ]
+    return await reference_cache.rows(db, "products")  # type: ignore
 
 @router.post("/products", response_model=ProductResponse)
 async def create_product(product_data: ProductCreate, db: AsyncSession = Depends(get_db)):  # type: ignore
@@ -2587,6 +2696,7 @@ async def create_product(product_data: ProductCreate, db: AsyncSession = Depends
         
     new_product = Product(**product_data.model_dump())
     db.add(new_product)
+    await bump_reference_version(db, "products")
     await db.commit()
     await db.refresh(new_product)
     return {"id": str(new_product.id), "code": new_product.code, "name": new_product.name, "category": new_product.category, "price": new_product.price, "isActive": new_product.isActive, "createdAt": new_product.createdAt}  # type: ignore
@@ -2606,6 +2716,7 @@ async def update_product(product_id: str, product_data: ProductUpdate, db: Async
     for key, value in product_data.model_dump(exclude_unset=True).items():
         setattr(product, key, value)
         
+    await bump_reference_version(db, "products")
     await db.commit()
     await db.refresh(product)
     return {"id": str(product.id), "code": product.code, "name": product.name, "category": product.category, "price": product.price, "isActive": product.isActive, "createdAt": product.createdAt}  # type: ignore
@@ -2623,6 +2734,7 @@ async def delete_product(product_id: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
         
     await db.delete(product)
+    await bump_reference_version(db, "products")
     await db.commit()
     return {"message": "Product deleted"}
 
@@ -2630,19 +2742,7 @@ async def delete_product(product_id: str, db: AsyncSession = Depends(get_db)):
 
 @router.get("/services", response_model=List[ServiceResponse])
 async def get_services(db: AsyncSession = Depends(get_db)):  # type: ignore
-    result = await db.execute(select(Service).order_by(Service.id))
-    return [{
-        "id": str(s.id),
-        "serviceCode": s.serviceCode if hasattr(s, 'serviceCode') else f"SVC-{s.id:03d}",
-        "serviceName": s.serviceName if hasattr(s, 'serviceName') else s.name,
-        "remarks": s.remarks if hasattr(s, 'remarks') else None,
-        "hiringRate": s.hiringRate if hasattr(s, 'hiringRate') else 0.0,
-        "diligenceBonus": s.diligenceBonus if hasattr(s, 'diligenceBonus') else 0.0,
-        "sevenDayBonus": s.sevenDayBonus if hasattr(s, 'sevenDayBonus') else 0.0,
-        "pointBonus": s.pointBonus if hasattr(s, 'pointBonus') else 0.0,
-        "isActive": s.isActive,
-        "createdAt": s.createdAt
-    } for s in result.scalars().all()]  # type: ignore
+    return await reference_cache.rows(db, "services")  # type: ignore
 
 @router.post("/services", response_model=ServiceResponse)
 async def create_service(service_data: ServiceCreate, db: AsyncSession = Depends(get_db)):  # type: ignore
@@ -2662,6 +2762,7 @@ async def create_service(service_data: ServiceCreate, db: AsyncSession = Depends
         isActive=service_data.isActive
     )
     db.add(new_service)
+    await bump_reference_version(db, "services")
     await db.commit()
     await db.refresh(new_service)
     return {
@@ -2714,6 +2815,7 @@ async def update_service(service_id: str, service_data: ServiceUpdate, db: Async
     if service_data.isActive is not None:
         service.isActive = service_data.isActive  # type: ignore[assignment]
         
+    await bump_reference_version(db, "services")
     await db.commit()
     await db.refresh(service)
     return {
@@ -2742,6 +2844,7 @@ async def delete_service(service_id: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Service not found")
         
     await db.delete(service)
+    await bump_reference_version(db, "services")
     await db.commit()
     return {"message": "Service deleted"}
 
@@ -2750,19 +2853,7 @@ async def delete_service(service_id: str, db: AsyncSession = Depends(get_db)):
 
 @router.get("/shifts", response_model=List[ShiftResponse])
 async def get_shifts(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Shift).order_by(Shift.shiftCode))
-    shifts = result.scalars().all()
-    return [
-        ShiftResponse(
-            id=s.id,
-            shiftCode=s.shiftCode,
-            name=s.name,
-            startTime=s.startTime.strftime("%H:%M") if s.startTime else None,
-            endTime=s.endTime.strftime("%H:%M") if s.endTime else None,
-            isActive=s.isActive,
-            createdAt=s.createdAt
-        ) for s in shifts
-    ]
+    return await reference_cache.rows(db, "shifts")
 
 
 @router.post("/shifts", response_model=ShiftResponse, status_code=201)
@@ -2797,6 +2888,7 @@ async def create_shift(shift: ShiftCreate, db: AsyncSession = Depends(get_db)):
         isActive=shift.isActive
     )
     db.add(new_shift)
+    await bump_reference_version(db, "shifts")
     await db.commit()
     await db.refresh(new_shift)
     
@@ -2819,6 +2911,7 @@ async def update_shift(shift_id: int, shift: ShiftUpdate, db: AsyncSession = Dep
     db_shift = result.scalar_one_or_none()
     if not db_shift:
         raise HTTPException(status_code=404, detail="ไม่พบข้อมูลกะ")
+    old_code, old_start, old_end = db_shift.shiftCode, db_shift.startTime, db_shift.endTime
     
     if shift.shiftCode and shift.shiftCode != db_shift.shiftCode:
         result = await db.execute(select(Shift).where(Shift.shiftCode == shift.shiftCode))
@@ -2843,6 +2936,12 @@ async def update_shift(shift_id: int, shift: ShiftUpdate, db: AsyncSession = Dep
     if shift.isActive is not None:
         db_shift.isActive = shift.isActive
     
+    # schedule_guards เก็บช่วงเวลาจริงของกะ (คำนวณตอนบันทึกตารางงาน) - คำนวณใหม่ใน transaction เดียวกัน
+    if (db_shift.shiftCode, db_shift.startTime, db_shift.endTime) != (old_code, old_start, old_end):
+        await retime_shift(db, old_code, db_shift.shiftCode, db_shift.startTime, db_shift.endTime)
+        await publish_shifts_changed(db, db_shift.shiftCode)
+    
+    await bump_reference_version(db, "shifts")
     await db.commit()
     await db.refresh(db_shift)
     
@@ -2889,5 +2988,6 @@ async def delete_shift(shift_id: int, db: AsyncSession = Depends(get_db)):
         )
     
     await db.delete(shift)
+    await bump_reference_version(db, "shifts")
     await db.commit()
     return {"message": "ลบข้อมูลกะสำเร็จ"}
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Reference Data API
+ข้อมูลอ้างอิงสำหรับ dropdown / ฟอร์ม (ธนาคาร, กะ, สินค้า, บริการ, สิทธิ์, prefix บริษัท)
+ในคำขอเดียว - client ส่ง version ของแต่ละตารางที่มีอยู่ เพื่อรับเฉพาะตารางที่เปลี่ยน
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
+
+from app.database import get_db
+from app.models.user import User
+from app.core.deps import get_current_active_user
+from app.core.cache import make_etag, etag_matches
+from app.core.reference_data import reference_cache
+
+
+router = APIRouter()
+
+
+def _parse_versions(value: str) -> Dict[str, int]:
+    """"banks:5,shifts:6" -> {"banks": 5, "shifts": 6}"""
+    versions = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        entity, _, version = item.partition(":")
+        if not version.strip().isdigit():
+            raise HTTPException(status_code=400, detail="versions ต้องอยู่ในรูปแบบ entity:version คั่นด้วย comma")
+        versions[entity.strip()] = int(version)
+    return versions
+
+
+@router.get("")
+async def get_reference_data(  # type: ignore
+    versions: Optional[str] = Query(None, description="version ของแต่ละตารางที่ client มีอยู่ เช่น banks:5,shifts:6"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    ตารางอ้างอิงทั้งหมด (หรือเฉพาะตารางที่ version ต่างจาก versions) พร้อม version ของทุกตาราง
+
+    Response: {"versions": {"banks": 42, "shifts": 40, ...}, "tables": {"banks": [...], ...}}
+    ETag เป็น strong ETag ของ body - ส่ง If-None-Match เพื่อรับ 304
+    """
+    known = _parse_versions(versions) if versions is not None else None
+    body = (await reference_cache.snapshot(db, known)).encode("utf-8")
+    etag = make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/stats")
+async def get_reference_cache_stats(  # type: ignore
+    current_user: User = Depends(get_current_active_user)
+):
+    """version ของแต่ละตารางและสถิติการโหลดใหม่ของ worker นี้"""
+    return reference_cache.stats()
@@ -0,0 +1,297 @@
+"""
+Report API Endpoints
+รายงานสรุป - ความครอบคลุมของกำลังพลตามที่หน่วยงานกำหนด, ชั่วโมงทำงาน และสิทธิ์เบี้ยของพนักงาน
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from typing import Optional
+from datetime import date, timedelta
+import csv
+import io
+
+from app.database import get_db
+from app.models.user import User
+from app.models.schedule_guard import ScheduleGuard
+from app.core.deps import get_current_active_user
+from app.core.cache import WatermarkCache
+from app.core.shift_intervals import summarize_hours
+from app.core.streaks import compute_streaks, streak_cache
+from app.core.schedule_events import schedule_events
+from app.models.change_log import TABLE_CHANGE_CHANNEL
+
+
+router = APIRouter()
+
+MAX_REPORT_DAYS = 366
+
+coverage_cache = WatermarkCache(maxsize=32, name="coverage")
+
+COVERAGE_COLUMNS = [
+    "date", "siteId", "siteCode", "siteName", "customerId", "customerName",
+    "province", "shiftCode", "required", "assigned", "shortage"
+]
+
+# กำลังพลที่ต้องการ (sites.shiftAssignments) เทียบกับที่จัดแล้ว (schedule_guards)
+# คำนวณทั้งช่วงวันที่ในคำสั่งเดียว - ไม่ parse JSON ของตารางงานทีละรายการ
+COVERAGE_SQL = """
+WITH days AS (
+    SELECT CAST(d AS date) AS work_date
+    FROM generate_series(CAST(:date_from AS date), CAST(:date_to AS date), interval '1 day') AS d
+),
+required AS (
+    SELECT
+        s.id AS site_id,
+        s."siteCode" AS site_code,
+        s.name AS site_name,
+        s."customerId" AS customer_id,
+        s."customerName" AS customer_name,
+        s.province,
+        s."contractStartDate" AS contract_start,
+        s."contractEndDate" AS contract_end,
+        a->>'shiftCode' AS shift_code,
+        SUM(COALESCE(CAST(NULLIF(a->>'numberOfPeople', '') AS numeric), 0))::int AS required
+    FROM sites s
+    CROSS JOIN LATERAL jsonb_array_elements(CAST(s."shiftAssignments" AS jsonb)) AS a
+    WHERE s."isActive" = true
+      AND s."shiftAssignments" LIKE '[%'
+      AND COALESCE(a->>'shiftCode', '') <> ''
+      {site_filters}
+    GROUP BY s.id, a->>'shiftCode'
+),
+assigned AS (
+    SELECT "siteId" AS site_id, shift AS shift_code, "scheduleDate" AS work_date, COUNT(*) AS assigned
+    FROM schedule_guards
+    WHERE "scheduleDate" BETWEEN :date_from AND :date_to
+    GROUP BY "siteId", shift, "scheduleDate"
+)
+SELECT
+    days.work_date,
+    r.site_id, r.site_code, r.site_name, r.customer_id, r.customer_name, r.province,
+    r.shift_code,
+    r.required,
+    COALESCE(a.assigned, 0) AS assigned
+FROM required r
+JOIN days
+  ON (r.contract_start IS NULL OR days.work_date >= r.contract_start)
+ AND (r.contract_end IS NULL OR days.work_date <= r.contract_end)
+LEFT JOIN assigned a
+  ON a.site_id = r.site_id AND a.shift_code = r.shift_code AND a.work_date = days.work_date
+ORDER BY days.work_date, r.site_name, r.shift_code
+"""
+
+# watermark ของ coverage_cache - เพิ่มทุกครั้งที่ sites / schedule_guards ถูกเขียน
+# (NOTIFY จาก trigger ระดับ statement ของทุก worker) หรือ listener เชื่อมต่อใหม่
+coverage_generation = 0
+
+
+def _on_table_change(event: dict) -> None:
+    global coverage_generation
+    coverage_generation += 1
+
+
+schedule_events.add_handler(_on_table_change, channel=TABLE_CHANGE_CHANNEL)
+
+
+async def _load_coverage(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    customer_id: Optional[int],
+    province: Optional[str]
+) -> list:
+    """
+    ดึงข้อมูลความครอบคลุม (ใช้ cache ถ้าข้อมูลยังไม่เปลี่ยน)
+    cache ใช้ได้เฉพาะเมื่อ listener เชื่อมต่ออยู่ - ไม่เช่นนั้นจะไม่รู้ว่าข้อมูลเปลี่ยน
+    """
+    use_cache = schedule_events.connected
+    # อ่าน generation ก่อน query - ถ้ามีการแก้ไขระหว่างคำนวณ ผลนี้จะไม่ถูกใช้ซ้ำ
+    watermark = coverage_generation
+    cache_key = (date_from, date_to, customer_id, province)
+    if use_cache:
+        cached = coverage_cache.get(cache_key, watermark)
+        if cached is not None:
+            return cached
+
+    site_filters = []
+    params = {"date_from": date_from, "date_to": date_to}
+    if customer_id is not None:
+        site_filters.append('AND s."customerId" = :customer_id')
+        params["customer_id"] = customer_id
+    if province:
+        site_filters.append("AND s.province = :province")
+        params["province"] = province
+
+    result = await db.execute(
+        text(COVERAGE_SQL.format(site_filters=" ".join(site_filters))),
+        params
+    )
+    rows = [
+        {
+            "date": r.work_date.isoformat(),
+            "siteId": r.site_id,
+            "siteCode": r.site_code,
+            "siteName": r.site_name,
+            "customerId": r.customer_id,
+            "customerName": r.customer_name,
+            "province": r.province,
+            "shiftCode": r.shift_code,
+            "required": r.required,
+            "assigned": r.assigned,
+            "shortage": max(r.required - r.assigned, 0)
+        }
+        for r in result.all()
+    ]
+    if use_cache:
+        coverage_cache.set(cache_key, watermark, rows)
+    return rows
+
+
+def _csv_stream(rows: list):
+    """CSV ทีละบรรทัด (มี BOM เพื่อให้ Excel อ่านภาษาไทยได้)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(COVERAGE_COLUMNS)
+    for row in rows:
+        writer.writerow([row[column] for column in COVERAGE_COLUMNS])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/coverage")
+async def get_coverage_report(  # type: ignore
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    customer_id: Optional[int] = Query(None, alias="customerId"),
+    province: Optional[str] = None,
+    shortage_only: bool = Query(False, alias="shortageOnly"),
+    format: str = Query("json", pattern="^(json|csv)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    รายงานกำลังพลที่ต้องการเทียบกับที่จัดแล้ว แยกตามหน่วยงาน กะ และวันที่
+
+    - customerId / province: กรองหน่วยงาน
+    - shortageOnly: แสดงเฉพาะรายการที่ขาดคน
+    - format=csv: ดาวน์โหลดเป็นไฟล์ CSV
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่น้อยกว่าวันที่เริ่มต้น")
+    if (date_to - date_from).days + 1 > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"ช่วงวันที่ต้องไม่เกิน {MAX_REPORT_DAYS} วัน")
+
+    rows = await _load_coverage(db, date_from, date_to, customer_id, province)
+    if shortage_only:
+        rows = [r for r in rows if r["shortage"] > 0]
+
+    if format == "csv":
+        filename = f"coverage_{date_from.isoformat()}_{date_to.isoformat()}.csv"
+        return StreamingResponse(
+            _csv_stream(rows),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    # rows เป็น dict ของค่าพื้นฐานอยู่แล้ว - ส่ง JSONResponse ตรงเพื่อข้าม jsonable_encoder
+    return JSONResponse({
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "summary": {
+            "slots": len(rows),
+            "required": sum(r["required"] for r in rows),
+            "assigned": sum(r["assigned"] for r in rows),
+            "shortage": sum(r["shortage"] for r in rows),
+            "understaffed": sum(1 for r in rows if r["shortage"] > 0)
+        },
+        "rows": rows
+    })
+
+
+@router.get("/hours")
+async def get_hours_report(  # type: ignore
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    guard_id: Optional[str] = Query(None, alias="guardId"),
+    regular_hours: float = Query(8.0, alias="regularHours", gt=0, le=24),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    ชั่วโมงทำงาน / ชั่วโมงปกติ / OT / จำนวนกะซ้อน ของพนักงานแต่ละคนในช่วงวันที่
+
+    - ชั่วโมงของกะข้ามคืนถูกตัดตามช่วงวันที่ที่ขอ
+    - regularHours: ชั่วโมงปกติต่อวันทำงาน (ตามวันที่จัดตาราง) ส่วนที่เกินนับเป็น OT
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่น้อยกว่าวันที่เริ่มต้น")
+    if (date_to - date_from).days + 1 > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"ช่วงวันที่ต้องไม่เกิน {MAX_REPORT_DAYS} วัน")
+
+    # รวมกะข้ามคืนของวันก่อนหน้าที่ล้นเข้ามาในช่วงที่ขอ
+    query = select(
+        ScheduleGuard.guardId, ScheduleGuard.guardName, ScheduleGuard.scheduleDate,
+        ScheduleGuard.shiftStart, ScheduleGuard.shiftEnd
+    ).where(ScheduleGuard.scheduleDate.between(date_from - timedelta(days=1), date_to))
+    if guard_id:
+        query = query.where(ScheduleGuard.guardId == guard_id)
+
+    result = await db.execute(query)
+    guards = summarize_hours(result.mappings().all(), date_from, date_to, regular_hours)
+
+    return JSONResponse({
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "regularHours": regular_hours,
+        "total": len(guards),
+        "guards": guards
+    })
+
+
+@router.get("/streaks")
+async def get_streak_report(  # type: ignore
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    guard_id: Optional[str] = Query(None, alias="guardId"),
+    streak_days: int = Query(7, alias="streakDays", ge=1, le=31),
+    max_absences: int = Query(0, alias="maxAbsences", ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    วันทำงานต่อเนื่อง / วันขาดงาน และสิทธิ์เบี้ยของพนักงานในช่วงวันที่
+
+    - sevenDayBonus: ทุก ๆ streakDays วันติดต่อกัน x อัตรา sevenDayBonus
+    - diligenceBonus: วันขาดงานตั้งแต่วันแรกที่ทำงานในช่วงนี้ไม่เกิน maxAbsences
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่น้อยกว่าวันที่เริ่มต้น")
+    if (date_to - date_from).days + 1 > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"ช่วงวันที่ต้องไม่เกิน {MAX_REPORT_DAYS} วัน")
+
+    if guard_id:
+        guards = await compute_streaks(db, date_from, date_to, [guard_id], streak_days, max_absences)
+    elif schedule_events.connected:
+        # cache ถูก invalidate ผ่าน change feed - ใช้ได้เฉพาะเมื่อ listener เชื่อมต่ออยู่
+        guards = await streak_cache.get(db, date_from, date_to, streak_days, max_absences)
+    else:
+        guards = await compute_streaks(db, date_from, date_to, None, streak_days, max_absences)
+
+    rows = [guards[key] for key in sorted(guards)]
+    return JSONResponse({
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "streakDays": streak_days,
+        "total": len(rows),
+        "summary": {
+            "sevenDayBonus": round(sum(r["sevenDayBonus"] for r in rows), 2),
+            "diligenceBonus": round(sum(r["diligenceBonus"] for r in rows), 2),
+            "diligenceEligible": sum(1 for r in rows if r["diligenceEligible"])
+        },
+        "guards": rows
+    })
@@ -2,96 +2,427 @@
 Schedule API Endpoints
 จัดการตารางงาน - บันทึก/ดึง/แก้ไข/ลบ ตารางงานพนักงาน
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List, Optional
-from datetime import date
+from sqlalchemy import select, and_, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Union
+from datetime import date, timedelta
+import asyncio
 import json
 
 from app.database import get_db
 from app.models.schedule import Schedule
+from app.models.schedule_guard import ScheduleGuard
+from app.models.site import Site
+from app.models.guard import Guard
 from app.models.user import User
 from app.schemas.schedule import (
     ScheduleCreate, ScheduleUpdate, ScheduleResponse,
-    ScheduleListItem
+    ScheduleListItem, ScheduleSummary, AutoRosterRequest
 )
 from app.core.deps import get_current_active_user
+from app.core.schedule_conflicts import (
+    load_shift_times, build_guard_rows, lock_guards, find_conflicts,
+    format_conflicts, sync_schedule_guards, clear_schedule_guards, scan_conflicts
+)
+from app.core.roster_solver import solve_roster, build_proposals
+from app.core.schedule_events import schedule_events, publish_schedule_event
+from app.core.schedule_codec import rate_card, encode_shifts, hydrate_shifts
+from app.core.cache import ResponseCache, make_etag, etag_matches
+from app.core.serialization import RowSerializer, wants_ndjson, stream_ndjson
+
+
+MAX_AUTO_ROSTER_DAYS = 62
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+EVENT_HEARTBEAT_SECONDS = 15
 
 
 router = APIRouter()
 
+schedule_list_serializer = RowSerializer(ScheduleListItem, {
+    "totalGuardsDay": lambda v: v or 0,
+    "totalGuardsNight": lambda v: v or 0,
+    "totalGuards": lambda v: v or 0,
+    "version": lambda v: v or 1,
+})
+
+# Response cache ของ GET /schedules/by-date (key = scheduleDate)
+by_date_cache = ResponseCache(max_bytes=64 * 1024 * 1024, name="schedules_by_date")
+
+
+def _invalidate_by_date_cache(event: dict) -> None:
+    """Invalidate เฉพาะวันที่ที่ถูกแก้ไข (เหตุการณ์จากทุก worker)"""
+    if "scheduleDate" not in event:
+        # resync / ข้อมูลพนักงานเปลี่ยน - ไม่รู้ว่ากระทบวันไหน
+        by_date_cache.clear()
+        return
+    try:
+        by_date_cache.invalidate(date.fromisoformat(event["scheduleDate"]))
+    except ValueError:
+        by_date_cache.clear()
+
+
+schedule_events.add_handler(_invalidate_by_date_cache)
+
+
+async def _index_schedule_guards(
+    db: AsyncSession,
+    schedule_id: Optional[int],
+    schedule_date: date,
+    site_id: int,
+    site_name: str,
+    shifts_data: dict
+) -> list:
+    """
+    ตรวจสอบการจัดซ้อนกะของพนักงานก่อนบันทึก
+    คืนค่าแถว schedule_guards ที่ต้อง sync หลังจากได้ scheduleId
+    """
+    shift_times = await load_shift_times(db)
+    rows = build_guard_rows(schedule_date, site_id, site_name, shifts_data, shift_times)
+    await lock_guards(db, rows)
+    conflicts = await find_conflicts(db, rows, exclude_schedule_id=schedule_id)
+    if conflicts:
+        raise HTTPException(status_code=409, detail=format_conflicts(conflicts))
+    return rows
+
+
+async def _encode_schedule_shifts(db: AsyncSession, site_id: int, shifts_data: dict) -> str:
+    """แปลง shifts เป็นรูปแบบ compact (อ้างอิงอัตราจาก employmentDetails ของหน่วยงาน)"""
+    result = await db.execute(select(Site.employmentDetails).where(Site.id == site_id))
+    employment_details = result.scalar_one_or_none()
+    try:
+        card = rate_card(json.loads(employment_details)) if employment_details else {}
+    except ValueError:
+        card = {}
+    return json.dumps(encode_shifts(shifts_data, card), ensure_ascii=False)
+
 
 # ========== SCHEDULE ENDPOINTS ==========
 
-@router.get("/schedules", response_model=List[ScheduleListItem])
+def _parse_cursor(cursor: str):
+    """cursor รูปแบบ "<scheduleDate>:<id>" (จาก header X-Next-Cursor)"""
+    try:
+        date_part, id_part = cursor.split(":", 1)
+        return date.fromisoformat(date_part), int(id_part)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="cursor ไม่ถูกต้อง")
+
+
+@router.get("/schedules", response_model=Union[List[ScheduleListItem], ScheduleSummary])
 async def get_schedules(
+    request: Request,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     site_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    summary: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """ดึงรายการตารางงาน (สามารถกรองตามวันที่และหน่วยงาน)"""
-    query = select(Schedule).where(Schedule.isActive == True)
-    
+    """
+    ดึงรายการตารางงาน (สามารถกรองตามวันที่และหน่วยงาน)
+
+    - แบ่งหน้าแบบ keyset เรียงตาม (scheduleDate, id) จากใหม่ไปเก่า
+      หน้าถัดไปส่ง cursor จาก header X-Next-Cursor (ไม่มี header = หน้าสุดท้าย)
+    - summary=true: คืนเฉพาะจำนวนตารางงาน/พนักงาน ต่อวันที่และต่อหน่วยงาน
+    - Accept: application/x-ndjson: stream ทุกรายการตั้งแต่ cursor (ไม่ใช้ limit)
+    """
+    filters = [Schedule.isActive == True]
     if start_date:
-        query = query.where(Schedule.scheduleDate >= start_date)
+        filters.append(Schedule.scheduleDate >= start_date)
     if end_date:
-        query = query.where(Schedule.scheduleDate <= end_date)
+        filters.append(Schedule.scheduleDate <= end_date)
     if site_id:
-        query = query.where(Schedule.siteId == site_id)
-    
-    query = query.order_by(Schedule.scheduleDate.desc())
-    
-    result = await db.execute(query)
-    schedules = result.scalars().all()
-    
-    return [
-        ScheduleListItem(
-            id=s.id,  # type: ignore
-            scheduleDate=s.scheduleDate,  # type: ignore
-            siteId=s.siteId,  # type: ignore
-            siteName=s.siteName,  # type: ignore
-            totalGuardsDay=s.totalGuardsDay or 0,  # type: ignore
-            totalGuardsNight=s.totalGuardsNight or 0,  # type: ignore
-            totalGuards=s.totalGuards or 0,  # type: ignore
-            isActive=s.isActive  # type: ignore
+        filters.append(Schedule.siteId == site_id)
+
+    if summary:
+        schedules_count = func.count(Schedule.id)
+        guards_sum = func.coalesce(func.sum(Schedule.totalGuards), 0)
+        by_date = await db.execute(
+            select(Schedule.scheduleDate, schedules_count, guards_sum)
+            .where(*filters)
+            .group_by(Schedule.scheduleDate)
+            .order_by(Schedule.scheduleDate.desc())
+        )
+        by_site = await db.execute(
+            select(Schedule.siteId, func.max(Schedule.siteName), schedules_count, guards_sum)
+            .where(*filters)
+            .group_by(Schedule.siteId)
+            .order_by(func.max(Schedule.siteName))
+        )
+        date_rows = by_date.all()
+        return ScheduleSummary(
+            totalSchedules=sum(r[1] for r in date_rows),
+            totalGuards=sum(r[2] for r in date_rows),
+            byDate=[
+                {"scheduleDate": d, "schedules": count, "guards": guards}
+                for d, count, guards in date_rows
+            ],
+            bySite=[
+                {"siteId": sid, "siteName": name, "schedules": count, "guards": guards}
+                for sid, name, count, guards in by_site.all()
+            ]
+        )
+
+    query = select(
+        Schedule.id, Schedule.scheduleDate, Schedule.siteId, Schedule.siteName,
+        Schedule.totalGuardsDay, Schedule.totalGuardsNight, Schedule.totalGuards,
+        Schedule.isActive, Schedule.version
+    ).where(*filters)
+    if cursor:
+        cursor_date, cursor_id = _parse_cursor(cursor)
+        query = query.where(tuple_(Schedule.scheduleDate, Schedule.id) < tuple_(cursor_date, cursor_id))
+    query = query.order_by(Schedule.scheduleDate.desc(), Schedule.id.desc())
+
+    if wants_ndjson(request):
+        return await stream_ndjson(db, query, schedule_list_serializer.to_dicts)
+
+    result = await db.execute(query.limit(limit + 1))
+    schedules = result.all()
+
+    next_cursor = None
+    if len(schedules) > limit:
+        schedules = schedules[:limit]
+        last = schedules[-1]
+        next_cursor = f"{last.scheduleDate.isoformat()}:{last.id}"
+
+    list_response = schedule_list_serializer.response(schedules)
+    if next_cursor:
+        list_response.headers["X-Next-Cursor"] = next_cursor
+    return list_response
+
+
+@router.get("/schedules/conflicts")
+async def get_schedule_conflicts(  # type: ignore
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    limit: int = Query(5000, ge=1, le=50000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """ค้นหาพนักงานที่ถูกจัดซ้อนกะข้ามหน่วยงานในช่วงวันที่"""
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่น้อยกว่าวันที่เริ่มต้น")
+
+    conflicts = await scan_conflicts(db, date_from, date_to, limit=limit)
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "total": len(conflicts),
+        "conflicts": conflicts
+    }
+
+
+@router.get("/schedules/events")
+async def schedule_event_stream(  # type: ignore
+    request: Request,
+    site_ids: Optional[str] = Query(None, alias="siteIds", description="comma separated site IDs"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Live change feed (Server-Sent Events)
+
+    ส่งเหตุการณ์ created/updated/deleted {scheduleId, siteId, scheduleDate, version}
+    เฉพาะหน่วยงานและช่วงวันที่ที่ client เปิดอยู่ - client โหลดเฉพาะตารางงานที่เปลี่ยน
+    เหตุการณ์ resync หมายถึงอาจมีเหตุการณ์ตกหล่น ให้โหลดข้อมูลช่วงนั้นใหม่ทั้งหมด
+    """
+    try:
+        site_filter = [int(v) for v in site_ids.split(",") if v.strip()] if site_ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="siteIds ต้องเป็นตัวเลขคั่นด้วย comma")
+
+    # ไม่ถือ connection ของ pool ไว้ตลอดอายุของ stream
+    await db.close()
+
+    async def stream():
+        async with schedule_events.subscribe(site_filter, date_from, date_to) as subscription:
+            yield "retry: 3000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/schedules/auto-roster")
+async def auto_roster(  # type: ignore
+    request: AutoRosterRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    เสนอการจัดพนักงานเข้ากะอัตโนมัติตาม shiftAssignments ของหน่วยงาน
+
+    ไม่บันทึกข้อมูล - คืนค่า proposals ในรูปแบบเดียวกับ POST/PUT /schedules
+    (มี scheduleId = ตารางงานเดิม ให้ใช้ PUT) ให้ผู้ใช้ตรวจสอบก่อนบันทึก
+    """
+    if request.endDate < request.startDate:
+        raise HTTPException(status_code=400, detail="วันที่สิ้นสุดต้องไม่น้อยกว่าวันที่เริ่มต้น")
+    if (request.endDate - request.startDate).days + 1 > MAX_AUTO_ROSTER_DAYS:
+        raise HTTPException(status_code=400, detail=f"จัดตารางอัตโนมัติได้ไม่เกิน {MAX_AUTO_ROSTER_DAYS} วันต่อครั้ง")
+
+    # หน่วยงาน
+    site_query = select(
+        Site.id, Site.name, Site.isActive, Site.contractStartDate, Site.contractEndDate,
+        Site.shiftAssignments, Site.employmentDetails
+    ).where(Site.isActive == True)
+    if request.siteIds:
+        site_query = site_query.where(Site.id.in_(request.siteIds))
+    sites = []
+    for row in (await db.execute(site_query)).mappings().all():
+        site = dict(row)
+        try:
+            site["shiftAssignments"] = json.loads(row["shiftAssignments"]) if row["shiftAssignments"] else []
+            site["employmentDetails"] = json.loads(row["employmentDetails"]) if row["employmentDetails"] else []
+        except ValueError:
+            continue
+        sites.append(site)
+
+    # พนักงาน (เฉพาะ column ที่ใช้)
+    guard_result = await db.execute(
+        select(
+            Guard.id, Guard.guardId, Guard.title, Guard.firstName, Guard.lastName,
+            Guard.isActive, Guard.licenseExpiry, Guard.startDate
+        ).where(Guard.isActive == True).order_by(Guard.guardId)
+    )
+    guards = [dict(row) for row in guard_result.mappings().all()]
+
+    # กะที่บันทึกแล้ว (รวมช่วงย้อนหลังสำหรับความต่อเนื่อง และวันถัดไปสำหรับกะข้ามคืน)
+    existing_result = await db.execute(
+        select(
+            ScheduleGuard.guardId, ScheduleGuard.siteId, ScheduleGuard.shift,
+            ScheduleGuard.scheduleDate, ScheduleGuard.shiftStart, ScheduleGuard.shiftEnd
+        ).where(
+            ScheduleGuard.scheduleDate.between(
+                request.startDate - timedelta(days=max(request.lookbackDays, 1)),
+                request.endDate + timedelta(days=1)
+            )
         )
-        for s in schedules
-    ]
+    )
+    existing_rows = [dict(row) for row in existing_result.mappings().all()]
+
+    shift_times = await load_shift_times(db)
+    solution = solve_roster(request.startDate, request.endDate, sites, guards, existing_rows, shift_times)
+
+    # ตารางงานเดิมของหน่วยงาน/วันที่ที่มีการเสนอเพิ่ม
+    touched = {(a["siteId"], a["scheduleDate"]) for a in solution["assignments"]}
+    existing_schedules = {}
+    if touched:
+        schedule_result = await db.execute(
+            select(Schedule.id, Schedule.siteId, Schedule.scheduleDate, Schedule.shifts).where(
+                and_(
+                    Schedule.siteId.in_({site_id for site_id, _ in touched}),
+                    Schedule.scheduleDate.between(request.startDate, request.endDate),
+                    Schedule.isActive == True
+                )
+            )
+        )
+        existing = schedule_result.all()
+        decoded = await hydrate_shifts(db, [json.loads(s.shifts) if s.shifts else {} for s in existing])
+        for s, shifts_data in zip(existing, decoded):
+            existing_schedules[(s.siteId, s.scheduleDate)] = {
+                "scheduleId": s.id,
+                "shifts": shifts_data
+            }
+
+    return {
+        "startDate": request.startDate.isoformat(),
+        "endDate": request.endDate.isoformat(),
+        "proposals": build_proposals(solution["assignments"], sites, existing_schedules),
+        "unfilled": [
+            {**u, "scheduleDate": u["scheduleDate"].isoformat()}
+            for u in solution["unfilled"]
+        ],
+        "stats": solution["stats"]
+    }
+
+
+@router.get("/schedules/cache/stats")
+async def get_schedule_cache_stats(  # type: ignore
+    current_user: User = Depends(get_current_active_user)
+):
+    """สถิติ cache ของตารางงานรายวัน (hit rate / หน่วยความจำ)"""
+    return {
+        "byDate": by_date_cache.stats(),
+        "listenerConnected": schedule_events.connected
+    }
 
 
 @router.get("/schedules/by-date/{schedule_date}")
 async def get_schedules_by_date(  # type: ignore
     schedule_date: date,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """ดึงตารางงานทั้งหมดในวันที่ระบุ"""
-    result = await db.execute(
-        select(Schedule)
-        .where(
-            and_(
-                Schedule.scheduleDate == schedule_date,
-                Schedule.isActive == True
+    """
+    ดึงตารางงานทั้งหมดในวันที่ระบุ
+
+    Response ถูก cache เป็น bytes ต่อวันที่ และ invalidate เมื่อมีการบันทึกตารางงาน
+    ของวันนั้น (ทุก worker ผ่าน change feed) - รองรับ ETag / If-None-Match (304)
+    """
+    # ถ้า listener ไม่ได้เชื่อมต่อ จะไม่รู้การแก้ไขจาก worker อื่น - ไม่ใช้ cache
+    use_cache = schedule_events.connected
+    cached = by_date_cache.get(schedule_date) if use_cache else None
+    # นับ 304 ใน stats ของ cache เฉพาะเมื่อ response มาจาก cache
+    from_cache = cached is not None
+    if cached is None:
+        generation = by_date_cache.generation(schedule_date)
+        result = await db.execute(
+            select(Schedule.id, Schedule.siteId, Schedule.siteName, Schedule.shifts, Schedule.version)
+            .where(
+                and_(
+                    Schedule.scheduleDate == schedule_date,
+                    Schedule.isActive == True
+                )
             )
+            .order_by(Schedule.siteName)
         )
-        .order_by(Schedule.siteName)
-    )
-    schedules = result.scalars().all()
-    
-    return {  # type: ignore
-        schedule_date.isoformat(): {
-            str(s.siteId): {
-                "scheduleId": s.id,
-                "siteId": s.siteId,
-                "siteName": s.siteName,
-                "shifts": json.loads(s.shifts)  # type: ignore
+        schedules = result.all()
+        decoded = await hydrate_shifts(db, [json.loads(s.shifts) for s in schedules])
+
+        content = {
+            schedule_date.isoformat(): {
+                str(s.siteId): {
+                    "scheduleId": s.id,
+                    "siteId": s.siteId,
+                    "siteName": s.siteName,
+                    "shifts": shifts_data,
+                    "version": s.version
+                }
+                for s, shifts_data in zip(schedules, decoded)
             }
-            for s in schedules
         }
-    }
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if use_cache:
+            cached = by_date_cache.set(schedule_date, body, generation)
+        else:
+            cached = (body, make_etag(body))
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        if from_cache:
+            by_date_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/schedules/{schedule_id}", response_model=ScheduleResponse)
@@ -109,7 +440,7 @@ async def get_schedule(
     if not schedule:
         raise HTTPException(status_code=404, detail="ไม่พบตารางงาน")
     
-    shifts_data = json.loads(schedule.shifts)  # type: ignore
+    shifts_data = (await hydrate_shifts(db, [json.loads(schedule.shifts)]))[0]  # type: ignore[arg-type]
     
     return ScheduleResponse(
         id=schedule.id,  # type: ignore
@@ -121,6 +452,7 @@ async def get_schedule(
         totalGuardsNight=schedule.totalGuardsNight or 0,  # type: ignore
         totalGuards=schedule.totalGuards or 0,  # type: ignore
         isActive=schedule.isActive,  # type: ignore
+        version=schedule.version or 1,  # type: ignore
         createdAt=schedule.createdAt,  # type: ignore
         updatedAt=schedule.updatedAt,  # type: ignore
         createdBy=schedule.createdBy,  # type: ignore
@@ -157,17 +489,25 @@ async def create_schedule(  # type: ignore
             )
         else:
             # มี schedule แต่ถูก soft delete ไปแล้ว -> reactivate และ update
+            guard_rows = await _index_schedule_guards(
+                db, existing.id, schedule_data.scheduleDate,  # type: ignore[arg-type]
+                schedule_data.siteId, schedule_data.siteName, schedule_data.shifts
+            )
             total_guards = 0
             for shift_code, guards in schedule_data.shifts.items():
                 total_guards += len(guards)
             
-            existing.shifts = json.dumps(schedule_data.shifts)  # type: ignore[assignment]
+            existing.shifts = await _encode_schedule_shifts(db, schedule_data.siteId, schedule_data.shifts)  # type: ignore[assignment]
             existing.siteName = schedule_data.siteName  # type: ignore[assignment]
             existing.totalGuards = total_guards  # type: ignore[assignment]
             existing.isActive = True  # type: ignore[assignment]
             existing.remarks = schedule_data.remarks  # type: ignore[assignment]
+            existing.version = (existing.version or 0) + 1  # type: ignore[assignment]
+            affected = await sync_schedule_guards(db, existing.id, guard_rows)  # type: ignore[arg-type]
+            await publish_schedule_event(db, "created", existing, affected)
             
             await db.commit()
+            by_date_cache.invalidate(existing.scheduleDate)
             await db.refresh(existing)
             
             return {  # type: ignore
@@ -177,13 +517,18 @@ async def create_schedule(  # type: ignore
                 "message": "กู้คืนและอัปเดตตารางงานสำเร็จ"
             }
     
+    guard_rows = await _index_schedule_guards(
+        db, None, schedule_data.scheduleDate,
+        schedule_data.siteId, schedule_data.siteName, schedule_data.shifts
+    )
+    
     # คำนวณจำนวนพนักงานทั้งหมด (รองรับ dynamic shifts)
     total_guards = 0
     for shift_code, guards in schedule_data.shifts.items():
         total_guards += len(guards)
     
-    # แปลง shifts เป็น JSON
-    shifts_json = json.dumps(schedule_data.shifts)
+    # แปลง shifts เป็น JSON (รูปแบบ compact)
+    shifts_json = await _encode_schedule_shifts(db, schedule_data.siteId, schedule_data.shifts)
     
     # สร้าง record ใหม่
     new_schedule = Schedule(
@@ -199,7 +544,19 @@ async def create_schedule(  # type: ignore
     )
     
     db.add(new_schedule)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # มีคำขออื่นสร้างตารางงานของหน่วยงาน/วันเดียวกันไปก่อน (unique siteId + scheduleDate)
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="มีตารางงานของหน่วยงานนี้ในวันนี้แล้ว ใช้ PUT เพื่ออัปเดต"
+        )
+    affected = await sync_schedule_guards(db, new_schedule.id, guard_rows)  # type: ignore[arg-type]
+    await publish_schedule_event(db, "created", new_schedule, affected)
     await db.commit()
+    by_date_cache.invalidate(new_schedule.scheduleDate)
     await db.refresh(new_schedule)
     
     return {  # type: ignore
@@ -227,6 +584,19 @@ async def update_schedule(  # type: ignore
     if not schedule:
         raise HTTPException(status_code=404, detail="ไม่พบตารางงาน")
     
+    # ตรวจสอบการจัดซ้อนกะเมื่อมีการเปลี่ยนพนักงาน หรือกู้คืนตารางงาน
+    will_be_active = schedule.isActive if schedule_data.isActive is None else schedule_data.isActive
+    guard_rows = None
+    if will_be_active and (schedule_data.shifts is not None or not schedule.isActive):
+        if schedule_data.shifts is not None:
+            shifts_data = schedule_data.shifts
+        else:
+            shifts_data = (await hydrate_shifts(db, [json.loads(schedule.shifts)]))[0]  # type: ignore[arg-type]
+        guard_rows = await _index_schedule_guards(
+            db, schedule.id, schedule.scheduleDate,  # type: ignore[arg-type]
+            schedule.siteId, schedule.siteName, shifts_data  # type: ignore[arg-type]
+        )
+    
     # อัปเดตข้อมูล
     if schedule_data.shifts is not None:
         # คำนวณจำนวนพนักงานทั้งหมด (รองรับ dynamic shifts)
@@ -234,7 +604,7 @@ async def update_schedule(  # type: ignore
         for shift_code, guards in schedule_data.shifts.items():
             total_guards += len(guards)
         
-        schedule.shifts = json.dumps(schedule_data.shifts)  # type: ignore[assignment]
+        schedule.shifts = await _encode_schedule_shifts(db, schedule.siteId, schedule_data.shifts)  # type: ignore[assignment, arg-type]
         schedule.totalGuardsDay = 0  # Legacy field  # type: ignore[assignment]
         schedule.totalGuardsNight = 0  # Legacy field  # type: ignore[assignment]
         schedule.totalGuards = total_guards  # type: ignore[assignment]
@@ -245,7 +615,16 @@ async def update_schedule(  # type: ignore
     if schedule_data.isActive is not None:
         schedule.isActive = schedule_data.isActive  # type: ignore[assignment]
     
+    affected = set()
+    if not will_be_active:
+        affected = await clear_schedule_guards(db, schedule.id)  # type: ignore[arg-type]
+    elif guard_rows is not None:
+        affected = await sync_schedule_guards(db, schedule.id, guard_rows)  # type: ignore[arg-type]
+    
+    schedule.version = (schedule.version or 0) + 1  # type: ignore[assignment]
+    await publish_schedule_event(db, "updated" if will_be_active else "deleted", schedule, affected)
     await db.commit()
+    by_date_cache.invalidate(schedule.scheduleDate)
     await db.refresh(schedule)
     
     return {  # type: ignore
@@ -272,8 +651,12 @@ async def delete_schedule(
     
     # Soft delete
     schedule.isActive = False  # type: ignore[assignment]
+    schedule.version = (schedule.version or 0) + 1  # type: ignore[assignment]
+    affected = await clear_schedule_guards(db, schedule.id)  # type: ignore[arg-type]
+    await publish_schedule_event(db, "deleted", schedule, affected)
     
     await db.commit()
+    by_date_cache.invalidate(schedule.scheduleDate)
     
     return {"message": "ลบตารางงานสำเร็จ"}
 
@@ -294,7 +677,11 @@ async def hard_delete_schedule(
     if not schedule:
         raise HTTPException(status_code=404, detail="ไม่พบตารางงาน")
     
+    schedule.version = (schedule.version or 0) + 1  # type: ignore[assignment]
+    affected = await clear_schedule_guards(db, schedule.id)  # type: ignore[arg-type]
+    await publish_schedule_event(db, "deleted", schedule, affected)
     await db.delete(schedule)
     await db.commit()
+    by_date_cache.invalidate(schedule.scheduleDate)
     
     return {"message": "ลบตารางงานถาวรสำเร็จ"}
@@ -0,0 +1,42 @@
+"""
+Search API
+ค้นหาพนักงาน รปภ., พนักงาน, ลูกค้า และหน่วยงาน จากช่องค้นหาเดียว
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.database import get_db
+from app.models.user import User
+from app.core.deps import get_current_active_user
+from app.core.search import SEARCH_SOURCES, DEFAULT_LIMIT, MAX_LIMIT, search
+from app.core.serialization import FastJSONResponse
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def search_all(  # type: ignore
+    q: str = Query(..., max_length=100, description="ชื่อบางส่วน, รหัส, เบอร์โทร หรือเลขบัตรประชาชน"),
+    entities: Optional[str] = Query(None, description="guards,staff,customers,sites (ค่าเริ่มต้น: ทั้งหมด)"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    ผลการค้นหาเรียงตามคะแนน (ขึ้นต้นคำ > มีข้อความนี้ > ความคล้าย trigram)
+
+    Response: {"query": "สมชาย", "backend": "pg_trgm", "results": [
+        {"entity": "guards", "id": "12", "label": "G0012 นายสมชาย ใจดี", "detail": "0812345678", "score": 1.0}
+    ]}
+    """
+    selected = None
+    if entities:
+        selected = [name.strip() for name in entities.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in SEARCH_SOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"ไม่รู้จักประเภทข้อมูล: {', '.join(unknown)}")
+
+    backend, results = await search(db, q, selected, limit)
+    return FastJSONResponse({"query": q, "backend": backend, "results": results})
@@ -0,0 +1,110 @@
+"""
+Delta Sync API
+ให้ client เก็บข้อมูลไว้ในเครื่องแล้วดึงเฉพาะส่วนที่เปลี่ยน (รวม tombstone ของรายการที่ถูกลบ)
+
+Watermark คือ xmin ของ snapshot ฐานข้อมูล (transaction ที่เก่ากว่านี้จบแล้วทั้งหมด)
+จึงเพิ่มขึ้นเสมอและไม่ขึ้นกับนาฬิกาของ worker - การเปลี่ยนแปลงที่ commit ช้า
+จะไม่ตกหล่นเพราะถูกส่งในรอบถัดไป
+
+change_log ถูกลบเป็นรอบ (app.core.change_log) - since ที่เก่ากว่า horizon ได้ full=true
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from typing import Optional
+
+from app.database import get_db
+from app.models.user import User
+from app.models.customer import Customer
+from app.models.site import Site
+from app.models.guard import Guard
+from app.models.staff import Staff
+from app.models.schedule import Schedule
+from app.models.change_log import ChangeLog
+from app.core.change_log import change_log_horizon
+from app.core.deps import get_current_active_user
+from app.core.serialization import FastJSONResponse
+from app.api.master_data import customer_serializer, site_serializer, guard_serializer, staff_serializer
+from app.api.schedules import schedule_list_serializer
+
+
+router = APIRouter()
+
+# entity -> (model, serializer, เงื่อนไขที่ยังถือว่า "มีอยู่")
+SYNC_ENTITIES = {
+    "customers": (Customer, customer_serializer, None),
+    "sites": (Site, site_serializer, None),
+    "guards": (Guard, guard_serializer, None),
+    "staff": (Staff, staff_serializer, None),
+    # ตารางงานที่ถูก soft delete ส่งเป็น tombstone
+    "schedules": (Schedule, schedule_list_serializer, Schedule.isActive == True),
+}
+
+
+@router.get("/{entity}")
+async def sync_entity(  # type: ignore
+    entity: str,
+    since: Optional[int] = Query(None, ge=0, description="watermark จากการ sync ครั้งก่อน (ไม่ระบุ = ทั้งหมด)"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    รายการที่เปลี่ยนตั้งแต่ watermark ก่อนหน้า
+
+    Response: {"entity", "watermark", "full", "changed": [...], "deleted": [ids]}
+    - full=true: changed คือข้อมูลทั้งหมด (client ควรแทนที่ข้อมูลในเครื่อง) - รวมกรณี
+      since เก่ากว่าช่วงที่ change_log ยังเก็บไว้
+    - เก็บ watermark ไว้ส่งเป็น since ในครั้งถัดไป
+    """
+    if entity not in SYNC_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"ไม่รองรับการ sync ข้อมูล {entity}")
+    model, serializer, visible = SYNC_ENTITIES[entity]
+
+    # อ่าน watermark ก่อน - การเปลี่ยนแปลงที่ txid < watermark จบแล้วทั้งหมด
+    watermark = (await db.execute(
+        text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+    )).scalar_one()
+
+    query = select(*serializer.columns(model)).order_by(model.id)
+    if visible is not None:
+        query = query.where(visible)
+
+    changed_ids = []
+    if since is not None and since <= watermark:
+        changed_ids = (await db.execute(
+            select(ChangeLog.entityId).distinct().where(
+                ChangeLog.entity == entity,
+                ChangeLog.txid >= since,
+                ChangeLog.txid < watermark
+            )
+        )).scalars().all()
+        # อ่าน horizon หลัง change_log - แถวที่อ่านได้ก่อนการลบ commit ยังครบ
+        if since < await change_log_horizon(db):
+            since = None
+
+    # ไม่ระบุ since / since มากกว่า watermark (เช่น restore ฐานข้อมูล)
+    # / change_log ช่วงนั้นถูกลบไปแล้ว -> ส่งทั้งหมด
+    if since is None or since > watermark:
+        result = await db.execute(query)
+        return FastJSONResponse({
+            "entity": entity,
+            "watermark": watermark,
+            "full": True,
+            "changed": serializer.to_dicts(result.all()),
+            "deleted": []
+        })
+
+    rows = []
+    if changed_ids:
+        result = await db.execute(query.where(model.id.in_(changed_ids)))
+        rows = result.all()
+    found = {row.id for row in rows}
+    to_id = serializer.converters.get("id") or (lambda value: value)
+
+    return FastJSONResponse({
+        "entity": entity,
+        "watermark": watermark,
+        "full": False,
+        "changed": serializer.to_dicts(rows),
+        "deleted": [to_id(entity_id) for entity_id in sorted(set(changed_ids) - found)]
+    })
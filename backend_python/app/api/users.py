@@ -7,6 +7,7 @@ from app.core.security import get_password_hash
 from app.core.deps import get_current_active_user, require_role
 from app.database import get_db
 from app.models.user import User, Role
+from app.core.reference_data import reference_cache, bump_reference_version
 import json
 
 
@@ -242,17 +243,7 @@ async def get_roles(
     db: AsyncSession = Depends(get_db)
 ):
     """Get all roles"""
-    result = await db.execute(select(Role).order_by(Role.id))
-    roles = result.scalars().all()
-    
-    return [
-        {
-            "id": role.roleId,  # Use roleId string as ID for frontend
-            "name": role.name,
-            "permissions": json.loads(role.permissions) if role.permissions else []
-        }
-        for role in roles
-    ]
+    return await reference_cache.rows(db, "roles")
 
 
 @router.post("/roles", response_model=RoleResponse, dependencies=[Depends(require_role("Admin"))])
@@ -278,6 +269,7 @@ async def create_role(
     )
     
     db.add(new_role)
+    await bump_reference_version(db, "roles")
     await db.commit()
     await db.refresh(new_role)
     
@@ -307,6 +299,7 @@ async def update_role(
     if role_data.permissions is not None:
         role.permissions = json.dumps(role_data.permissions)
         
+    await bump_reference_version(db, "roles")
     await db.commit()
     await db.refresh(role)
     
@@ -343,6 +336,7 @@ async def delete_role(
         )
         
     await db.delete(role)
+    await bump_reference_version(db, "roles")
     await db.commit()
     
     return {"message": "Role deleted successfully"}
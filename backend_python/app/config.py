@@ -16,6 +16,9 @@ class Settings(BaseSettings):
     # Environment
     ENVIRONMENT: str = "development"
     
+    # /metrics - ถ้ากำหนด ต้องส่ง Authorization: Bearer <METRICS_TOKEN>
+    METRICS_TOKEN: Optional[str] = None
+    
     # CORS - comma separated origins (e.g., "http://localhost:5173,http://192.168.1.172:5173")
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:5174,http://localhost:3000"
     
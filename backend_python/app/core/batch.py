@@ -0,0 +1,151 @@
+"""
+In-process batch dispatch
+รัน GET หลายรายการผ่าน router เดิมภายใน HTTP request เดียว (POST /api/batch)
+
+ทุก sub-request ใช้ผู้ใช้ที่ยืนยันตัวตนแล้วของ batch (ไม่ query users ซ้ำ) และ
+AsyncSession เดียวกัน - sub-request รันพร้อมกัน แต่คำสั่งที่ส่งไปฐานข้อมูลผ่าน
+session ร่วมถูกส่งทีละคำสั่ง (connection เดียวรันหลายคำสั่งพร้อมกันไม่ได้)
+งานที่ไม่แตะฐานข้อมูล (cache ข้อมูลอ้างอิง, serialize JSON) จึงทำงานซ้อนกันได้
+
+sub-response ต้องเป็น JSON - route ที่ stream (SSE, NDJSON, CSV, ไฟล์เอกสาร) ถูกตัดทันที
+ที่เริ่มส่ง response (406) และแต่ละ sub-request มีเวลาไม่เกิน SUB_REQUEST_TIMEOUT (504)
+"""
+import asyncio
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.serialization import dumps
+from app.models.user import User
+
+
+# scope key ที่ get_db / get_current_user ใช้ตรวจว่าเป็น sub-request
+SCOPE_KEY = "batch"
+# header ของ sub-response ที่ส่งกลับให้ client
+FORWARDED_HEADERS = ("etag", "x-next-cursor", "last-modified")
+# เวลาสูงสุดของแต่ละ sub-request (วินาที)
+SUB_REQUEST_TIMEOUT = 15
+
+
+class SharedSession:
+    """
+    AsyncSession ที่หลาย sub-request ใช้ร่วมกัน - method ที่ส่งคำสั่งไปฐานข้อมูลถูก serialize ด้วย lock
+    close / invalidate / reset ไม่มีผล (handler บางตัวปิด session ก่อน stream) - session ถูกปิดโดย batch เอง
+    """
+
+    LOCKED = {
+        "execute", "scalar", "scalars", "get", "refresh", "flush", "commit", "rollback",
+        "stream", "stream_scalars", "connection",
+    }
+    NOOP = {"close", "invalidate", "reset"}
+
+    def __init__(self, session: AsyncSession):
+        self._session = session
+        self._lock = asyncio.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self.NOOP:
+            async def noop(*args: Any, **kwargs: Any) -> None:
+                return None
+            return noop
+
+        attr = getattr(self._session, name)
+        if name not in self.LOCKED:
+            return attr
+
+        async def locked(*args: Any, **kwargs: Any) -> Any:
+            async with self._lock:
+                return await attr(*args, **kwargs)
+        return locked
+
+
+class BatchContext:
+    """ผู้ใช้ + session ของ batch (เก็บใน ASGI scope ของทุก sub-request)"""
+
+    def __init__(self, user: User, session: AsyncSession):
+        self.user = user
+        self.session = SharedSession(session)
+
+
+async def _dispatch(app: Any, parent_scope: Dict[str, Any], context: BatchContext, path: str) -> Tuple[int, Dict[str, str], bytes]:
+    """เรียก ASGI app โดยตรง (ผ่าน middleware / exception handler เดิม) แล้วเก็บ response"""
+    path, _, query = path.partition("?")
+    headers: List[Tuple[bytes, bytes]] = [
+        (name, value) for name, value in parent_scope["headers"]
+        if name in (b"authorization", b"user-agent")
+    ]
+    # sub-request ได้ JSON เสมอ (ไม่ใช่ NDJSON stream)
+    headers.append((b"accept", b"application/json"))
+    scope = {
+        **{key: parent_scope[key] for key in ("type", "http_version", "scheme", "server", "client", "root_path") if key in parent_scope},
+        "method": "GET",
+        "path": path,
+        "raw_path": quote(path).encode("ascii"),
+        "query_string": query.encode("latin-1"),
+        "headers": headers,
+        "state": {},
+        SCOPE_KEY: context,
+    }
+    status = 500
+    response_headers: Dict[str, str] = {}
+    body: List[bytes] = []
+    request_sent = False
+    rejected = False
+    disconnected = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # ไม่มี body เพิ่ม - response ที่รอฟัง disconnect (StreamingResponse / FileResponse)
+        # จะได้ http.disconnect เมื่อ sub-request ถูกตัด
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status, rejected
+        if rejected:
+            return
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for name, value in message.get("headers", []):
+                response_headers[name.decode("latin-1").lower()] = value.decode("latin-1")
+            if not response_headers.get("content-type", "").startswith("application/json"):
+                rejected = True
+                disconnected.set()
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    try:
+        await asyncio.wait_for(app(scope, receive, send), SUB_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return 504, {}, dumps({"detail": f"sub-request ใช้เวลาเกิน {SUB_REQUEST_TIMEOUT} วินาที"})
+    finally:
+        disconnected.set()
+    if rejected:
+        return 406, {}, dumps({"detail": "batch รองรับเฉพาะ response แบบ JSON (ไม่รองรับ stream / ไฟล์)"})
+    return status, response_headers, b"".join(body)
+
+
+async def run_batch(app: Any, parent_scope: Dict[str, Any], context: BatchContext, requests: List[Any]) -> bytes:
+    """
+    รันทุก sub-request พร้อมกัน แล้วประกอบ JSON response
+
+    Returns:
+        {"responses": [{"id", "status", "headers", "body"}, ...]} ตามลำดับที่ส่งมา
+        (body ของ sub-response ถูกต่อเข้าไปตรงๆ ไม่ parse ซ้ำ)
+    """
+    results = await asyncio.gather(*[
+        _dispatch(app, parent_scope, context, request.path) for request in requests
+    ])
+    parts = []
+    for request, (status, headers, body) in zip(requests, results):
+        payload = body or b"null"
+        forwarded = {name: headers[name] for name in FORWARDED_HEADERS if name in headers}
+        parts.append(
+            b'{"id":' + dumps(request.id) + b',"status":' + str(status).encode()
+            + b',"headers":' + dumps(forwarded) + b',"body":' + payload + b"}"
+        )
+    return b'{"responses":[' + b",".join(parts) + b"]}"
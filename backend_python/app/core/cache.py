@@ -0,0 +1,137 @@
+"""
+In-process result cache
+เก็บผลลัพธ์ที่คำนวณแพง (เช่นรายงาน) โดยผูกกับ watermark ของข้อมูล
+ถ้า watermark เปลี่ยน (มีการแก้ไขข้อมูล) ผลลัพธ์เดิมจะไม่ถูกใช้
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import cache_counters
+
+
+class WatermarkCache:
+    """LRU cache ที่แต่ละรายการผูกกับ watermark ณ ตอนคำนวณ"""
+
+    def __init__(self, maxsize: int = 64, name: str = "watermark"):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter, self._miss_counter = cache_counters(name)
+
+    def get(self, key: Hashable, watermark: Any) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None or item[0] != watermark:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        self._hit_counter.inc()
+        return item[1]
+
+    def set(self, key: Hashable, watermark: Any, value: Any) -> None:
+        self._items[key] = (watermark, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class ResponseCache:
+    """
+    LRU cache ของ response ที่ serialize แล้ว (bytes + ETag) จำกัดตามขนาดหน่วยความจำ
+
+    แต่ละ key มี generation ที่เพิ่มขึ้นทุกครั้งที่ invalidate - ผู้อ่านที่เริ่ม
+    query ก่อนการแก้ไขจะไม่สามารถเขียนผลลัพธ์เก่าทับลงไปได้
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, name: str = "response"):
+        self.max_bytes = max_bytes
+        self._hit_counter, self._miss_counter = cache_counters(name)
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(key, 0)
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        self._hit_counter.inc()
+        return item
+
+    def set(self, key: Hashable, body: bytes, generation: Tuple[int, int]) -> Tuple[bytes, str]:
+        item = (body, make_etag(body))
+        if generation != self.generation(key) or len(body) > self.max_bytes:
+            return item
+        self._discard(key)
+        self._items[key] = item
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, (old_body, _) = self._items.popitem(last=False)
+            self._bytes -= len(old_body)
+        return item
+
+    def invalidate(self, key: Hashable) -> None:
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if self._discard(key):
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        # เปลี่ยน epoch เพื่อให้ผู้อ่านที่กำลัง query อยู่ทุก key เขียนผลลัพธ์ไม่ได้
+        self._epoch += 1
+        self._generations.clear()
+        self.invalidations += len(self._items)
+        self._items.clear()
+        self._bytes = 0
+
+    def _discard(self, key: Hashable) -> bool:
+        item = self._items.pop(key, None)
+        if item is None:
+            return False
+        self._bytes -= len(item[0])
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self._bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "notModified": self.not_modified,
+            "invalidations": self.invalidations
+        }
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag จากเนื้อหา response"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """ตรวจสอบ header If-None-Match (รองรับหลายค่าและ *)"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,84 @@
+"""
+Change log retention
+change_log (เขียนโดย trigger ของ customers, sites, guards, staff, schedules) ถูกอ่านโดย
+/api/sync, การสแกนคุณภาพข้อมูล และ index ค้นหาในหน่วยความจำ - งาน change_log_retention
+ลบแถวเก่าเป็นรอบผ่าน periodic_jobs
+
+แต่ละรอบบันทึก checkpoint (xmin ของ snapshot + เวลา) แล้วลบแถวที่ txid ต่ำกว่า checkpoint
+ของ RETENTION_DAYS วันก่อน (ไม่ต้องมี index ตามเวลา) ยกเว้นแถวที่การสแกนคุณภาพข้อมูล
+ครั้งล่าสุดยังต้องใช้ (เก็บไว้ไม่เกิน MAX_RETENTION_DAYS วัน)
+
+horizon = txid ที่แถวก่อนหน้าถูกลบไปแล้ว - ผู้ใช้ที่ watermark ต่ำกว่านี้ต้องโหลดใหม่ทั้งหมด
+(/api/sync ส่ง full=true, การสแกนเป็นแบบ full, index ค้นหาสร้างใหม่)
+"""
+from datetime import timedelta
+from typing import Any, Dict
+
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.periodic import periodic_jobs
+from app.models.change_log import ChangeLog, ChangeLogCheckpoint, TRACKED_TABLES
+from app.models.data_quality import DataQualityScan
+
+
+RETENTION_DAYS = 30
+MAX_RETENTION_DAYS = 90
+RETENTION_INTERVAL = 3600  # วินาที
+RETENTION_LOCK_KEY = 4501
+
+
+async def change_log_horizon(db: AsyncSession) -> int:
+    """txid ที่แถว change_log ก่อนหน้าถูกลบไปแล้ว (0 = ยังไม่เคยลบ)"""
+    result = await db.execute(
+        select(func.coalesce(func.max(ChangeLogCheckpoint.txid), 0)).where(ChangeLogCheckpoint.pruned == True)
+    )
+    return result.scalar_one()
+
+
+async def _checkpoint_before(db: AsyncSession, days: int) -> Any:
+    """txid ของ checkpoint ล่าสุดที่เก่ากว่า days วัน (None = ยังไม่มี)"""
+    result = await db.execute(
+        select(func.max(ChangeLogCheckpoint.txid)).where(
+            ChangeLogCheckpoint.pruned == False,
+            ChangeLogCheckpoint.createdAt <= func.now() - timedelta(days=days)
+        )
+    )
+    return result.scalar()
+
+
+async def prune_change_log(db: AsyncSession) -> Dict[str, int]:
+    """บันทึก checkpoint แล้วลบแถวที่เก่ากว่า horizon ใหม่ (ไม่ commit)"""
+    xmin = (await db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))).scalar_one()
+    db.add(ChangeLogCheckpoint(txid=xmin))
+
+    horizon = await change_log_horizon(db)
+    cutoff = await _checkpoint_before(db, RETENTION_DAYS)
+    if cutoff is None:
+        return {"horizon": horizon, "deleted": 0}
+
+    # การสแกนคุณภาพข้อมูลแบบ incremental ครั้งถัดไปอ่านตั้งแต่ watermark ของการสแกนล่าสุด
+    scan_watermark = (await db.execute(
+        select(DataQualityScan.watermark).order_by(DataQualityScan.id.desc()).limit(1)
+    )).scalar()
+    if scan_watermark is not None and scan_watermark < cutoff:
+        cutoff = max(scan_watermark, await _checkpoint_before(db, MAX_RETENTION_DAYS) or 0)
+    if cutoff <= horizon:
+        return {"horizon": horizon, "deleted": 0}
+
+    deleted = 0
+    for entity in TRACKED_TABLES:
+        # index (entity, txid)
+        result = await db.execute(delete(ChangeLog).where(ChangeLog.entity == entity, ChangeLog.txid < cutoff))
+        deleted += result.rowcount  # type: ignore[attr-defined]
+    db.add(ChangeLogCheckpoint(txid=cutoff, pruned=True))
+    # checkpoint ที่ไม่ใช้แล้ว
+    await db.execute(delete(ChangeLogCheckpoint).where(
+        ChangeLogCheckpoint.txid < cutoff,
+        (ChangeLogCheckpoint.pruned == True)
+        | (ChangeLogCheckpoint.createdAt < func.now() - timedelta(days=MAX_RETENTION_DAYS + 1))
+    ))
+    return {"horizon": cutoff, "deleted": deleted}
+
+
+periodic_jobs.add_job("change_log_retention", RETENTION_INTERVAL, prune_change_log, RETENTION_LOCK_KEY)
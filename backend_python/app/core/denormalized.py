@@ -0,0 +1,248 @@
+"""
+Denormalized name propagation
+คอลัมน์ที่คัดลอกชื่อมาเก็บไว้ (Site.customerCode/customerName, Schedule.siteName,
+schedule_guards.siteName/guardName) ต้องตามต้นทางเมื่อมีการแก้ไขชื่อ
+
+- propagate(): หลังแก้ไขลูกค้า/หน่วยงาน/พนักงาน อัปเดตแถวที่อ้างอิงด้วย UPDATE ... FROM
+  ทีละ batch (transaction สั้น ไม่ lock ทั้งตาราง) ใน background task
+- ConsistencyChecker: ไล่ตรวจทีละช่วง id ของตารางปลายทาง แล้วซ่อมแถวที่ไม่ตรง
+  (เช่นแก้ไขผ่าน SQL โดยตรง หรือ background task หายไปตอน worker restart)
+  ตำแหน่งที่ตรวจถึงเก็บในตาราง consistency_cursors - worker ที่ได้ lock รอบไหนก็ตรวจต่อจากจุดเดิม
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select, text, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models.consistency_cursor import ConsistencyCursor
+from app.core.schedule_events import publish_names_changed
+from app.core.periodic import periodic_jobs, advisory_session
+from app.core.metrics import track_task
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+CHECK_CHUNK_SIZE = 5000
+CHECK_INTERVAL = 60  # วินาที
+# advisory lock ของตัวตรวจ (ทำงานทีละ worker)
+CHECK_LOCK_KEY = 4101
+
+
+class Propagation:
+    """คอลัมน์ของ target ที่คัดลอกมาจาก source (join ด้วย target.<key> = source.id)"""
+
+    def __init__(self, name: str, source: str, target: str, key: str, assignments: Dict[str, str]):
+        self.name = name
+        self.source = source
+        self.target = target
+        self.key = key
+        self.assignments = assignments
+
+    @property
+    def set_clause(self) -> str:
+        return ", ".join(f"{column} = {value}" for column, value in self.assignments.items())
+
+    @property
+    def drift_condition(self) -> str:
+        return " OR ".join(f"t.{column} IS DISTINCT FROM {value}" for column, value in self.assignments.items())
+
+
+PROPAGATIONS: List[Propagation] = [
+    Propagation("sites.customer", "customers", "sites", '"customerId"', {
+        '"customerCode"': "s.code",
+        '"customerName"': "s.name",
+    }),
+    Propagation("schedules.site", "sites", "schedules", '"siteId"', {
+        '"siteName"': "s.name",
+    }),
+    Propagation("schedule_guards.site", "sites", "schedule_guards", '"siteId"', {
+        '"siteName"': "s.name",
+    }),
+    # เหมือน schedule_conflicts.build_guard_rows (ชื่อ + นามสกุล ไม่มีคำนำหน้า)
+    Propagation("schedule_guards.guard", "guards", "schedule_guards", "guard_id_fk", {
+        '"guardName"': """btrim(coalesce(s."firstName", '') || ' ' || coalesce(s."lastName", ''))""",
+    }),
+]
+
+# ฟิลด์ของ source ที่ถูกคัดลอก - แก้ไขฟิลด์อื่นไม่ต้อง propagate
+SOURCE_FIELDS: Dict[str, Set[str]] = {
+    "customers": {"code", "name"},
+    "sites": {"name"},
+    "guards": {"firstName", "lastName"},
+}
+
+
+async def _propagate_one(propagation: Propagation, source_ids: List[int], batch_size: int) -> int:
+    """UPDATE ... FROM ทีละ batch (commit ทุก batch) จนไม่เหลือแถวที่ไม่ตรง"""
+    statement = text(f"""
+        WITH batch AS (
+            SELECT t.id FROM {propagation.target} t
+            JOIN {propagation.source} s ON s.id = t.{propagation.key}
+            WHERE s.id = ANY(:ids) AND ({propagation.drift_condition})
+            LIMIT :batch_size
+        )
+        UPDATE {propagation.target} t SET {propagation.set_clause}
+        FROM batch, {propagation.source} s
+        WHERE t.id = batch.id AND s.id = t.{propagation.key}
+    """)
+    total = 0
+    async with async_session_maker() as session:
+        while True:
+            result = await session.execute(statement, {"ids": source_ids, "batch_size": batch_size})
+            if result.rowcount:  # type: ignore[attr-defined]
+                await publish_names_changed(session, propagation.target)
+            await session.commit()
+            total += result.rowcount  # type: ignore[attr-defined]
+            if result.rowcount < batch_size:  # type: ignore[attr-defined]
+                return total
+
+
+async def propagate(source: str, source_ids: Iterable[int], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    อัปเดตคอลัมน์ที่คัดลอกมาจาก source ทุกตารางปลายทาง
+
+    Returns:
+        propagation name -> จำนวนแถวที่อัปเดต
+    """
+    ids = sorted(set(source_ids))
+    updated = {}
+    for propagation in PROPAGATIONS:
+        if propagation.source == source and ids:
+            updated[propagation.name] = await _propagate_one(propagation, ids, batch_size)
+    return updated
+
+
+_tasks: Set["asyncio.Task[Any]"] = set()
+
+
+def schedule_propagation(source: str, source_ids: Iterable[int], changed_fields: Iterable[str]) -> None:
+    """
+    เรียกหลัง commit การแก้ไข source - รันใน background (ไม่รอ response)
+    ถ้า task หายไป (worker restart) ConsistencyChecker จะซ่อมให้ภายหลัง
+    """
+    if not SOURCE_FIELDS.get(source, set()) & set(changed_fields):
+        return
+
+    async def run() -> None:
+        try:
+            updated = await propagate(source, source_ids)
+            if any(updated.values()):
+                logger.info(f"Propagated {source} names: {updated}")
+        except Exception as exc:
+            logger.warning(f"Name propagation failed ({source}): {exc}")
+
+    task = asyncio.create_task(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    track_task("name_propagation", task)
+
+
+class ConsistencyChecker:
+    """
+    Incremental drift scan: each pass checks the next CHECK_CHUNK_SIZE ids of
+    every dependent table (เริ่มใหม่จากต้นตารางเมื่อถึงท้ายตาราง) and repairs
+    rows whose copied columns differ from the source
+    """
+
+    def __init__(self, chunk_size: int = CHECK_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    async def stats(self, db: AsyncSession) -> Dict[str, Any]:
+        result = await db.execute(select(ConsistencyCursor))
+        cursors = {c.name: c for c in result.scalars().all()}
+        names = [p.name for p in PROPAGATIONS]
+        return {
+            "cursors": {name: cursors[name].lastId if name in cursors else 0 for name in names},
+            "repaired": {name: cursors[name].repaired if name in cursors else 0 for name in names},
+            "sweeps": {name: cursors[name].sweeps if name in cursors else 0 for name in names},
+            "checkedAt": {name: cursors[name].checkedAt if name in cursors else None for name in names},
+        }
+
+    @staticmethod
+    async def _cursors(session: AsyncSession, names: Iterable[str]) -> Dict[str, ConsistencyCursor]:
+        """แถวของ consistency_cursors (สร้างใหม่ถ้ายังไม่มี) - เรียกใน session ที่ถือ CHECK_LOCK_KEY"""
+        names = list(names)
+        result = await session.execute(select(ConsistencyCursor).where(ConsistencyCursor.name.in_(names)))
+        cursors = {c.name: c for c in result.scalars().all()}
+        for name in names:
+            if name not in cursors:
+                cursors[name] = ConsistencyCursor(name=name, lastId=0, repaired=0, sweeps=0)
+                session.add(cursors[name])
+        return cursors
+
+    async def _check_chunk(self, session: AsyncSession, propagation: Propagation, cursor: ConsistencyCursor) -> int:
+        after = cursor.lastId
+        upper = (await session.execute(
+            text(f"SELECT max(id) FROM (SELECT id FROM {propagation.target} WHERE id > :after ORDER BY id LIMIT :chunk) c"),
+            {"after": after, "chunk": self.chunk_size}
+        )).scalar()
+        if upper is None:
+            # ถึงท้ายตาราง - รอบถัดไปเริ่มใหม่
+            cursor.lastId = 0  # type: ignore[assignment]
+            cursor.sweeps += 1  # type: ignore[assignment]
+            cursor.checkedAt = func.now()  # type: ignore[assignment]
+            return 0
+
+        result = await session.execute(
+            text(f"""
+                UPDATE {propagation.target} t SET {propagation.set_clause}
+                FROM {propagation.source} s
+                WHERE t.id > :after AND t.id <= :upper
+                  AND s.id = t.{propagation.key}
+                  AND ({propagation.drift_condition})
+            """),
+            {"after": after, "upper": upper}
+        )
+        cursor.lastId = upper
+        cursor.checkedAt = func.now()  # type: ignore[assignment]
+        return result.rowcount  # type: ignore[attr-defined]
+
+    async def run_once(self, session: AsyncSession, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """ตรวจหนึ่งช่วงของทุกตาราง (หรือเฉพาะ names) ใน session ที่ถือ CHECK_LOCK_KEY - คืนจำนวนแถวที่ซ่อม"""
+        selected = [p for p in PROPAGATIONS if names is None or p.name in set(names)]
+        cursors = await self._cursors(session, (p.name for p in selected))
+        repaired = {}
+        for propagation in selected:
+            cursor = cursors[propagation.name]
+            count = await self._check_chunk(session, propagation, cursor)
+            repaired[propagation.name] = count
+            cursor.repaired += count  # type: ignore[assignment]
+            if count:
+                await publish_names_changed(session, propagation.target)
+        if any(repaired.values()):
+            logger.warning(f"Repaired denormalized name drift: {repaired}")
+        return repaired
+
+    async def check_all(self) -> Dict[str, int]:
+        """ตรวจทั้งตาราง (ใช้จาก API / หลัง migration)"""
+        totals = {p.name: 0 for p in PROPAGATIONS}
+        pending = set(totals)
+        restart = True
+        while pending:
+            async with advisory_session(CHECK_LOCK_KEY) as session:
+                if session is None:
+                    # worker อื่นกำลังตรวจอยู่
+                    await asyncio.sleep(1)
+                    continue
+                cursors = await self._cursors(session, pending)
+                if restart:
+                    for cursor in cursors.values():
+                        cursor.lastId = 0  # type: ignore[assignment]
+                    restart = False
+                repaired = await self.run_once(session, pending)
+                finished = {name for name, cursor in cursors.items() if cursor.lastId == 0}
+                await session.commit()
+            for name, count in repaired.items():
+                totals[name] += count
+            pending -= finished
+        return totals
+
+
+# Global checker instance (รันเป็นรอบผ่าน periodic_jobs)
+consistency_checker = ConsistencyChecker()
+
+periodic_jobs.add_job("denormalized_names", CHECK_INTERVAL, consistency_checker.run_once, CHECK_LOCK_KEY)
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,12 +13,18 @@ security = HTTPBearer()
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     Get current authenticated user from JWT token
+    (sub-request ของ POST /api/batch ใช้ผู้ใช้ที่ batch ยืนยันแล้ว - ไม่ query ซ้ำ)
     """
+    batch = request.scope.get("batch")
+    if batch is not None:
+        return batch.user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -0,0 +1,52 @@
+"""
+Expiry alerts
+ใบอนุญาตพนักงาน รปภ. (Guard.licenseExpiry) และสัญญาหน่วยงาน (Site.contractEndDate)
+ที่จะหมดอายุภายใน ALERT_WINDOW_DAYS วัน (รวมที่หมดไปแล้วไม่เกิน OVERDUE_DAYS วัน)
+
+งานรันเป็นรอบผ่าน periodic_jobs (ทีละ worker) - range scan บน index ของคอลัมน์วันที่
+แล้วแทนที่ข้อมูลทั้งหมดในตาราง alerts ใน transaction เดียว GET /api/alerts จึงอ่าน
+แค่ตารางเล็ก ๆ นี้
+"""
+from datetime import date, timedelta
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.periodic import periodic_jobs
+
+
+ALERT_WINDOW_DAYS = 60
+OVERDUE_DAYS = 30
+ALERT_INTERVAL = 3600  # วินาที
+ALERT_LOCK_KEY = 4301
+
+# type -> (entity, คอลัมน์วันที่, รหัส, ชื่อ)
+ALERT_SOURCES = {
+    "license_expiry": ("guards", '"licenseExpiry"', '"guardId"',
+                       """coalesce(title, '') || "firstName" || ' ' || "lastName\""""),
+    "contract_end": ("sites", '"contractEndDate"', '"siteCode"', "name"),
+}
+
+
+async def refresh_alerts(db: AsyncSession, window_days: int = ALERT_WINDOW_DAYS) -> Dict[str, int]:
+    """แทนที่ตาราง alerts ด้วยรายการที่หมดอายุในช่วง [วันนี้ - OVERDUE_DAYS, วันนี้ + window_days] (ไม่ commit)"""
+    today = date.today()
+    params = {"start": today - timedelta(days=OVERDUE_DAYS), "end": today + timedelta(days=window_days)}
+    await db.execute(text("DELETE FROM alerts"))
+    counts = {}
+    for alert_type, (entity, date_column, code, name) in ALERT_SOURCES.items():
+        result = await db.execute(
+            text(f"""
+                INSERT INTO alerts (type, entity, "entityId", code, name, "expiresOn")
+                SELECT '{alert_type}', '{entity}', id, {code}, {name}, {date_column}
+                FROM {entity}
+                WHERE {date_column} BETWEEN :start AND :end AND "isActive" = true
+            """),
+            params
+        )
+        counts[alert_type] = result.rowcount  # type: ignore[attr-defined]
+    return counts
+
+
+periodic_jobs.add_job("expiry_alerts", ALERT_INTERVAL, refresh_alerts, ALERT_LOCK_KEY, initial_delay=0)
@@ -0,0 +1,229 @@
+"""
+Content-addressed file storage (เอกสารสัญญาหน่วยงาน)
+ไฟล์เก็บตาม SHA-256 ของเนื้อหา: uploads/contracts/<2 ตัวแรก>/<sha256> - เอกสารที่เนื้อหา
+เหมือนกันเก็บครั้งเดียว ชื่อไฟล์ต้นฉบับ (และนามสกุล) อยู่ใน Site.contractFileName
+
+- receive_upload(): parse multipart จาก request stream เอง - นับขนาดระหว่างรับข้อมูล
+  เกิน MAX_FILE_SIZE ตัดการอ่านทันที (413) ไม่ต้องรอรับไฟล์ทั้งหมดก่อน
+- store_upload(): hash + คัดลอกเป็น chunk ลงไฟล์ชั่วคราวใน worker thread แล้ว rename
+  เป็น path ของ hash (event loop ไม่ถูกบล็อกระหว่างเขียนไฟล์ใหญ่)
+- collect_garbage(): ลบไฟล์ (และภาพตัวอย่าง) ที่ไม่มีหน่วยงานใดอ้างอิง
+  (แทนที่ไฟล์ / ลบเอกสาร / ลบหน่วยงาน) รันเป็นรอบผ่าน periodic_jobs
+- file_response(): ส่งไฟล์พร้อม strong ETag (= SHA-256), Last-Modified, 304 และ Range
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Set
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.core.cache import etag_matches
+from app.core.periodic import periodic_jobs
+from app.models.site import Site
+
+
+STORE_DIR = "uploads/contracts"
+TMP_DIR = os.path.join(STORE_DIR, "tmp")
+# ภาพตัวอย่างของเอกสาร (app.core.previews) - ชื่อไฟล์ขึ้นต้นด้วย SHA-256 ของเอกสาร
+PREVIEW_DIR = "uploads/previews"
+MAX_FILE_SIZE = 50 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# boundary + header ของ multipart ที่ยอมให้เกินขนาดไฟล์
+MULTIPART_OVERHEAD = 64 * 1024
+# ไฟล์ที่เพิ่งเขียน (upload ที่ยังไม่ commit) ไม่ถูกลบ
+GC_GRACE_SECONDS = 3600
+GC_INTERVAL = 6 * 3600  # วินาที
+GC_LOCK_KEY = 4401
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+# เปิดดูใน browser ได้ (Content-Disposition: inline)
+INLINE_MEDIA_TYPES = ("application/pdf", "image/")
+
+
+class StoredFile:
+    def __init__(self, path: str, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+
+def object_path(sha256: str) -> str:
+    return os.path.join(STORE_DIR, sha256[:2], sha256)
+
+
+def content_hash(path: str) -> Optional[str]:
+    """SHA-256 จาก path ของไฟล์ใน store (None = ไฟล์แบบเดิมที่ไม่ได้เก็บตาม hash)"""
+    name = os.path.basename(path)
+    return name if SHA256_PATTERN.fullmatch(name) else None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"ไฟล์มีขนาดเกิน {MAX_FILE_SIZE // (1024 * 1024)} MB"
+    )
+
+
+async def _limited_stream(request: Request, limit: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _too_large()
+        yield chunk
+
+
+async def receive_upload(request: Request, field: str = "file") -> UploadFile:
+    """อ่านไฟล์หนึ่งไฟล์จาก multipart/form-data พร้อมจำกัดขนาดระหว่างรับข้อมูล"""
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="ต้องส่งไฟล์แบบ multipart/form-data")
+    limit = MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise _too_large()
+
+    parser = MultiPartParser(request.headers, _limited_stream(request, limit), max_files=1, max_fields=10)
+    try:
+        form = await parser.parse()
+    except MultiPartException as exc:
+        raise HTTPException(status_code=400, detail=exc.message)
+    upload = form.get(field)
+    if not isinstance(upload, UploadFile):
+        raise HTTPException(status_code=400, detail=f"ไม่พบไฟล์ในฟิลด์ '{field}'")
+    return upload
+
+
+def write_object(source: BinaryIO) -> StoredFile:
+    """(รันใน thread) คัดลอก + hash ทีละ chunk แล้ว rename ไปที่ path ของ hash"""
+    os.makedirs(TMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    source.seek(0)
+    fd, tmp_path = tempfile.mkstemp(dir=TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise _too_large()
+                digest.update(chunk)
+                target.write(chunk)
+        sha256 = digest.hexdigest()
+        path = object_path(sha256)
+        if os.path.exists(path):
+            # มีเอกสารนี้อยู่แล้ว - ต่ออายุไม่ให้ GC ลบก่อนที่ upload นี้จะ commit
+            os.utime(path)
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return StoredFile(path, sha256, size)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+async def store_upload(upload: UploadFile) -> StoredFile:
+    """บันทึก upload ลง store (ไฟล์ที่เนื้อหาซ้ำใช้ไฟล์เดิม)"""
+    try:
+        return await anyio.to_thread.run_sync(write_object, upload.file)
+    finally:
+        await upload.close()
+
+
+def _not_modified_since(request: Request, mtime: float) -> bool:
+    value = request.headers.get("if-modified-since")
+    if not value:
+        return False
+    try:
+        return int(mtime) <= parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+async def file_response(
+    request: Request,
+    path: str,
+    filename: Optional[str],
+    etag: Optional[str] = None,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    ส่งไฟล์จาก store - MIME type ตามนามสกุลของ filename, 304 เมื่อ If-None-Match /
+    If-Modified-Since ตรง และ Range / If-Range (FileResponse - ใช้ pathsend ถ้า server รองรับ)
+    etag ค่าเริ่มต้น = SHA-256 จาก path
+    """
+    try:
+        stat_result = await anyio.Path(path).stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="ไฟล์เอกสารไม่พบในระบบ")
+
+    sha256 = content_hash(path)
+    media_type = mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+    headers = {
+        **(extra_headers or {}),
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if etag is None and sha256:
+        etag = f'"{sha256}"'
+    if etag:
+        headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if "ETag" in headers and if_none_match:
+        not_modified = etag_matches(if_none_match, headers["ETag"])
+    else:
+        not_modified = _not_modified_since(request, stat_result.st_mtime)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path=path,
+        filename=filename or "contract_file",
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
+        content_disposition_type="inline" if media_type.startswith(INLINE_MEDIA_TYPES) else "attachment",
+    )
+
+
+def _remove_unreferenced(referenced: Set[str], older_than: float) -> Dict[str, int]:
+    removed = kept = 0
+    hashes = {content_hash(path) for path in referenced}
+    for directory in (STORE_DIR, PREVIEW_DIR):
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.normpath(os.path.join(root, name))
+                if path in referenced or (directory == PREVIEW_DIR and name.split(".")[0] in hashes):
+                    kept += 1
+                    continue
+                try:
+                    if os.path.getmtime(path) < older_than:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+    return {"removed": removed, "kept": kept}
+
+
+async def collect_garbage(db: AsyncSession, grace_seconds: float = GC_GRACE_SECONDS) -> Dict[str, Any]:
+    """ลบไฟล์ใน store ที่ไม่มี Site.contractFilePath อ้างอิง และเก่ากว่า grace_seconds"""
+    result = await db.execute(select(Site.contractFilePath).where(Site.contractFilePath.isnot(None)).distinct())
+    referenced = {os.path.normpath(path) for path in result.scalars().all()}
+    return await anyio.to_thread.run_sync(_remove_unreferenced, referenced, time.time() - grace_seconds)
+
+
+periodic_jobs.add_job("contract_file_gc", GC_INTERVAL, collect_garbage, GC_LOCK_KEY)
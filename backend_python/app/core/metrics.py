@@ -0,0 +1,178 @@
+"""
+Prometheus metrics
+ค่าที่ส่งออกที่ GET /metrics (text format):
+
+- http_request_duration_seconds{method, route, status} - histogram ตาม route template
+  (เช่น /api/sites/{site_id} ไม่ใช่ id จริง) และ http_requests_in_progress
+- db_query_duration_seconds{operation} และ db_pool_* - จาก SQLAlchemy engine / pool events
+- cache_lookups_total{cache, result} - cache ในหน่วยความจำ (reference data, by_date, coverage)
+- background_tasks_pending{kind} - งาน background ที่ยังไม่เสร็จ
+
+หลาย worker process: ตั้ง PROMETHEUS_MULTIPROC_DIR (โฟลเดอร์ว่างที่ทุก worker เขียนได้)
+ก่อนเริ่ม server - แต่ละ process เขียนค่าลงไฟล์ mmap ของตัวเอง (ไม่มี lock ข้าม process)
+และ /metrics รวมค่าจากทุกไฟล์ตอนถูกเรียก
+"""
+import os
+import time
+from typing import Any, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.query_stats import record_query
+
+try:
+    # FastAPI รุ่นใหม่: route ของ include_router ไม่มี prefix - path เต็มอยู่ใน route context
+    from fastapi.routing import _get_scope_effective_route_context
+except ImportError:  # pragma: no cover - รุ่นเก่า route.path มี prefix อยู่แล้ว
+    _get_scope_effective_route_context = None  # type: ignore[assignment]
+
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled",
+    multiprocess_mode="livesum",
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement latency",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections checked out from the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity", "pool_size + max_overflow",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTS = Counter("db_pool_connects", "New database connections opened")
+CACHE_LOOKUPS = Counter("cache_lookups", "In-memory cache lookups", ["cache", "result"])
+BACKGROUND_TASKS = Gauge(
+    "background_tasks_pending", "Background tasks not yet finished",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+
+# นับเฉพาะคำสั่งประเภทนี้ (label ต้องมีค่าจำกัด)
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in SQL_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """ผูก event ของ engine / pool (เรียกครั้งเดียวตอน import)"""
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    capacity = getattr(pool, "size", lambda: 0)() + max(getattr(pool, "_max_overflow", 0), 0)
+    DB_POOL_CAPACITY.set(capacity)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_LATENCY.labels(_operation(statement)).observe(elapsed)
+        record_query(statement, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context: Any) -> None:
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_connection: Any, record: Any) -> None:
+        DB_POOL_CONNECTS.inc()
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection: Any, record: Any) -> None:
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def route_template(scope: Scope) -> str:
+    """path template ของ route ที่ตรงกับ request (เช่น /api/sites/{site_id}) หรือ "unmatched" """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    context = _get_scope_effective_route_context(scope) if _get_scope_effective_route_context else None
+    return getattr(context, "path", None) or getattr(route, "path", "unmatched")
+
+
+def cache_counters(name: str) -> "tuple[Any, Any]":
+    """(hit, miss) counter ของ cache หนึ่งตัว - bind label ไว้ก่อน ไม่ต้องหา label ทุกครั้ง"""
+    return CACHE_LOOKUPS.labels(name, "hit"), CACHE_LOOKUPS.labels(name, "miss")
+
+
+def track_task(kind: str, task: Any) -> None:
+    """นับ asyncio task ใน background_tasks_pending จนกว่าจะเสร็จ"""
+    gauge = BACKGROUND_TASKS.labels(kind)
+    gauge.inc()
+    task.add_done_callback(lambda _: gauge.dec())
+
+
+def render() -> "tuple[bytes, str]":
+    """(body, content type) ของ /metrics - รวมทุก worker ในโหมด multiprocess"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """เรียกตอน worker ปิด - ลบค่า gauge (livesum) ของ process นี้"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """ASGI middleware วัดเวลาแต่ละ request (route template มาจาก scope["route"] หลัง routing)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            HTTP_LATENCY.labels(
+                scope["method"],
+                route_template(scope),
+                str(status or 500),
+            ).observe(time.perf_counter() - started)
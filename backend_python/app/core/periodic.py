@@ -0,0 +1,146 @@
+"""
+In-process periodic job scheduler
+งานที่รันเป็นรอบ (ตรวจชื่อที่คัดลอกไว้, แจ้งเตือนวันหมดอายุ ...) ในทุก worker แต่ใช้
+PostgreSQL advisory lock ให้ทำงานจริงทีละ worker - worker ที่ไม่ได้ lock ข้ามรอบนั้นไป
+
+งานลงทะเบียนตอน import โมดูล (periodic_jobs.add_job) และเริ่มทำงานใน app lifespan
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def advisory_session(lock_key: int) -> AsyncIterator[Optional[AsyncSession]]:
+    """
+    Session ใหม่ที่ถือ transaction-level advisory lock (ปล่อยเมื่อ commit / rollback)
+    yield None ถ้า worker อื่นถือ lock อยู่
+    """
+    async with async_session_maker() as session:
+        locked = (await session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": lock_key}
+        )).scalar()
+        if not locked:
+            await session.rollback()
+            yield None
+        else:
+            yield session
+
+
+class PeriodicJob:
+    """งานหนึ่งรายการ + สถิติของ worker นี้"""
+
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        func: Callable[[AsyncSession], Awaitable[Any]],
+        lock_key: int,
+        initial_delay: float
+    ):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.lock_key = lock_key
+        self.initial_delay = initial_delay
+        self.runs = 0
+        self.skipped = 0
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "lastRun": self.last_run.isoformat() if self.last_run else None,
+            "lastError": self.last_error,
+        }
+
+
+class PeriodicScheduler:
+    """
+    One asyncio task per job; each run gets its own session holding the job's
+    advisory lock and is committed when the job returns
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, PeriodicJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_job(
+        self,
+        name: str,
+        interval: float,
+        func: Callable[[AsyncSession], Awaitable[Any]],
+        lock_key: int,
+        initial_delay: Optional[float] = None
+    ) -> None:
+        """
+        Args:
+            interval: วินาทีระหว่างรอบ
+            func: async (session) -> ผลลัพธ์ (ไม่ต้อง commit)
+            lock_key: advisory lock ของงาน (ไม่ซ้ำกับงานอื่น)
+            initial_delay: รอก่อนรอบแรก (ค่าเริ่มต้น = interval)
+        """
+        self._jobs[name] = PeriodicJob(
+            name, interval, func, lock_key, interval if initial_delay is None else initial_delay
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {**job.stats(), "running": name in self._tasks}
+            for name, job in self._jobs.items()
+        }
+
+    async def run_now(self, name: str) -> Optional[Any]:
+        """รันงานทันที - คืนผลลัพธ์ของงาน หรือ None ถ้า worker อื่นกำลังรันอยู่"""
+        job = self._jobs[name]
+        async with advisory_session(job.lock_key) as session:
+            if session is None:
+                job.skipped += 1
+                return None
+            result = await job.func(session)
+            await session.commit()
+        job.runs += 1
+        job.last_run = datetime.now(timezone.utc)
+        return result
+
+    def start(self) -> None:
+        for name, job in self._jobs.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._run(job))
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: PeriodicJob) -> None:
+        await asyncio.sleep(job.initial_delay)
+        while True:
+            try:
+                await self.run_now(job.name)
+                job.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                job.last_error = str(exc)
+                logger.warning(f"Periodic job {job.name} failed: {exc}")
+            await asyncio.sleep(job.interval)
+
+
+# Global scheduler instance (started in app lifespan)
+periodic_jobs = PeriodicScheduler()
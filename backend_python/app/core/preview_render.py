@@ -0,0 +1,95 @@
+"""
+Contract preview rendering (รันใน process pool)
+สร้างภาพตัวอย่างขนาดเล็กของหน้าแรก (PDF) หรือรูปย่อ (JPG / PNG) และนับจำนวนหน้า
+ใช้เฉพาะไลบรารีในเครื่อง (pypdfium2, Pillow) - โมดูลนี้ต้องไม่ import ส่วนอื่นของแอป
+เพื่อให้ worker process เริ่มได้เร็ว
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover - pypdfium2 อยู่ใน requirements.txt
+    pypdfium2 = None  # type: ignore[assignment]
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow อยู่ใน requirements.txt
+    Image = ImageOps = None  # type: ignore[assignment]
+
+
+PREVIEW_SIZE = (320, 480)
+JPEG_QUALITY = 70
+
+PDF_EXTENSIONS = {".pdf"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def supported(ext: str) -> bool:
+    if ext in PDF_EXTENSIONS:
+        return pypdfium2 is not None and Image is not None
+    return ext in IMAGE_EXTENSIONS and Image is not None
+
+
+def _render_pdf(source: str) -> "tuple[Any, int]":
+    pdf = pypdfium2.PdfDocument(source)
+    try:
+        page = pdf[0]
+        width, height = page.get_size()
+        scale = min(PREVIEW_SIZE[0] / width, PREVIEW_SIZE[1] / height)
+        image = page.render(scale=scale).to_pil()
+        return image, len(pdf)
+    finally:
+        pdf.close()
+
+
+def _render_image(source: str) -> "tuple[Any, int]":
+    with Image.open(source) as original:
+        # draft() ให้ decoder JPEG ลดขนาดตั้งแต่ตอนอ่าน (ไม่ต้องถอดรหัสเต็มความละเอียด)
+        original.draft("RGB", PREVIEW_SIZE)
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail(PREVIEW_SIZE)
+        return image, getattr(original, "n_frames", 1)
+
+
+def _write_meta(meta_path: str, meta: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+
+def render_preview(source: str, ext: str, image_path: str, meta_path: str) -> Optional[Dict[str, Any]]:
+    """
+    เขียน image_path (JPEG) และ meta_path (JSON) - เขียนไฟล์ชั่วคราวแล้ว rename
+    คืน metadata หรือ None ถ้าไม่รองรับไฟล์ประเภทนี้
+
+    เอกสารเสีย / เปิดไม่ได้: บันทึก {"error": ...} ใน meta_path (ไม่สร้างซ้ำทุกครั้งที่มีการขอ)
+    ข้อผิดพลาดอื่น (หน่วยความจำไม่พอ, ไม่พบไฟล์, เขียนไฟล์ไม่ได้) ส่งต่อโดยไม่บันทึก - ลองใหม่ครั้งถัดไป
+    """
+    if not supported(ext):
+        return None
+    try:
+        if ext in PDF_EXTENSIONS:
+            image, page_count = _render_pdf(source)
+        else:
+            image, page_count = _render_image(source)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+    except (MemoryError, FileNotFoundError):
+        raise
+    except Exception as exc:
+        error = {"error": str(exc)[:200]}
+        _write_meta(meta_path, error)
+        return error
+
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    tmp_image = f"{image_path}.{os.getpid()}.tmp"
+    image.save(tmp_image, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp_image, image_path)
+
+    meta = {"pageCount": page_count, "width": image.width, "height": image.height}
+    _write_meta(meta_path, meta)
+    return meta
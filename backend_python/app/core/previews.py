@@ -0,0 +1,116 @@
+"""
+Contract file previews
+หลังอัปโหลดเอกสารสัญญา สร้างภาพตัวอย่างหน้าแรก + จำนวนหน้าใน background
+(งาน render ใช้ CPU จึงรันใน process pool ไม่ใช่บน event loop)
+
+ผลลัพธ์เก็บตาม SHA-256 ของเอกสาร: uploads/previews/<2 ตัวแรก>/<sha256>.jpg / .json
+เอกสารเดียวกันจึงสร้างครั้งเดียว - GET /sites/{id}/contract-file/preview อ่านจากไฟล์เหล่านี้
+ถ้ายังไม่มี (ไฟล์เดิมก่อนมีฟีเจอร์นี้ / worker restart ระหว่างสร้าง) จะสร้างเมื่อมีการขอ
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+import anyio
+
+from app.core.file_store import PREVIEW_DIR, content_hash
+from app.core.metrics import track_task
+from app.core.preview_render import render_preview, supported
+
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: Dict[str, "asyncio.Task[Any]"] = {}
+
+
+def preview_paths(sha256: str) -> Tuple[str, str]:
+    """(ภาพตัวอย่าง, metadata) ของเอกสาร"""
+    base = os.path.join(PREVIEW_DIR, sha256[:2], sha256)
+    return f"{base}.jpg", f"{base}.json"
+
+
+def _extension(filename: Optional[str]) -> str:
+    return os.path.splitext(filename or "")[1].lower()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn - ไม่ fork process ที่มี event loop / connection pool อยู่
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """เรียกตอนปิดแอป"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _generate(source: str, sha256: str, ext: str) -> None:
+    # path เต็ม - worker process อาจมี working directory ต่างจาก process หลัก
+    image_path, meta_path = (os.path.abspath(path) for path in preview_paths(sha256))
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(_get_pool(), render_preview, os.path.abspath(source), ext, image_path, meta_path)
+    except BrokenProcessPool as exc:
+        # worker ตาย (เช่นหน่วยความจำไม่พอ) - สร้าง pool ใหม่ในครั้งถัดไป และลองใหม่เมื่อมีการขอ
+        logger.warning(f"Preview worker pool broken: {exc}")
+        shutdown_pool()
+    except Exception as exc:
+        # เอกสารเสียถูกบันทึกโดย render_preview แล้ว - ที่มาถึงตรงนี้คือปัญหาของ pool / worker
+        # (เช่น start process ไม่ได้, หน่วยความจำไม่พอ) ไม่บันทึก ลองใหม่เมื่อมีการขอ
+        logger.warning(f"Preview generation failed ({source}): {exc}")
+
+
+def schedule_preview(path: str, filename: Optional[str]) -> bool:
+    """
+    เริ่มสร้างภาพตัวอย่างใน background (ไม่รอผล)
+    คืน False ถ้าไม่รองรับไฟล์ประเภทนี้
+    """
+    sha256 = content_hash(path)
+    ext = _extension(filename)
+    if sha256 is None or not supported(ext):
+        return False
+    if sha256 in _pending or os.path.exists(preview_paths(sha256)[1]):
+        return True
+    task = asyncio.create_task(_generate(path, sha256, ext))
+    _pending[sha256] = task
+    task.add_done_callback(lambda _: _pending.pop(sha256, None))
+    track_task("contract_preview", task)
+    return True
+
+
+def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+async def get_preview(path: str, filename: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Returns:
+        ("ready", metadata), ("pending", None), ("unsupported", None) หรือ ("failed", {"error": ...})
+    """
+    sha256 = content_hash(path)
+    if sha256 is None or not supported(_extension(filename)):
+        return "unsupported", None
+    meta = await anyio.to_thread.run_sync(_read_meta, preview_paths(sha256)[1])
+    if meta is None:
+        schedule_preview(path, filename)
+        return "pending", None
+    if "error" in meta:
+        return "failed", meta
+    return "ready", meta
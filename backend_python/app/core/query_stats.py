@@ -0,0 +1,130 @@
+"""
+Per-request SQL statistics
+นับจำนวนคำสั่ง SQL และเวลารวมในฐานข้อมูลของแต่ละ request (จาก engine event ใน
+app.core.metrics) แล้ว:
+
+- ส่ง header Server-Timing: db;dur=<ms>;desc="<n> queries", app;dur=<ms>
+  (ดูได้ใน DevTools > Network > Timing)
+- log request ที่ใช้คำสั่งเกิน QUERY_COUNT_THRESHOLD หรือเวลาเกิน DB_TIME_THRESHOLD_MS
+  พร้อมรายการคำสั่ง และเตือนเมื่อคำสั่งเดียวกันถูกเรียกซ้ำหลายครั้ง (N+1)
+- assert_max_queries(): helper สำหรับ test
+
+    with assert_max_queries(3):
+        await client.get("/api/sites/1")
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_THRESHOLD = 30
+DB_TIME_THRESHOLD_MS = 500
+# คำสั่งเดียวกัน (ต่างแค่ parameter) ซ้ำเกินจำนวนนี้ใน request เดียว = น่าจะเป็น N+1
+REPEATED_STATEMENT_THRESHOLD = 10
+MAX_RECORDED_STATEMENTS = 100
+
+
+class QueryStats:
+    """สถิติของหนึ่ง scope (request / assert_max_queries) - ส่งต่อให้ scope ที่ครอบอยู่ด้วย"""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.statements: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, duration: float) -> None:
+        stats: Optional[QueryStats] = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration += duration
+            if len(stats.statements) < MAX_RECORDED_STATEMENTS:
+                stats.statements.append((statement, duration))
+            stats = stats.parent
+
+    def repeated(self, threshold: int = REPEATED_STATEMENT_THRESHOLD) -> List[Tuple[str, int]]:
+        counts = Counter(statement for statement, _ in self.statements)
+        return [(statement, n) for statement, n in counts.most_common() if n >= threshold]
+
+    def describe(self) -> str:
+        return "\n".join(
+            f"  [{duration * 1000:.1f} ms] {' '.join(statement.split())[:500]}"
+            for statement, duration in self.statements
+        )
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def record_query(statement: str, duration: float) -> None:
+    """เรียกจาก after_cursor_execute (นอก request = ไม่นับ)"""
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """AssertionError (พร้อมรายการคำสั่ง) ถ้าโค้ดใน block ใช้คำสั่ง SQL เกิน limit"""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(f"{stats.count} queries (max {limit}):\n{stats.describe()}")
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: Server-Timing header + log request ที่ใช้ฐานข้อมูลมากผิดปกติ"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    elapsed = (time.perf_counter() - started) * 1000
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={elapsed:.1f}'
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope: Scope, stats: QueryStats) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        if stats.count > QUERY_COUNT_THRESHOLD or stats.duration * 1000 > DB_TIME_THRESHOLD_MS:
+            logger.warning(
+                f"{request}: {stats.count} queries, {stats.duration * 1000:.1f} ms in database\n{stats.describe()}"
+            )
+        for statement, n in stats.repeated():
+            logger.warning(f"{request}: possible N+1 - statement executed {n} times: {' '.join(statement.split())[:300]}")
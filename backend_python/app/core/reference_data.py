@@ -0,0 +1,228 @@
+"""
+Reference-data cache
+เก็บตารางข้อมูลอ้างอิงขนาดเล็กที่แทบไม่เปลี่ยน (ธนาคาร, กะ, สินค้า, บริการ, สิทธิ์,
+prefix บริษัท) ไว้ในหน่วยความจำ พร้อม JSON ที่ serialize ไว้แล้ว
+
+แต่ละตารางมี version จาก sequence เดียวกัน (ตาราง reference_versions) - handler
+สร้าง/แก้ไข/ลบ เรียก bump_reference_version() ใน transaction เดียวกับการบันทึก
+แล้วแจ้งทุก worker ผ่าน NOTIFY (channel reference_data) ให้โหลดตารางนั้นใหม่
+ถ้า listener ไม่ได้เชื่อมต่อ จะตรวจ version จากฐานข้อมูลทุกครั้งที่อ่าน
+
+client เทียบ version ทีละตาราง (ไม่ใช่ version สูงสุดค่าเดียว) - version จาก nextval
+มองเห็นตามลำดับที่ commit ตารางที่ได้ version ต่ำกว่าแต่ commit ทีหลังจึงไม่ตกหล่น
+"""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.schedule_events import schedule_events
+from app.core.metrics import cache_counters
+from app.models.bank import Bank
+from app.models.company_prefix import CompanyPrefix
+from app.models.product import Product
+from app.models.reference_version import ReferenceVersion
+from app.models.service import Service
+from app.models.shift import Shift
+from app.models.user import Role
+
+
+CHANNEL = "reference_data"
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+async def _load_banks(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(select(Bank).order_by(Bank.id))
+    return [
+        {"id": str(b.id), "code": b.code, "name": b.name, "shortNameEN": b.shortNameEN}
+        for b in result.scalars().all()
+    ]
+
+
+async def _load_shifts(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(select(Shift).order_by(Shift.shiftCode))
+    return [
+        {
+            "id": s.id,
+            "shiftCode": s.shiftCode,
+            "name": s.name,
+            "startTime": s.startTime.strftime("%H:%M") if s.startTime else None,
+            "endTime": s.endTime.strftime("%H:%M") if s.endTime else None,
+            "isActive": s.isActive,
+            "createdAt": _iso(s.createdAt)
+        }
+        for s in result.scalars().all()
+    ]
+
+
+async def _load_products(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(select(Product).order_by(Product.code))
+    return [
+        {
+            "id": str(p.id), "code": p.code, "name": p.name, "category": p.category,
+            "price": p.price, "isActive": p.isActive, "createdAt": _iso(p.createdAt)
+        }
+        for p in result.scalars().all()
+    ]
+
+
+async def _load_services(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(select(Service).order_by(Service.id))
+    return [
+        {
+            "id": str(s.id),
+            "serviceCode": s.serviceCode or f"SVC-{s.id:03d}",
+            "serviceName": s.serviceName or s.name,
+            "remarks": s.remarks,
+            "hiringRate": s.hiringRate or 0.0,
+            "diligenceBonus": s.diligenceBonus or 0.0,
+            "sevenDayBonus": s.sevenDayBonus or 0.0,
+            "pointBonus": s.pointBonus or 0.0,
+            "isActive": s.isActive,
+            "createdAt": _iso(s.createdAt)
+        }
+        for s in result.scalars().all()
+    ]
+
+
+async def _load_roles(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(select(Role).order_by(Role.id))
+    return [
+        {
+            "id": role.roleId,
+            "name": role.name,
+            "permissions": json.loads(role.permissions) if role.permissions else []
+        }
+        for role in result.scalars().all()
+    ]
+
+
+async def _load_company_prefixes(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(select(CompanyPrefix).order_by(CompanyPrefix.code))
+    return [
+        {"id": p.id, "code": p.code, "name": p.name, "description": p.description, "isActive": p.isActive}
+        for p in result.scalars().all()
+    ]
+
+
+LOADERS: Dict[str, Callable[[AsyncSession], Awaitable[List[Dict[str, Any]]]]] = {
+    "banks": _load_banks,
+    "shifts": _load_shifts,
+    "products": _load_products,
+    "services": _load_services,
+    "roles": _load_roles,
+    "companyPrefixes": _load_company_prefixes,
+}
+
+
+async def bump_reference_version(db: AsyncSession, entity: str) -> None:
+    """
+    เพิ่ม version ของตารางอ้างอิงใน transaction ปัจจุบัน (ไม่ commit)
+    เรียกก่อน commit ในทุก handler ที่สร้าง/แก้ไข/ลบข้อมูลของตารางนั้น
+    """
+    result = await db.execute(
+        text("""
+            INSERT INTO reference_versions (entity, version)
+            VALUES (:entity, nextval('reference_version_seq'))
+            ON CONFLICT (entity) DO UPDATE
+            SET version = EXCLUDED.version, "updatedAt" = now()
+            RETURNING version
+        """),
+        {"entity": entity}
+    )
+    version = result.scalar_one()
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": json.dumps({"entity": entity, "version": version})}
+    )
+    # worker นี้โหลดใหม่ทันทีโดยไม่ต้องรอ NOTIFY
+    reference_cache.invalidate(entity)
+
+
+class ReferenceCache:
+    """ตารางอ้างอิงในหน่วยความจำ: entity -> {version, rows, json}"""
+
+    def __init__(self):
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._stale: Set[str] = set(LOADERS)
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.reloads = 0
+        self._hit_counter, self._miss_counter = cache_counters("reference_data")
+
+    def invalidate(self, entity: Optional[str] = None) -> None:
+        """entity = None -> โหลดใหม่ทุกตาราง"""
+        if entity is None:
+            self._stale = set(LOADERS)
+        elif entity in LOADERS:
+            self._stale.add(entity)
+
+    async def _refresh(self, db: AsyncSession) -> None:
+        if schedule_events.connected and not self._stale:
+            self.hits += 1
+            self._hit_counter.inc()
+            return
+        # ต้องตรวจ version จากฐานข้อมูล (และอาจโหลดตารางใหม่)
+        self._miss_counter.inc()
+        async with self._lock:
+            # อ่าน version ก่อนข้อมูล - ข้อมูลที่โหลดจะใหม่กว่าหรือเท่ากับ version ที่เก็บเสมอ
+            result = await db.execute(select(ReferenceVersion.entity, ReferenceVersion.version))
+            versions = {row.entity: row.version for row in result.all()}
+            for entity, loader in LOADERS.items():
+                version = versions.get(entity, 0)
+                cached = self._tables.get(entity)
+                if cached is not None and entity not in self._stale and cached["version"] == version:
+                    continue
+                self._stale.discard(entity)
+                rows = await loader(db)
+                self._tables[entity] = {
+                    "version": version,
+                    "rows": rows,
+                    "json": json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+                }
+                self.reloads += 1
+
+    async def rows(self, db: AsyncSession, entity: str) -> List[Dict[str, Any]]:
+        await self._refresh(db)
+        return self._tables[entity]["rows"]
+
+    async def snapshot(self, db: AsyncSession, versions: Optional[Dict[str, int]] = None) -> str:
+        """
+        JSON body: {"versions": {entity: version}, "tables": {entity: rows}}
+        versions (version ที่ client มีอยู่ของแต่ละตาราง) -> เฉพาะตารางที่ version ต่างจากนี้
+        """
+        await self._refresh(db)
+        current = {entity: table["version"] for entity, table in self._tables.items()}
+        parts = [
+            f'{json.dumps(entity)}:{table["json"]}'
+            for entity, table in self._tables.items()
+            if versions is None or versions.get(entity) != table["version"]
+        ]
+        return f'{{"versions":{json.dumps(current)},"tables":{{{",".join(parts)}}}}}'
+
+    def stats(self) -> dict:
+        return {
+            "versions": {entity: t["version"] for entity, t in self._tables.items()},
+            "stale": sorted(self._stale),
+            "hits": self.hits,
+            "reloads": self.reloads,
+        }
+
+
+# Global cache instance (invalidated from NOTIFY on channel reference_data)
+reference_cache = ReferenceCache()
+
+
+def _on_reference_event(event: Dict[str, Any]) -> None:
+    if event.get("type") == "resync":
+        reference_cache.invalidate(None)
+        return
+    reference_cache.invalidate(event.get("entity"))
+
+
+schedule_events.add_handler(_on_reference_event, channel=CHANNEL)
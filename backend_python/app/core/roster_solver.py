@@ -0,0 +1,369 @@
+"""
+Roster solver
+เสนอการจัดพนักงานเข้ากะอัตโนมัติตามจำนวนคนที่หน่วยงานกำหนด (shiftAssignments)
+
+แต่ละวันแก้เป็นปัญหา bipartite matching ระหว่างตำแหน่งว่าง (slot) กับพนักงาน
+1. จับคู่ตามความต่อเนื่องก่อน (พนักงานเคยทำงานที่หน่วยงานนั้น) ด้วย Hopcroft-Karp
+   เพื่อให้ได้จำนวนคู่ที่ต่อเนื่องมากที่สุด
+2. เติม slot ที่เหลือด้วยพนักงานที่ว่างและมีภาระงานน้อยที่สุด (heap)
+
+ข้อจำกัด: ไม่จัดซ้อนกะ, พนักงานต้อง active, ใบอนุญาตยังไม่หมดอายุ,
+ไม่เกิน 1 กะต่อคนต่อวัน
+"""
+import heapq
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.shift_intervals import shift_window, IntervalIndex
+
+
+DEFAULT_POSITION = "รปภ."
+
+
+def hopcroft_karp(adjacency: List[List[int]], right_size: int) -> List[int]:
+    """
+    Maximum bipartite matching
+
+    Args:
+        adjacency: adjacency[u] = right-side vertices for left vertex u,
+            in order of preference
+        right_size: number of right-side vertices
+
+    Returns:
+        match_left[u] = matched right vertex or -1
+    """
+    left_size = len(adjacency)
+    match_left = [-1] * left_size
+    match_right = [-1] * right_size
+    dist = [0] * left_size
+    infinity = left_size + 1
+
+    def bfs() -> bool:
+        queue = deque()
+        for u in range(left_size):
+            if match_left[u] == -1:
+                dist[u] = 0
+                queue.append(u)
+            else:
+                dist[u] = infinity
+        found = False
+        while queue:
+            u = queue.popleft()
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w == -1:
+                    found = True
+                elif dist[w] == infinity:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        return found
+
+    def dfs(root: int) -> bool:
+        # Iterative DFS along layered graph - avoids recursion limits on large days
+        stack = [(root, iter(adjacency[root]))]
+        path = []
+        while stack:
+            u, neighbours = stack[-1]
+            advanced = False
+            for v in neighbours:
+                w = match_right[v]
+                if w == -1:
+                    path.append((u, v))
+                    for pu, pv in path:
+                        match_left[pu] = pv
+                        match_right[pv] = pu
+                    return True
+                if dist[w] == dist[u] + 1:
+                    path.append((u, v))
+                    stack.append((w, iter(adjacency[w])))
+                    advanced = True
+                    break
+            if not advanced:
+                dist[u] = infinity
+                stack.pop()
+                if path:
+                    path.pop()
+        return False
+
+    while bfs():
+        for u in range(left_size):
+            if match_left[u] == -1:
+                dfs(u)
+    return match_left
+
+
+def _guard_available(guard: Dict[str, Any], work_date: date) -> bool:
+    if not guard.get("isActive", True):
+        return False
+    expiry = guard.get("licenseExpiry")
+    if expiry is not None and expiry < work_date:
+        return False
+    start = guard.get("startDate")
+    if start is not None and start > work_date:
+        return False
+    return True
+
+
+def _site_open(site: Dict[str, Any], work_date: date) -> bool:
+    if not site.get("isActive", True):
+        return False
+    if site.get("contractStartDate") and site["contractStartDate"] > work_date:
+        return False
+    if site.get("contractEndDate") and site["contractEndDate"] < work_date:
+        return False
+    return True
+
+
+def _is_free(busy: Optional[IntervalIndex], start: datetime, end: datetime) -> bool:
+    return busy is None or busy.is_free(start, end)
+
+
+def solve_roster(
+    start_date: date,
+    end_date: date,
+    sites: List[Dict[str, Any]],
+    guards: List[Dict[str, Any]],
+    existing_rows: List[Dict[str, Any]],
+    shift_times: Dict[str, Tuple[Optional[time], Optional[time]]]
+) -> Dict[str, Any]:
+    """
+    Propose guard assignments for every open site slot in a date range
+
+    Args:
+        sites: [{id, name, isActive, contractStartDate, contractEndDate,
+            shiftAssignments: [{shiftCode, numberOfPeople}]}]
+        guards: [{id, guardId, isActive, licenseExpiry, startDate, ...}]
+        existing_rows: schedule_guards rows already saved (range plus a
+            lookback window, used for busy intervals and continuity)
+            [{guardId, siteId, shift, scheduleDate, shiftStart, shiftEnd}]
+        shift_times: shiftCode -> (startTime, endTime)
+
+    Returns:
+        {"assignments": [{scheduleDate, siteId, shiftCode, guard, continuity}],
+         "unfilled": [{scheduleDate, siteId, shiftCode, missing}],
+         "stats": {...}}
+    """
+    guard_by_code = {g["guardId"]: g for g in guards if g.get("guardId")}
+
+    busy: Dict[str, IntervalIndex] = {}
+    worked_dates: Dict[str, set] = {}
+    filled: Dict[Tuple[int, str, date], int] = {}
+    history: Dict[str, Dict[int, date]] = {}  # guardId -> {siteId: last date worked}
+    load: Dict[str, int] = {}
+
+    for row in existing_rows:
+        code = row["guardId"]
+        if row.get("shiftStart") is not None:
+            busy.setdefault(code, IntervalIndex()).add(row["shiftStart"], row["shiftEnd"])
+        worked_dates.setdefault(code, set()).add(row["scheduleDate"])
+        key = (row["siteId"], row["shift"], row["scheduleDate"])
+        filled[key] = filled.get(key, 0) + 1
+        if row["scheduleDate"] < start_date:
+            last = history.setdefault(code, {})
+            if row["scheduleDate"] > last.get(row["siteId"], date.min):
+                last[row["siteId"]] = row["scheduleDate"]
+        elif row["scheduleDate"] <= end_date:
+            load[code] = load.get(code, 0) + 1
+
+    assignments = []
+    unfilled = []
+    continuity_count = 0
+
+    work_date = start_date
+    while work_date <= end_date:
+        # Slot units ของวันนี้
+        slots = []
+        for site in sites:
+            if not _site_open(site, work_date):
+                continue
+            for assignment in site.get("shiftAssignments") or []:
+                shift_code = assignment.get("shiftCode")
+                if not shift_code:
+                    continue
+                need = int(assignment.get("numberOfPeople") or 0) - filled.get((site["id"], shift_code, work_date), 0)
+                if need <= 0:
+                    continue
+                start_time, end_time = shift_times.get(shift_code, (None, None))
+                window = shift_window(work_date, start_time, end_time)
+                for _ in range(need):
+                    slots.append((site["id"], shift_code, window))
+
+        if not slots:
+            work_date += timedelta(days=1)
+            continue
+
+        candidates = [
+            code for code, g in guard_by_code.items()
+            if _guard_available(g, work_date) and work_date not in worked_dates.get(code, ())
+        ]
+        index_of = {code: i for i, code in enumerate(candidates)}
+
+        # 1) Continuity matching - edges ไปยังหน่วยงานที่พนักงานเคยทำงาน (ล่าสุดก่อน)
+        site_slots: Dict[int, List[int]] = {}
+        for slot_index, (site_id, _, _) in enumerate(slots):
+            site_slots.setdefault(site_id, []).append(slot_index)
+
+        adjacency: List[List[int]] = [[] for _ in slots]
+        for code in candidates:
+            worked = history.get(code)
+            if not worked:
+                continue
+            for site_id in sorted(worked, key=worked.get, reverse=True):
+                for slot_index in site_slots.get(site_id, ()):
+                    _, _, (s_start, s_end) = slots[slot_index]
+                    if _is_free(busy.get(code), s_start, s_end):
+                        adjacency[slot_index].append(index_of[code])
+
+        match = hopcroft_karp(adjacency, len(candidates))
+
+        day_start = len(assignments)
+        taken = set()
+        open_slots = []
+        for slot_index, guard_index in enumerate(match):
+            if guard_index == -1:
+                open_slots.append(slot_index)
+                continue
+            code = candidates[guard_index]
+            taken.add(code)
+            site_id, shift_code, window = slots[slot_index]
+            assignments.append({
+                "scheduleDate": work_date,
+                "siteId": site_id,
+                "shiftCode": shift_code,
+                "guard": guard_by_code[code],
+                "continuity": True
+            })
+            busy.setdefault(code, IntervalIndex()).add(*window)
+            continuity_count += 1
+
+        # 2) เติม slot ที่เหลือด้วยพนักงานที่มีภาระงานน้อยที่สุด
+        heap = [(load.get(code, 0), code) for code in candidates if code not in taken]
+        heapq.heapify(heap)
+        missing: Dict[Tuple[int, str], int] = {}
+        for slot_index in open_slots:
+            site_id, shift_code, (s_start, s_end) = slots[slot_index]
+            skipped = []
+            chosen = None
+            while heap:
+                item = heapq.heappop(heap)
+                if _is_free(busy.get(item[1]), s_start, s_end):
+                    chosen = item[1]
+                    break
+                skipped.append(item)
+            for item in skipped:
+                heapq.heappush(heap, item)
+
+            if chosen is None:
+                missing[(site_id, shift_code)] = missing.get((site_id, shift_code), 0) + 1
+                continue
+            taken.add(chosen)
+            assignments.append({
+                "scheduleDate": work_date,
+                "siteId": site_id,
+                "shiftCode": shift_code,
+                "guard": guard_by_code[chosen],
+                "continuity": False
+            })
+            busy.setdefault(chosen, IntervalIndex()).add(s_start, s_end)
+
+        for a in assignments[day_start:]:
+            code = a["guard"]["guardId"]
+            worked_dates.setdefault(code, set()).add(work_date)
+            load[code] = load.get(code, 0) + 1
+            history.setdefault(code, {})[a["siteId"]] = work_date
+        for (site_id, shift_code), count in missing.items():
+            unfilled.append({
+                "scheduleDate": work_date,
+                "siteId": site_id,
+                "shiftCode": shift_code,
+                "missing": count
+            })
+
+        work_date += timedelta(days=1)
+
+    return {
+        "assignments": assignments,
+        "unfilled": unfilled,
+        "stats": {
+            "assigned": len(assignments),
+            "continuity": continuity_count,
+            "unfilledSlots": sum(u["missing"] for u in unfilled)
+        }
+    }
+
+
+def _rate_for_position(employment_details: List[Dict[str, Any]], used: Dict[str, int]) -> Dict[str, Any]:
+    """เลือกตำแหน่งจาก employmentDetails ที่ยังไม่ครบจำนวน (ตามลำดับ)"""
+    for detail in employment_details:
+        if used.get(detail.get("position"), 0) < int(detail.get("quantity") or 0):
+            return detail
+    return employment_details[0] if employment_details else {"position": DEFAULT_POSITION}
+
+
+def guard_entry(guard: Dict[str, Any], detail: Dict[str, Any]) -> Dict[str, Any]:
+    """สร้างรายการพนักงานในกะ (รูปแบบเดียวกับที่ Scheduler.jsx บันทึก)"""
+    return {
+        "id": str(guard["id"]),
+        "originalId": str(guard["id"]),
+        "guardId": guard["guardId"],
+        "title": guard.get("title"),
+        "firstName": guard.get("firstName") or "",
+        "lastName": guard.get("lastName") or "",
+        "position": detail.get("position") or DEFAULT_POSITION,
+        "dailyIncome": detail.get("dailyIncome") or 0,
+        "payoutRate": detail.get("hiringRate") or 0,
+        "hiringRate": detail.get("hiringRate") or 0,
+        "diligenceBonus": detail.get("diligenceBonus") or 0,
+        "sevenDayBonus": detail.get("sevenDayBonus") or 0,
+        "pointBonus": detail.get("pointBonus") or 0,
+        "positionAllowance": detail.get("positionAllowance") or 0,
+        "otherAllowance": detail.get("otherAllowance") or 0
+    }
+
+
+def build_proposals(
+    assignments: List[Dict[str, Any]],
+    sites: List[Dict[str, Any]],
+    existing_schedules: Dict[Tuple[int, date], Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Group assignments into schedule payloads ready for POST/PUT /schedules
+
+    Existing schedules keep their current entries; new guards are appended
+    to the matching shift and `scheduleId` tells the client to PUT instead
+    of POST.
+    """
+    site_by_id = {s["id"]: s for s in sites}
+    proposals: Dict[Tuple[int, date], Dict[str, Any]] = {}
+    positions_used: Dict[Tuple[int, date], Dict[str, int]] = {}
+
+    for a in assignments:
+        key = (a["siteId"], a["scheduleDate"])
+        site = site_by_id[a["siteId"]]
+        proposal = proposals.get(key)
+        if proposal is None:
+            existing = existing_schedules.get(key)
+            shifts = {code: list(entries) for code, entries in (existing or {}).get("shifts", {}).items()}
+            used: Dict[str, int] = {}
+            for entries in shifts.values():
+                for entry in entries:
+                    if isinstance(entry, dict):
+                        used[entry.get("position")] = used.get(entry.get("position"), 0) + 1
+            positions_used[key] = used
+            proposal = {
+                "scheduleId": existing["scheduleId"] if existing else None,
+                "scheduleDate": a["scheduleDate"].isoformat(),
+                "siteId": site["id"],
+                "siteName": site["name"],
+                "shifts": shifts,
+                "added": 0
+            }
+            proposals[key] = proposal
+
+        detail = _rate_for_position(site.get("employmentDetails") or [], positions_used[key])
+        positions_used[key][detail.get("position")] = positions_used[key].get(detail.get("position"), 0) + 1
+        proposal["shifts"].setdefault(a["shiftCode"], []).append(guard_entry(a["guard"], detail))
+        proposal["added"] += 1
+
+    return sorted(proposals.values(), key=lambda p: (p["scheduleDate"], p["siteName"]))
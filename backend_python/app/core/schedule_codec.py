@@ -0,0 +1,174 @@
+"""
+Compact storage format for Schedule.shifts
+เก็บเฉพาะ reference ของพนักงาน + ค่าที่ต่างจากอัตราของหน่วยงาน แทนการเก็บสำเนา
+GuardInShift ทั้งก้อนในทุกกะทุกวัน
+
+Stored format (v2):
+    {
+        "v": 2,
+        "rates": {"<position>": {"dailyIncome": ..., "hiringRate": ..., ...}},
+        "shifts": {
+            "<shiftCode>": [
+                {"g": <guards.id>, "c": "<guardId>", "p": "<position>", "o": {<overrides>}},
+                {"r": {<raw entry>}}
+            ]
+        }
+    }
+
+`rates` เป็น snapshot ของอัตราตามตำแหน่ง ณ วันที่บันทึก (หนึ่งชุดต่อตารางงาน)
+จึงไม่เปลี่ยนตามเมื่อแก้ไข employmentDetails ของหน่วยงานภายหลัง
+รายการที่ไม่ใช่ รปภ. ในตาราง guards (เช่น staff) เก็บเป็น raw entry ตามเดิม
+
+ข้อมูลรูปแบบเดิม (dict ของ shiftCode -> list) ยังอ่านได้ตามปกติ
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.guard import Guard
+from app.core.schedule_conflicts import MONEY_FIELDS
+
+
+FORMAT_VERSION = 2
+
+
+def is_compact(stored: Any) -> bool:
+    return isinstance(stored, dict) and stored.get("v") == FORMAT_VERSION and "shifts" in stored
+
+
+def rate_card(employment_details: Optional[List[Dict[str, Any]]]) -> Dict[str, Dict[str, float]]:
+    """อัตราตามตำแหน่งจาก Site.employmentDetails (payoutRate = hiringRate เหมือนหน้า Scheduler)"""
+    card = {}
+    for detail in employment_details or []:
+        if not isinstance(detail, dict) or not detail.get("position"):
+            continue
+        rates = {field: _number(detail.get(field)) for field in MONEY_FIELDS}
+        rates["payoutRate"] = rates["hiringRate"]
+        card[detail["position"]] = rates
+    return card
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _guard_fk(entry: Dict[str, Any]) -> Optional[int]:
+    if not entry.get("guardId"):
+        return None
+    try:
+        return int(entry.get("originalId") or entry.get("id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_shifts(
+    shifts_data: Dict[str, List[Any]],
+    card: Dict[str, Dict[str, float]]
+) -> Dict[str, Any]:
+    """แปลง shifts รูปแบบเต็ม (จาก request) เป็นรูปแบบ compact สำหรับบันทึก"""
+    if is_compact(shifts_data):
+        return shifts_data  # type: ignore[return-value]
+
+    rates: Dict[str, Dict[str, float]] = {}
+    shifts: Dict[str, List[Dict[str, Any]]] = {}
+    for shift_code, entries in (shifts_data or {}).items():
+        packed = []
+        for entry in entries or []:
+            guard_fk = _guard_fk(entry) if isinstance(entry, dict) else None
+            if guard_fk is None:
+                packed.append({"r": entry})
+                continue
+
+            position = entry.get("position") or ""
+            values = {field: _number(entry.get(field)) for field in MONEY_FIELDS}
+            if position not in rates:
+                # ตำแหน่งที่ไม่มีในอัตราของหน่วยงาน (เช่น สแปร์) ใช้ค่าของรายการแรกเป็นฐาน
+                rates[position] = dict(card.get(position) or values)
+            base = rates[position]
+
+            item: Dict[str, Any] = {"g": guard_fk, "c": entry["guardId"], "p": position}
+            overrides = {field: value for field, value in values.items() if value != base.get(field, 0.0)}
+            if overrides:
+                item["o"] = overrides
+            packed.append(item)
+        shifts[shift_code] = packed
+
+    return {"v": FORMAT_VERSION, "rates": rates, "shifts": shifts}
+
+
+def referenced_guard_ids(stored_list: Iterable[Any]) -> Set[int]:
+    ids = set()
+    for stored in stored_list:
+        if not is_compact(stored):
+            continue
+        for entries in stored["shifts"].values():
+            for item in entries:
+                if "g" in item:
+                    ids.add(item["g"])
+    return ids
+
+
+def shift_entry_counts(stored: Any) -> Dict[str, int]:
+    """จำนวนรายการในแต่ละกะ (ไม่ต้อง rehydrate)"""
+    shifts = stored["shifts"] if is_compact(stored) else (stored or {})
+    return {code: len(entries or []) for code, entries in shifts.items()}
+
+
+def decode_shifts(stored: Any, guards: Dict[int, Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Rehydrate stored shifts into the GuardInShift response shape
+
+    Args:
+        stored: parsed Schedule.shifts (compact or legacy)
+        guards: guards.id -> {guardId, title, firstName, lastName}
+    """
+    if not is_compact(stored):
+        return stored or {}
+
+    rates = stored.get("rates") or {}
+    shifts: Dict[str, List[Any]] = {}
+    for shift_code, entries in stored["shifts"].items():
+        expanded = []
+        for item in entries:
+            if "r" in item:
+                expanded.append(item["r"])
+                continue
+            guard = guards.get(item["g"]) or {}
+            entry = {
+                "id": str(item["g"]),
+                "originalId": str(item["g"]),
+                "guardId": guard.get("guardId") or item.get("c"),
+                "title": guard.get("title"),
+                "firstName": guard.get("firstName") or "",
+                "lastName": guard.get("lastName") or "",
+                "position": item.get("p") or "",
+            }
+            base = rates.get(item.get("p") or "", {})
+            for field in MONEY_FIELDS:
+                entry[field] = base.get(field, 0.0)
+            entry.update(item.get("o") or {})
+            expanded.append(entry)
+        shifts[shift_code] = expanded
+    return shifts
+
+
+async def load_guard_refs(db: AsyncSession, guard_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """ดึงชื่อพนักงานสำหรับ rehydrate (query เดียว)"""
+    ids = list(guard_ids)
+    if not ids:
+        return {}
+    result = await db.execute(
+        select(Guard.id, Guard.guardId, Guard.title, Guard.firstName, Guard.lastName)
+        .where(Guard.id.in_(ids))
+    )
+    return {row["id"]: dict(row) for row in result.mappings().all()}
+
+
+async def hydrate_shifts(db: AsyncSession, stored_list: List[Any]) -> List[Dict[str, List[Any]]]:
+    """Rehydrate several schedules with a single guard lookup"""
+    guards = await load_guard_refs(db, referenced_guard_ids(stored_list))
+    return [decode_shifts(stored, guards) for stored in stored_list]
@@ -0,0 +1,359 @@
+"""
+Schedule conflict detection
+ตรวจสอบการจัดพนักงานซ้อนกะข้ามหน่วยงาน โดยใช้ตาราง schedule_guards
+(index ตาม guardId + ช่วงเวลากะจริง) แทนการ parse JSON ของทุกตารางงาน
+"""
+import json
+from datetime import date, time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, delete, insert, and_, or_, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.schedule import Schedule
+from app.models.schedule_guard import ScheduleGuard
+from app.models.shift import Shift
+from app.core.shift_intervals import shift_window, overlaps, IntervalIndex
+
+
+MONEY_FIELDS = [
+    "dailyIncome", "payoutRate", "hiringRate", "positionAllowance",
+    "diligenceBonus", "sevenDayBonus", "pointBonus", "otherAllowance"
+]
+
+
+def guard_key(entry: Dict[str, Any]) -> Optional[str]:
+    """รหัสพนักงานของรายการในกะ (guardId หรือ staffId)"""
+    key = entry.get("guardId") or entry.get("staffId") or entry.get("code")
+    return str(key) if key else None
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+async def load_shift_times(db: AsyncSession) -> Dict[str, Tuple[Optional[time], Optional[time]]]:
+    """ดึงเวลาเริ่ม/สิ้นสุดของทุกกะ (key คือ shiftCode)"""
+    result = await db.execute(select(Shift.shiftCode, Shift.startTime, Shift.endTime))
+    return {code: (start, end) for code, start, end in result.all()}
+
+
+def build_guard_rows(
+    schedule_date: date,
+    site_id: int,
+    site_name: str,
+    shifts_data: Dict[str, List[Any]],
+    shift_times: Dict[str, Tuple[Optional[time], Optional[time]]]
+) -> List[Dict[str, Any]]:
+    """
+    แปลง shifts ของตารางงานเป็นแถวของ schedule_guards (ยังไม่มี scheduleId)
+
+    กะที่ไม่มีเวลาใน Shift จะถือว่าครอบคลุมทั้งวัน
+    """
+    rows = []
+    for shift_code, guards in (shifts_data or {}).items():
+        start_time, end_time = shift_times.get(shift_code, (None, None))
+        shift_start, shift_end = shift_window(schedule_date, start_time, end_time)
+        for entry in guards or []:
+            if not isinstance(entry, dict):
+                continue
+            key = guard_key(entry)
+            if not key:
+                continue
+
+            guard_fk = None
+            if entry.get("guardId"):
+                try:
+                    guard_fk = int(entry.get("originalId") or entry.get("id"))
+                except (TypeError, ValueError):
+                    guard_fk = None
+
+            row = {
+                "scheduleDate": schedule_date,
+                "guardId": key,
+                "guard_id_fk": guard_fk,
+                "guardName": f"{entry.get('firstName') or ''} {entry.get('lastName') or ''}".strip(),
+                "siteId": site_id,
+                "siteName": site_name,
+                "shift": shift_code,
+                "position": entry.get("position") or "",
+                "shiftStart": shift_start,
+                "shiftEnd": shift_end,
+            }
+            for field in MONEY_FIELDS:
+                row[field] = _to_float(entry.get(field))
+            rows.append(row)
+    return rows
+
+
+async def lock_guards(db: AsyncSession, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Lock the guards of a schedule write until the transaction ends
+
+    Two dispatchers saving different sites for the same guard at the same
+    time would otherwise both pass the conflict check. Keys are locked in
+    sorted order so concurrent writers cannot deadlock.
+    """
+    for key in sorted({row["guardId"] for row in rows}):
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"schedule_guard:{key}"}
+        )
+
+
+def _conflict(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    def side(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "scheduleId": row.get("scheduleId"),
+            "scheduleDate": row["scheduleDate"].isoformat(),
+            "siteId": row["siteId"],
+            "siteName": row["siteName"],
+            "shift": row["shift"],
+            "shiftStart": row["shiftStart"].isoformat(),
+            "shiftEnd": row["shiftEnd"].isoformat(),
+        }
+
+    return {
+        "guardId": a["guardId"],
+        "guardName": a.get("guardName") or b.get("guardName"),
+        "first": side(a),
+        "second": side(b),
+    }
+
+
+async def find_conflicts(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]],
+    exclude_schedule_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    หา conflict ของแถวที่กำลังจะบันทึก ทั้งภายในตารางงานเดียวกันและกับตารางงานอื่น
+
+    Args:
+        rows: ผลจาก build_guard_rows
+        exclude_schedule_id: ตารางงานที่กำลังแก้ไข (ไม่นับแถวเดิมของตัวเอง)
+    """
+    if not rows:
+        return []
+
+    conflicts = []
+
+    # ซ้อนกันเองภายในตารางงานเดียวกัน
+    by_guard: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_guard.setdefault(row["guardId"], []).append(row)
+    for guard_rows in by_guard.values():
+        guard_rows.sort(key=lambda r: r["shiftStart"])
+        for prev, curr in zip(guard_rows, guard_rows[1:]):
+            if overlaps(prev["shiftStart"], prev["shiftEnd"], curr["shiftStart"], curr["shiftEnd"]):
+                conflicts.append(_conflict(prev, curr))
+
+    # ซ้อนกับตารางงานอื่น - index probe ตาม guardId + ช่วงเวลา
+    window_start = min(r["shiftStart"] for r in rows)
+    window_end = max(r["shiftEnd"] for r in rows)
+    query = select(
+        ScheduleGuard.scheduleId,
+        ScheduleGuard.scheduleDate,
+        ScheduleGuard.guardId,
+        ScheduleGuard.guardName,
+        ScheduleGuard.siteId,
+        ScheduleGuard.siteName,
+        ScheduleGuard.shift,
+        ScheduleGuard.shiftStart,
+        ScheduleGuard.shiftEnd
+    ).where(
+        and_(
+            ScheduleGuard.guardId.in_(list(by_guard.keys())),
+            ScheduleGuard.shiftStart < window_end,
+            ScheduleGuard.shiftEnd > window_start
+        )
+    )
+    if exclude_schedule_id is not None:
+        query = query.where(ScheduleGuard.scheduleId != exclude_schedule_id)
+
+    indexes = {
+        key: IntervalIndex((r["shiftStart"], r["shiftEnd"]) for r in guard_rows)
+        for key, guard_rows in by_guard.items()
+    }
+    rows_by_interval = {(r["guardId"], r["shiftStart"], r["shiftEnd"]): r for r in rows}
+
+    result = await db.execute(query)
+    for existing in result.mappings().all():
+        index = indexes.get(existing["guardId"])
+        if index is None:
+            continue
+        for start, end in index.overlapping(existing["shiftStart"], existing["shiftEnd"]):
+            row = rows_by_interval[(existing["guardId"], start, end)]
+            conflicts.append(_conflict(row, dict(existing)))
+
+    return conflicts
+
+
+def format_conflicts(conflicts: List[Dict[str, Any]], limit: int = 5) -> str:
+    """ข้อความ error สำหรับแสดงผลที่ frontend"""
+    lines = []
+    for c in conflicts[:limit]:
+        other = c["second"]
+        lines.append(
+            f"{c['guardId']} {c['guardName'] or ''} ซ้อนกับ {other['siteName']} "
+            f"วันที่ {other['scheduleDate']} กะ {other['shift']}"
+        )
+    if len(conflicts) > limit:
+        lines.append(f"และอีก {len(conflicts) - limit} รายการ")
+    return "พนักงานถูกจัดตารางงานซ้อนกะ: " + "; ".join(lines)
+
+
+async def sync_schedule_guards(
+    db: AsyncSession,
+    schedule_id: int,
+    rows: List[Dict[str, Any]]
+) -> Set[str]:
+    """
+    แทนที่แถว schedule_guards ของตารางงานด้วยข้อมูลชุดใหม่ (ไม่ commit)
+
+    Returns:
+        รหัสพนักงานทั้งชุดเดิมและชุดใหม่ (พนักงานที่ได้รับผลกระทบ)
+    """
+    affected = await clear_schedule_guards(db, schedule_id)
+    if rows:
+        await db.execute(
+            insert(ScheduleGuard),
+            [{**row, "scheduleId": schedule_id} for row in rows]
+        )
+    return affected | {row["guardId"] for row in rows}
+
+
+async def clear_schedule_guards(db: AsyncSession, schedule_id: int) -> Set[str]:
+    """ลบแถว schedule_guards ของตารางงาน (ไม่ commit) - คืนค่ารหัสพนักงานที่ถูกลบ"""
+    result = await db.execute(
+        delete(ScheduleGuard)
+        .where(ScheduleGuard.scheduleId == schedule_id)
+        .returning(ScheduleGuard.guardId)
+    )
+    return set(result.scalars().all())
+
+
+async def retime_shift(
+    db: AsyncSession,
+    old_code: str,
+    new_code: str,
+    start_time: Optional[time],
+    end_time: Optional[time]
+) -> int:
+    """
+    อัปเดต schedule_guards หลังแก้ไขกะ (ไม่ commit)
+    - shiftStart / shiftEnd คำนวณใหม่จากเวลากะใหม่ (shift_window ต่อวันที่จัดตาราง)
+    - เปลี่ยนรหัสกะเมื่อ shiftCode เปลี่ยน (รวม key ใน schedules.shifts)
+
+    Returns:
+        จำนวนวันที่จัดตารางที่ได้รับผลกระทบ
+    """
+    result = await db.execute(
+        select(ScheduleGuard.scheduleDate).where(ScheduleGuard.shift == old_code).distinct()
+    )
+    params = []
+    for schedule_date in result.scalars().all():
+        shift_start, shift_end = shift_window(schedule_date, start_time, end_time)
+        params.append({
+            "old_code": old_code, "new_code": new_code, "schedule_date": schedule_date,
+            "shift_start": shift_start, "shift_end": shift_end,
+        })
+    if params:
+        # หนึ่ง UPDATE ต่อวันที่ (executemany) แทนการอ่านทุกแถว
+        await db.execute(
+            text("""
+                UPDATE schedule_guards
+                SET shift = :new_code, "shiftStart" = :shift_start, "shiftEnd" = :shift_end
+                WHERE shift = :old_code AND "scheduleDate" = :schedule_date
+            """),
+            params
+        )
+
+    if new_code != old_code:
+        # import ภายในฟังก์ชัน - schedule_codec import โมดูลนี้
+        from app.core.schedule_codec import is_compact
+
+        result = await db.execute(
+            select(Schedule.id, Schedule.shifts).where(
+                Schedule.shifts.contains(json.dumps(old_code, ensure_ascii=False))
+            )
+        )
+        renamed = []
+        for schedule_id, stored in result.all():
+            data = json.loads(stored)
+            shifts = data["shifts"] if is_compact(data) else data
+            if not isinstance(shifts, dict) or old_code not in shifts:
+                continue
+            shifts[new_code] = shifts.pop(old_code)
+            renamed.append({"id": schedule_id, "shifts": json.dumps(data, ensure_ascii=False)})
+        if renamed:
+            await db.execute(
+                text("""
+                    UPDATE schedules
+                    SET shifts = :shifts, version = version + 1, "updatedAt" = now()
+                    WHERE id = :id
+                """),
+                renamed
+            )
+    return len(params)
+
+
+async def scan_conflicts(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+    limit: int = 5000
+) -> List[Dict[str, Any]]:
+    """
+    Bulk scan of overlapping assignments for schedule dates in a range
+
+    Self-join on schedule_guards driven by the (guardId, shiftStart,
+    shiftEnd) index. Each pair is reported once; pairs where the other
+    side falls outside the range are still reported from the in-range side.
+    """
+    a = aliased(ScheduleGuard)
+    b = aliased(ScheduleGuard)
+    query = (
+        select(
+            a.guardId, a.guardName,
+            a.scheduleId, a.scheduleDate, a.siteId, a.siteName, a.shift, a.shiftStart, a.shiftEnd,
+            b.scheduleId.label("b_scheduleId"),
+            b.scheduleDate.label("b_scheduleDate"),
+            b.siteId.label("b_siteId"),
+            b.siteName.label("b_siteName"),
+            b.shift.label("b_shift"),
+            b.shiftStart.label("b_shiftStart"),
+            b.shiftEnd.label("b_shiftEnd")
+        )
+        .join(
+            b,
+            and_(
+                b.guardId == a.guardId,
+                b.shiftStart < a.shiftEnd,
+                b.shiftEnd > a.shiftStart,
+                or_(b.id > a.id, b.scheduleDate < start_date, b.scheduleDate > end_date)
+            )
+        )
+        .where(a.scheduleDate.between(start_date, end_date))
+        .order_by(a.scheduleDate, a.guardId, a.shiftStart)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+
+    conflicts = []
+    for r in result.mappings().all():
+        first = {k: r[k] for k in ("guardId", "guardName", "scheduleId", "scheduleDate", "siteId", "siteName", "shift", "shiftStart", "shiftEnd")}
+        second = {
+            "scheduleId": r["b_scheduleId"],
+            "scheduleDate": r["b_scheduleDate"],
+            "siteId": r["b_siteId"],
+            "siteName": r["b_siteName"],
+            "shift": r["b_shift"],
+            "shiftStart": r["b_shiftStart"],
+            "shiftEnd": r["b_shiftEnd"],
+        }
+        conflicts.append(_conflict(first, second))
+    return conflicts
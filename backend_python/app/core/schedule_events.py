@@ -0,0 +1,239 @@
+"""
+Schedule change feed
+กระจายเหตุการณ์สร้าง/แก้ไข/ลบตารางงานไปยัง client ที่เปิดหน้า Scheduler อยู่
+
+ใช้ PostgreSQL LISTEN/NOTIFY เป็น broker เพื่อให้ทุก worker process ได้รับ
+เหตุการณ์เดียวกัน - pg_notify ถูกส่งใน transaction ของการบันทึก จึงส่งออก
+เฉพาะเมื่อ commit สำเร็จ
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "schedule_events"
+QUEUE_SIZE = 256
+RECONNECT_DELAY = 5
+
+
+async def publish_schedule_event(
+    db: AsyncSession,
+    event_type: str,
+    schedule: Any,
+    guards: Optional[Iterable[str]] = None
+) -> None:
+    """
+    Queue a schedule event in the current transaction (ไม่ commit)
+
+    Args:
+        event_type: created / updated / deleted
+        schedule: Schedule instance (ต้องมี id แล้ว)
+        guards: รหัสพนักงานที่ได้รับผลกระทบ (ใช้ invalidate cache ที่คำนวณตามพนักงาน)
+    """
+    payload = {
+        "type": event_type,
+        "scheduleId": schedule.id,
+        "siteId": schedule.siteId,
+        "scheduleDate": schedule.scheduleDate.isoformat(),
+        "version": schedule.version,
+        "guards": sorted(guards or []),
+    }
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": json.dumps(payload)}
+    )
+
+
+async def publish_guards_changed(db: AsyncSession) -> None:
+    """
+    แจ้งว่าข้อมูลพนักงานเปลี่ยน (ไม่ commit) - cache ที่ rehydrate ชื่อพนักงานต้องล้าง
+    ไม่ถูกส่งไปยัง client ของ change feed
+    """
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": json.dumps({"type": "guards_changed"})}
+    )
+
+
+async def publish_names_changed(db: AsyncSession, table: str) -> None:
+    """
+    แจ้งว่าชื่อที่คัดลอกไว้ในตาราง table ถูกอัปเดต (ไม่ commit) - cache ที่เก็บชื่อต้องล้าง
+    ไม่ถูกส่งไปยัง client ของ change feed
+    """
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": json.dumps({"type": "names_changed", "table": table})}
+    )
+
+
+async def publish_shifts_changed(db: AsyncSession, shift_code: str) -> None:
+    """
+    แจ้งว่าเวลา / รหัสของกะเปลี่ยน และ schedule_guards ถูกคำนวณใหม่ (ไม่ commit)
+    กระทบทุกวันที่ที่ใช้กะนี้ - cache ที่คำนวณจากช่วงเวลากะต้องล้าง
+    ไม่ถูกส่งไปยัง client ของ change feed
+    """
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": json.dumps({"type": "shifts_changed", "shift": shift_code})}
+    )
+
+
+class Subscription:
+    """ตัวกรองและคิวเหตุการณ์ของ client หนึ่งราย"""
+
+    def __init__(
+        self,
+        site_ids: Optional[Iterable[int]],
+        date_from: Optional[date],
+        date_to: Optional[date]
+    ):
+        self.site_ids: Optional[Set[int]] = set(site_ids) if site_ids else None
+        self.date_from = date_from.isoformat() if date_from else None
+        self.date_to = date_to.isoformat() if date_to else None
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if "scheduleId" not in event:
+            return False
+        if self.site_ids is not None and event.get("siteId") not in self.site_ids:
+            return False
+        # ISO date strings compare in date order
+        if self.date_from and event.get("scheduleDate", "") < self.date_from:
+            return False
+        if self.date_to and event.get("scheduleDate", "") > self.date_to:
+            return False
+        return True
+
+    def push(self, event: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # client อ่านไม่ทัน - ทิ้งคิวแล้วให้ client โหลดข้อมูลใหม่ทั้งหมด
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class ScheduleEventBroker:
+    """
+    One LISTEN connection per process, fanned out to in-process subscribers
+
+    The connection is dedicated (not taken from the SQLAlchemy pool) and is
+    re-established automatically; subscribers receive a `resync` event after
+    a reconnect because notifications sent while disconnected are lost.
+    """
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {CHANNEL: []}
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def add_handler(self, handler: Callable[[Dict[str, Any]], None], channel: str = CHANNEL) -> None:
+        """
+        In-process callback for every event (e.g. cache invalidation)
+
+        channel อื่นนอกจาก schedule_events ใช้ LISTEN connection เดียวกัน แต่ส่งถึง
+        handler เท่านั้น (ไม่ส่งไปยัง client ของ change feed) - ต้องลงทะเบียนก่อน start()
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.connected:
+            await self._connection.close()  # type: ignore[union-attr]
+        self._connection = None
+
+    async def _run(self) -> None:
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        first = True
+        while True:
+            closed = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(dsn)
+                self._connection.add_termination_listener(lambda _conn: closed.set())
+                for channel in self._handlers:
+                    await self._connection.add_listener(channel, self._on_notify)
+                if not first:
+                    self._broadcast({"type": "resync"})
+                first = False
+                await closed.wait()
+                logger.warning("Schedule event listener disconnected, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Schedule event listener unavailable: {exc}")
+            self._connection = None
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _on_notify(self, _conn, _pid, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if channel == CHANNEL:
+            self._broadcast(event)
+        else:
+            self._dispatch(channel, event)
+
+    def _dispatch(self, channel: str, event: Dict[str, Any]) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(event)
+            except Exception as exc:
+                logger.warning(f"Event handler failed ({channel}): {exc}")
+
+    def _broadcast(self, event: Dict[str, Any]) -> None:
+        channels = list(self._handlers) if event.get("type") == "resync" else [CHANNEL]
+        for channel in channels:
+            self._dispatch(channel, event)
+        for subscription in list(self._subscriptions):
+            if event.get("type") == "resync" or subscription.matches(event):
+                subscription.push(event)
+
+    @asynccontextmanager
+    async def subscribe(
+        self,
+        site_ids: Optional[Iterable[int]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ):
+        subscription = Subscription(site_ids, date_from, date_to)
+        self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+
+# Global broker instance (started in app lifespan)
+schedule_events = ScheduleEventBroker()
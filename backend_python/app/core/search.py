@@ -0,0 +1,356 @@
+"""
+Fuzzy search across guards, staff, customers and sites
+ค้นหาด้วยชื่อบางส่วน (ภาษาไทย/อังกฤษ), รหัส, เบอร์โทร หรือเลขบัตรประชาชน
+
+- PostgreSQL + pg_trgm: GIN trigram index บน search_normalize(<เอกสาร>) ของแต่ละตาราง
+  (สร้างด้วย migrations/V19_add_search_indexes.py)
+- ถ้าไม่มี pg_trgm: ใช้ index trigram ในหน่วยความจำ (NgramIndex) ที่อัปเดตแบบ
+  incremental จากตาราง change_log
+
+ข้อความถูก normalize แบบเดียวกันทั้งสองฝั่ง: NFKC (สระอำ = นิคหิต + สระอา),
+ตัวพิมพ์เล็ก, ตัดอักขระความกว้างศูนย์และ - . ( ) / และยุบช่องว่าง
+"""
+import asyncio
+import heapq
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.change_log import change_log_horizon
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MIN_QUERY_LENGTH = 2
+# คะแนนของการจับคู่แบบตรงตัว (ก่อนคะแนนความคล้าย 0-1 ของ trigram)
+WORD_PREFIX_SCORE = 1.0
+SUBSTRING_SCORE = 0.8
+MIN_SIMILARITY = 0.5
+# trigram ที่มีเอกสารมากกว่านี้ไม่ใช้หาผลแบบคล้าย (index ในหน่วยความจำ)
+FUZZY_POSTING_CAP = 2000
+
+
+# entity -> คอลัมน์ที่ค้นหา, label / detail ที่แสดงในผลลัพธ์
+SEARCH_SOURCES: Dict[str, Dict[str, Any]] = {
+    "guards": {
+        "columns": ['"guardId"', '"firstName"', '"lastName"', '"idCardNumber"', "phone"],
+        "label": """"guardId" || ' ' || coalesce(title, '') || "firstName" || ' ' || "lastName\"""",
+        "detail": "phone",
+    },
+    "staff": {
+        "columns": ['"staffId"', '"firstName"', '"lastName"', '"idCardNumber"', "phone"],
+        "label": """"staffId" || ' ' || coalesce(title, '') || "firstName" || ' ' || "lastName\"""",
+        "detail": "position",
+    },
+    "customers": {
+        "columns": ["code", "name", '"taxId"', "phone"],
+        "label": "code || ' ' || name",
+        "detail": "phone",
+    },
+    "sites": {
+        "columns": ['"siteCode"', "name", '"customerName"'],
+        "label": """"siteCode" || ' ' || name""",
+        "detail": '"customerName"',
+    },
+}
+
+
+_STRIP = re.compile(r"[\u200b-\u200d\ufeff\-\.\(\)/]")
+_SPACES = re.compile(r"\s+")
+
+NORMALIZE_FUNCTION_DDL = r"""
+CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text AS $$
+    SELECT btrim(regexp_replace(
+        regexp_replace(lower(normalize(coalesce(value, ''), NFKC)), '[\u200b-\u200d\ufeff\-\.\(\)/]', '', 'g'),
+        '\s+', ' ', 'g'
+    ))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+"""
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Python equivalent of search_normalize()"""
+    value = unicodedata.normalize("NFKC", value or "").lower()
+    return _SPACES.sub(" ", _STRIP.sub("", value)).strip()
+
+
+def document_sql(entity: str) -> str:
+    """ข้อความที่ค้นหาของแต่ละแถว (ยังไม่ normalize) - text || text เป็น IMMUTABLE ใช้ใน index ได้"""
+    return " || ' ' || ".join(f"coalesce({column}, '')" for column in SEARCH_SOURCES[entity]["columns"])
+
+
+def index_expression(entity: str) -> str:
+    return f"search_normalize({document_sql(entity)})"
+
+
+def search_index_ddl() -> List[str]:
+    """DDL ของ pg_trgm (ใช้ใน migration V19)"""
+    statements = [NORMALIZE_FUNCTION_DDL]
+    for entity in SEARCH_SOURCES:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_{entity}_search_trgm "
+            f"ON {entity} USING gin (({index_expression(entity)}) gin_trgm_ops)"
+        )
+    return statements
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ========== PostgreSQL (pg_trgm) ==========
+
+async def search_trigram(
+    db: AsyncSession,
+    query: str,
+    entities: Iterable[str],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """One UNION ALL over the trigram indexes, ranked in SQL"""
+    parts = []
+    for entity in entities:
+        source = SEARCH_SOURCES[entity]
+        doc = index_expression(entity)
+        parts.append(f"""
+            (SELECT '{entity}' AS entity, id, {source["label"]} AS label, {source["detail"]} AS detail,
+                CASE
+                    WHEN {doc} LIKE :prefix OR {doc} LIKE :word_prefix THEN {WORD_PREFIX_SCORE}
+                    WHEN {doc} LIKE :contains THEN {SUBSTRING_SCORE}
+                    ELSE word_similarity(:q, {doc}) * {SUBSTRING_SCORE}
+                END AS score
+            FROM {entity}
+            WHERE {doc} LIKE :contains OR :q <% {doc}
+            ORDER BY score DESC
+            LIMIT :limit)
+        """)
+    escaped = _escape_like(query)
+    result = await db.execute(
+        text(" UNION ALL ".join(parts) + " ORDER BY score DESC, label LIMIT :limit"),
+        {
+            "q": query,
+            "prefix": f"{escaped}%",
+            "word_prefix": f"% {escaped}%",
+            "contains": f"%{escaped}%",
+            "limit": limit,
+        }
+    )
+    return [
+        {"entity": r.entity, "id": str(r.id), "label": r.label, "detail": r.detail, "score": round(float(r.score), 3)}
+        for r in result.all()
+    ]
+
+
+# ========== In-memory fallback ==========
+
+def trigrams(value: str) -> Set[str]:
+    """Trigrams ของแต่ละคำ แบบเดียวกับ pg_trgm (เติมช่องว่าง 2 ตัวหน้า 1 ตัวหลัง)"""
+    grams: Set[str] = set()
+    for word in value.split(" "):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """
+    In-memory trigram index: trigram -> set ของเอกสาร
+
+    เอกสาร key = (entity, id) เก็บ label / detail / ข้อความที่ normalize แล้ว
+    """
+
+    def __init__(self):
+        self._docs: Dict[Tuple[str, int], Tuple[str, Optional[str], str]] = {}
+        self._postings: Dict[str, Set[Tuple[str, int]]] = {}
+        # xmin ของ snapshot ตอนอัปเดตครั้งล่าสุด (เทียบกับ change_log.txid เหมือน /api/sync)
+        self.watermark = 0
+        self.ready = False
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def put(self, entity: str, entity_id: int, label: str, detail: Optional[str], document: str) -> None:
+        key = (entity, entity_id)
+        self.remove(entity, entity_id)
+        normalized = normalize_text(document)
+        self._docs[key] = (label, detail, normalized)
+        for gram in trigrams(normalized):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, entity: str, entity_id: int) -> None:
+        key = (entity, entity_id)
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for gram in trigrams(doc[2]):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+
+    def clear(self) -> None:
+        self._docs.clear()
+        self._postings.clear()
+        self.watermark = 0
+        self.ready = False
+
+    def search(self, query: str, entities: Set[str], limit: int) -> List[Dict[str, Any]]:
+        """
+        1) เอกสารที่มี trigram ครบทุกตัว (intersect จาก posting ที่เล็กที่สุด) แล้วตรวจ substring
+        2) ถ้ายังไม่ครบ limit: จับคู่แบบคล้าย โดยนับเฉพาะ trigram ที่ไม่พบบ่อย
+           (trigram ที่พบในเอกสารจำนวนมากแยกผลไม่ได้และทำให้ช้า)
+        คำค้นยาว 2 ตัวอักษรจับคู่เฉพาะต้นคำ (trigram " xy")
+        """
+        # trigram ภายในคำ (ไม่รวมช่องว่างที่เติม) - คำที่สั้นกว่า 3 ตัวต้องอยู่ต้นคำ
+        inner: Set[str] = set()
+        for word in query.split(" "):
+            if len(word) < 3:
+                inner.add(f" {word}")
+            else:
+                inner.update(word[i:i + 3] for i in range(len(word) - 2))
+        required = sorted((self._postings.get(gram, set()) for gram in inner), key=len)
+        exact = required[0].intersection(*required[1:]) if required else set()
+
+        scored: List[Tuple[float, Tuple[str, int]]] = []
+        word_prefix = f" {query}"
+        for key in exact:
+            if key[0] not in entities:
+                continue
+            document = self._docs[key][2]
+            if document.startswith(query) or word_prefix in document:
+                scored.append((WORD_PREFIX_SCORE, key))
+            elif query in document:
+                scored.append((SUBSTRING_SCORE, key))
+
+        if len(scored) < limit and len(query) >= 3:
+            grams = trigrams(query)
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            needed = max(1, int(len(grams) * MIN_SIMILARITY))
+            rare = [p for p in postings if len(p) <= FUZZY_POSTING_CAP]
+            common = postings[len(rare):]
+            # เอกสารที่มี trigram ตรง >= needed ต้องมี trigram ที่ไม่พบบ่อยตรงอย่างน้อยเท่านี้
+            rare_needed = max(1, needed - len(common))
+            overlap: Counter = Counter()
+            for posting in rare:
+                overlap.update(posting)
+            matched = {key for _, key in scored}
+            for key, count in overlap.items():
+                if count < rare_needed or key in matched or key[0] not in entities:
+                    continue
+                count += sum(1 for posting in common if key in posting)
+                if count >= needed:
+                    scored.append((count / len(grams) * SUBSTRING_SCORE, key))
+
+        top = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], self._docs[item[1]][0] or ""))
+        return [
+            {
+                "entity": key[0], "id": str(key[1]), "label": self._docs[key][0],
+                "detail": self._docs[key][1], "score": round(score, 3)
+            }
+            for score, key in top
+        ]
+
+
+memory_index = NgramIndex()
+
+
+def _source_sql(entity: str, where: str = "") -> str:
+    source = SEARCH_SOURCES[entity]
+    return (
+        f"SELECT id, {source['label']} AS label, {source['detail']} AS detail, "
+        f"{document_sql(entity)} AS document FROM {entity} {where}"
+    )
+
+
+async def _refresh_memory_index(db: AsyncSession, index: NgramIndex) -> None:
+    """
+    สร้างครั้งแรก แล้วอัปเดตเฉพาะแถวที่อยู่ใน change_log หลังจากครั้งก่อน
+    (ใช้ txid ไม่ใช่ change_log.id - แถวของ transaction ที่ commit ช้าถูกอัปเดตในรอบถัดไป ไม่ตกหล่น)
+    ถ้า change_log ช่วงนั้นถูกลบไปแล้ว (app.core.change_log) สร้างใหม่ทั้งหมด
+    """
+    async with index.lock:
+        latest = (await db.execute(
+            text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        )).scalar_one()
+        if index.ready and latest == index.watermark:
+            return
+
+        changes = None
+        if index.ready:
+            changes = await db.execute(
+                text("""
+                    SELECT DISTINCT entity, "entityId" FROM change_log
+                    WHERE entity = ANY(:entities) AND txid >= :last AND txid < :latest
+                """),
+                {"last": index.watermark, "latest": latest, "entities": list(SEARCH_SOURCES)}
+            )
+            # อ่าน horizon หลัง change_log - แถวที่อ่านได้ก่อนการลบ commit ยังครบ
+            if index.watermark < await change_log_horizon(db):
+                index.clear()
+
+        if not index.ready:
+            for entity in SEARCH_SOURCES:
+                result = await db.execute(text(_source_sql(entity)))
+                for r in result.all():
+                    index.put(entity, r.id, r.label, r.detail, r.document)
+            index.watermark = latest
+            index.ready = True
+            return
+
+        changed: Dict[str, List[int]] = {}
+        for entity, entity_id in changes.all():  # type: ignore[union-attr]
+            changed.setdefault(entity, []).append(entity_id)
+        for entity, ids in changed.items():
+            result = await db.execute(text(_source_sql(entity, "WHERE id = ANY(:ids)")), {"ids": ids})
+            found = set()
+            for r in result.all():
+                index.put(entity, r.id, r.label, r.detail, r.document)
+                found.add(r.id)
+            for entity_id in set(ids) - found:
+                index.remove(entity, entity_id)
+        index.watermark = latest
+
+
+# ========== Backend selection ==========
+
+_trigram_available: Optional[bool] = None
+
+
+async def trigram_available(db: AsyncSession) -> bool:
+    """pg_trgm + search_normalize() ติดตั้งแล้วหรือไม่ (ตรวจครั้งเดียวต่อ process)"""
+    global _trigram_available
+    if _trigram_available is None:
+        result = await db.execute(text("""
+            SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+               AND EXISTS (SELECT 1 FROM pg_proc WHERE proname = 'search_normalize')
+        """))
+        _trigram_available = bool(result.scalar_one())
+    return _trigram_available
+
+
+async def search(
+    db: AsyncSession,
+    query: str,
+    entities: Optional[Iterable[str]] = None,
+    limit: int = DEFAULT_LIMIT
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Returns (backend, results) - results เรียงตามคะแนน สูงสุด limit รายการ
+    backend: "pg_trgm" หรือ "memory"
+    """
+    normalized = normalize_text(query)
+    selected = [e for e in SEARCH_SOURCES if entities is None or e in set(entities)]
+    if len(normalized) < MIN_QUERY_LENGTH or not selected:
+        return ("pg_trgm" if _trigram_available else "memory"), []
+
+    if await trigram_available(db):
+        return "pg_trgm", await search_trigram(db, normalized, selected, limit)
+
+    await _refresh_memory_index(db, memory_index)
+    return "memory", memory_index.search(normalized, set(selected), limit)
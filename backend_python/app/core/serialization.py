@@ -0,0 +1,224 @@
+"""
+Fast JSON serialization for list endpoints
+แปลงแถวจากฐานข้อมูลเป็น JSON bytes โดยตรง (orjson) แทนการสร้าง dict แล้วให้
+FastAPI validate ซ้ำกับ response_model ทีละรายการ
+
+Output ต้องเหมือนเดิมทุกประการ: ชุดฟิลด์ตาม response schema, datetime แบบ UTC
+ลงท้ายด้วย "Z" และ Decimal เป็น string (เหมือน Pydantic v2)
+
+NDJSON (Accept: application/x-ndjson) ส่งทีละแถวจาก server-side cursor เป็น chunk
+หน่วยความจำของ worker จึงคงที่ไม่ว่าตารางจะใหญ่แค่ไหน
+"""
+import asyncio
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import anyio
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.database import async_session_maker
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson อยู่ใน requirements.txt
+    orjson = None  # type: ignore[assignment]
+
+
+MAX_CACHED_SUBSETS = 64
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    return _default(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes (orjson ถ้ามี)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSONResponse ที่ใช้ dumps() - content ต้องอยู่ในรูปที่ส่งออกได้แล้ว (ไม่ผ่าน jsonable_encoder)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_list(schema: Type[BaseModel]) -> Callable[[Optional[str]], List[Dict[str, Any]]]:
+    """
+    Converter สำหรับคอลัมน์ JSON text ที่เป็น list ของ object (เช่น Site.employmentDetails)
+    ตัดให้เหลือเฉพาะฟิลด์ของ schema และเติมค่า default แบบเดียวกับ Pydantic
+    (ข้อมูลถูก validate ด้วย schema เดียวกันตอนบันทึกแล้ว จึงไม่ validate ซ้ำ)
+    """
+    plan = [
+        (
+            name,
+            None if field.is_required() else field.get_default(call_default_factory=True),
+            # ตัวเลขที่บันทึกเป็น int (เช่น 600) Pydantic ส่งออกเป็น 600.0
+            float if field.annotation is float else None
+        )
+        for name, field in schema.model_fields.items()
+    ]
+
+    def convert(value: Optional[str]) -> List[Dict[str, Any]]:
+        if not value:
+            return []
+        result = []
+        for item in json.loads(value):
+            if not isinstance(item, dict):
+                continue
+            entry = {}
+            for name, default, cast in plan:
+                field_value = item.get(name, default)
+                entry[name] = cast(field_value) if cast is not None and field_value is not None else field_value
+            result.append(entry)
+        return result
+    return convert
+
+
+def optional_str(value: Any) -> str:
+    return str(value) if value else ""
+
+
+class RowSerializer:
+    """
+    Map result rows onto a response schema's field set without validation
+
+    Args:
+        schema: response model (กำหนดชุดและลำดับฟิลด์)
+        converters: field -> function ที่แปลงค่าจากคอลัมน์ชื่อเดียวกัน (เช่น id -> str)
+    """
+
+    def __init__(
+        self,
+        schema: Type[BaseModel],
+        converters: Optional[Dict[str, Callable[[Any], Any]]] = None,
+        fields: Optional[List[str]] = None
+    ):
+        self.schema = schema
+        self.fields = fields if fields is not None else list(schema.model_fields)
+        self.converters = converters or {}
+        self._defaults = {
+            name: None if field.is_required() else field.get_default(call_default_factory=True)
+            for name, field in schema.model_fields.items()
+        }
+        self._subsets: Dict[Tuple[str, ...], "RowSerializer"] = {}
+
+    def only(self, fields: Optional[str]) -> "RowSerializer":
+        """
+        Sparse fieldset จาก ?fields=a,b,c (whitelist = ฟิลด์ของ response schema)
+        id ถูกใส่เสมอ (ใช้เป็น key / cursor) - ฟิลด์ที่ไม่รู้จัก -> ValueError
+        """
+        if not fields:
+            return self
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in self._defaults]
+        if unknown:
+            raise ValueError(", ".join(unknown))
+        selected = tuple(name for name in self._defaults if name == "id" or name in requested)
+        subset = self._subsets.get(selected)
+        if subset is None:
+            subset = RowSerializer(self.schema, self.converters, list(selected))
+            if len(self._subsets) < MAX_CACHED_SUBSETS:
+                self._subsets[selected] = subset
+        return subset
+
+    def columns(self, model: Any) -> List[Column]:
+        """คอลัมน์ของ model ที่ต้อง SELECT (เฉพาะที่อยู่ใน schema)"""
+        table_columns = model.__table__.c
+        return [table_columns[name] for name in self.fields if name in table_columns]
+
+    def to_dicts(self, rows: Iterable[Any]) -> List[Dict[str, Any]]:
+        """rows: Row จาก select(*columns) หรือ mapping"""
+        plan = [(name, self.converters.get(name), self._defaults[name]) for name in self.fields]
+        result = []
+        for row in rows:
+            mapping = row._mapping if hasattr(row, "_mapping") else row
+            item = {}
+            for name, convert, default in plan:
+                value = mapping.get(name, default)
+                item[name] = convert(value) if convert is not None else value
+            result.append(item)
+        return result
+
+    def response(self, rows: Iterable[Any]) -> FastJSONResponse:
+        return FastJSONResponse(self.to_dicts(rows))
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_SIZE = 1000
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def stream_ndjson(
+    db: AsyncSession,
+    statement: Select,
+    to_dicts: Callable[[Iterable[Any]], List[Dict[str, Any]]],
+    chunk_size: int = NDJSON_CHUNK_SIZE
+) -> StreamingResponse:
+    """
+    Stream a query as NDJSON (หนึ่ง JSON object ต่อบรรทัด)
+
+    ใช้ session ของตัวเอง และ server-side cursor ดึงทีละ chunk_size แถว - ถ้า client
+    ตัดการเชื่อมต่อ generator จะถูก cancel แล้วปิด cursor / transaction ทันที
+    session ของ request (db) ถูกปิดก่อนเริ่ม stream เพื่อคืน connection ให้ pool
+    """
+    await db.close()
+
+    async def produce(queue: "asyncio.Queue[Any]") -> None:
+        try:
+            async with async_session_maker() as session:
+                result = await session.stream(statement.execution_options(yield_per=chunk_size))
+                try:
+                    async for rows in result.partitions():
+                        await queue.put(b"".join(dumps(item) + b"\n" for item in to_dicts(rows)))
+                finally:
+                    await result.close()
+            await queue.put(None)
+        except Exception as exc:
+            await queue.put(exc)
+
+    async def generate():
+        # อ่านฐานข้อมูลใน task แยก - เมื่อ client ตัดการเชื่อมต่อจะ cancel task นี้ครั้งเดียว
+        # ทำให้ปิด cursor / rollback ได้ตามปกติ (ไม่ถูก cancel ซ้ำจาก cancel scope ของ request)
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=2)
+        producer = asyncio.create_task(produce(queue))
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            if not producer.done():
+                producer.cancel()
+            with anyio.CancelScope(shield=True):
+                await asyncio.gather(producer, return_exceptions=True)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,216 @@
+"""
+Shift interval helpers
+แปลงกะงาน (startTime/endTime) ของวันที่จัดตารางให้เป็นช่วงเวลาจริง
+รองรับกะที่ข้ามเที่ยงคืน (เช่น 18:00 - 06:00)
+และคำนวณชั่วโมงทำงาน / OT / กะซ้อนของพนักงานทั้งช่วงเวลา
+"""
+import bisect
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def shift_window(
+    work_date: date,
+    start_time: Optional[time],
+    end_time: Optional[time]
+) -> Tuple[datetime, datetime]:
+    """
+    Convert a shift on a schedule date to a concrete [start, end) interval
+
+    Args:
+        work_date: Schedule date the shift starts on
+        start_time: Shift.startTime (None = unknown)
+        end_time: Shift.endTime (None = unknown)
+
+    Returns:
+        (start, end) datetimes. Shifts that end at or before their start
+        time cross midnight and end on the next day. Shifts without times
+        occupy the whole schedule date.
+
+    Example:
+        >>> shift_window(date(2025, 1, 1), time(18, 0), time(6, 0))
+        (datetime(2025, 1, 1, 18, 0), datetime(2025, 1, 2, 6, 0))
+    """
+    if start_time is None or end_time is None:
+        start = datetime.combine(work_date, time.min)
+        return start, start + timedelta(days=1)
+
+    start = datetime.combine(work_date, start_time)
+    end = datetime.combine(work_date, end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def overlaps(
+    a_start: datetime,
+    a_end: datetime,
+    b_start: datetime,
+    b_end: datetime
+) -> bool:
+    """Check whether two half-open intervals [start, end) overlap"""
+    return a_start < b_end and b_start < a_end
+
+
+class IntervalIndex:
+    """
+    Sorted set of [start, end) intervals with O(log n + k) overlap queries
+
+    Intervals are kept sorted by start. Any interval overlapping [s, e)
+    must start before e and after s - longest, so two bisects bound the
+    candidates; k is the number of intervals starting in that window
+    (normally 0-2 for one guard's shifts).
+    """
+
+    def __init__(self, intervals: Optional[Iterable[Tuple[datetime, datetime]]] = None):
+        self._items: List[Tuple[datetime, datetime]] = sorted(intervals or [])
+        self._longest = max((end - start for start, end in self._items), default=timedelta(0))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Tuple[datetime, datetime]]:
+        return iter(self._items)
+
+    def add(self, start: datetime, end: datetime) -> None:
+        bisect.insort(self._items, (start, end))
+        if end - start > self._longest:
+            self._longest = end - start
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        low = bisect.bisect_right(self._items, (start - self._longest, datetime.max))
+        high = bisect.bisect_left(self._items, (end, datetime.min))
+        return [item for item in self._items[low:high] if overlaps(start, end, item[0], item[1])]
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        return not self.overlapping(start, end)
+
+
+def merged_hours(
+    intervals: Iterable[Tuple[datetime, datetime]],
+    period_start: Optional[datetime] = None,
+    period_end: Optional[datetime] = None
+) -> float:
+    """ชั่วโมงทำงานจริง (ช่วงที่ซ้อนกันนับครั้งเดียว) ตัดตามช่วงเวลาที่กำหนด"""
+    total = 0.0
+    current_start: Optional[datetime] = None
+    current_end: Optional[datetime] = None
+    for start, end in sorted(intervals):
+        if period_start is not None:
+            start = max(start, period_start)
+        if period_end is not None:
+            end = min(end, period_end)
+        if end <= start:
+            continue
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += (current_end - current_start).total_seconds()  # type: ignore[operator]
+            current_start, current_end = start, end
+        elif end > current_end:
+            current_end = end
+    if current_end is not None:
+        total += (current_end - current_start).total_seconds()  # type: ignore[operator]
+    return total / 3600
+
+
+def merge_intervals(intervals: Iterable[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """รวมช่วงที่ซ้อนหรือต่อกันเป็นช่วงเดียว (เรียงตามเวลาเริ่ม)"""
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def overtime_intervals(
+    intervals: Iterable[Tuple[datetime, datetime]],
+    regular_hours: float
+) -> List[Tuple[datetime, datetime]]:
+    """
+    ช่วงเวลาที่เป็น OT ของหนึ่งวันทำงาน (ทุกกะของวันที่จัดตารางเดียวกัน)
+
+    ชั่วโมงแรกนับจากเวลาเริ่มงานเป็นชั่วโมงปกติ ส่วนที่เกิน regular_hours เป็น OT
+    (ไม่แบ่งที่เที่ยงคืน - กะ 18:00 - 06:00 มี OT 02:00 - 06:00 เหมือนกะกลางวัน 12 ชม.)
+
+    Example:
+        >>> overtime_intervals([(datetime(2025, 1, 1, 18), datetime(2025, 1, 2, 6))], 8)
+        [(datetime(2025, 1, 2, 2, 0), datetime(2025, 1, 2, 6, 0))]
+    """
+    remaining = timedelta(hours=regular_hours)
+    overtime = []
+    for start, end in merge_intervals(intervals):
+        if end - start <= remaining:
+            remaining -= end - start
+            continue
+        overtime.append((start + remaining, end))
+        remaining = timedelta(0)
+    return overtime
+
+
+def summarize_hours(
+    rows: Iterable[Dict[str, Any]],
+    period_start: date,
+    period_end: date,
+    regular_hours: float = 8.0
+) -> List[Dict[str, Any]]:
+    """
+    Hours worked, overtime and overlaps per guard over a period
+
+    Args:
+        rows: schedule_guards rows {guardId, guardName, scheduleDate, shiftStart, shiftEnd}
+        period_start / period_end: inclusive schedule dates; hours of
+            overnight shifts are clipped to the period boundaries
+        regular_hours: ชั่วโมงปกติต่อวันทำงาน - ส่วนที่เกินเป็น OT
+
+    Overtime is computed per schedule date on the unsplit shifts, then
+    clipped to the period like the hours. Shifts, overlaps and days worked
+    only count shifts that intersect the period.
+    """
+    window_start = datetime.combine(period_start, time.min)
+    window_end = datetime.combine(period_end + timedelta(days=1), time.min)
+
+    by_guard: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        start, end = row.get("shiftStart"), row.get("shiftEnd")
+        if start is None or end is None:
+            continue
+        guard = by_guard.setdefault(row["guardId"], {"guardName": row.get("guardName"), "days": {}})
+        guard["days"].setdefault(row.get("scheduleDate") or start.date(), []).append((start, end))
+
+    summary = []
+    for guard_id in sorted(by_guard):
+        days = by_guard[guard_id]["days"]
+        intervals = sorted(
+            interval for day_intervals in days.values() for interval in day_intervals
+            if overlaps(interval[0], interval[1], window_start, window_end)
+        )
+        if not intervals:
+            continue
+
+        index = IntervalIndex()
+        overlap_count = 0
+        for start, end in intervals:
+            overlap_count += len(index.overlapping(start, end))
+            index.add(start, end)
+
+        overtime_pieces = [piece for day_intervals in days.values() for piece in overtime_intervals(day_intervals, regular_hours)]
+        total = merged_hours(intervals, window_start, window_end)
+        overtime = merged_hours(overtime_pieces, window_start, window_end)
+        days_worked = sum(
+            1 for day_intervals in days.values()
+            if any(overlaps(start, end, window_start, window_end) for start, end in day_intervals)
+        )
+        summary.append({
+            "guardId": guard_id,
+            "guardName": by_guard[guard_id]["guardName"],
+            "shifts": len(intervals),
+            "daysWorked": days_worked,
+            "hours": round(total, 2),
+            "regularHours": round(total - overtime, 2),
+            "overtimeHours": round(overtime, 2),
+            "overlaps": overlap_count
+        })
+    return summary
@@ -0,0 +1,223 @@
+"""
+Consecutive-workday streak engine
+คำนวณช่วงทำงานต่อเนื่อง (streak) และวันขาดงานของพนักงาน เพื่อตรวจสอบสิทธิ์
+เบี้ยครบ 7 วัน (sevenDayBonus) และเบี้ยขยัน (diligenceBonus)
+
+ใช้ SQL gaps-and-islands (scheduleDate - ROW_NUMBER()) บนตาราง schedule_guards
+คำนวณทุกพนักงานในคำสั่งเดียว แล้ว cache ผลต่อช่วงวันที่ - เมื่อมีการแก้ไขตารางงาน
+จะคำนวณใหม่เฉพาะพนักงานที่ได้รับผลกระทบ
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.schedule_events import schedule_events
+
+
+STREAK_SQL = """
+WITH worked AS (
+    SELECT
+        "guardId" AS guard_id,
+        "scheduleDate" AS work_date,
+        MAX("guardName") AS guard_name,
+        MAX("sevenDayBonus") AS seven_day_bonus,
+        MAX("diligenceBonus") AS diligence_bonus
+    FROM schedule_guards
+    WHERE "scheduleDate" BETWEEN :date_from AND :date_to
+      {guard_filter}
+    GROUP BY "guardId", "scheduleDate"
+),
+islands AS (
+    SELECT
+        *,
+        work_date - CAST(ROW_NUMBER() OVER (PARTITION BY guard_id ORDER BY work_date) AS int) AS island
+    FROM worked
+)
+SELECT
+    guard_id,
+    MAX(guard_name) AS guard_name,
+    MIN(work_date) AS run_start,
+    MAX(work_date) AS run_end,
+    COUNT(*) AS run_days,
+    MAX(seven_day_bonus) AS seven_day_bonus,
+    MAX(diligence_bonus) AS diligence_bonus
+FROM islands
+GROUP BY guard_id, island
+ORDER BY guard_id, run_start
+"""
+
+
+def _summarize(
+    guard_id: str,
+    runs: List[Dict[str, Any]],
+    date_from: date,
+    date_to: date,
+    streak_days: int,
+    max_absences: int
+) -> Dict[str, Any]:
+    """สรุป streak / วันขาดงาน / สิทธิ์เบี้ย ของพนักงานหนึ่งคน (runs เรียงตามวันที่)"""
+    worked_days = sum(r["days"] for r in runs)
+    first_day = runs[0]["start"]
+
+    # วันที่ไม่มีกะตั้งแต่วันแรกที่ทำงานในช่วงนี้ถึงวันสุดท้ายของช่วง
+    absences = []
+    for prev, curr in zip(runs, runs[1:]):
+        absences.append({
+            "start": (prev["end"] + timedelta(days=1)).isoformat(),
+            "end": (curr["start"] - timedelta(days=1)).isoformat(),
+            "days": (curr["start"] - prev["end"]).days - 1
+        })
+    if runs[-1]["end"] < date_to:
+        absences.append({
+            "start": (runs[-1]["end"] + timedelta(days=1)).isoformat(),
+            "end": date_to.isoformat(),
+            "days": (date_to - runs[-1]["end"]).days
+        })
+    absence_days = sum(a["days"] for a in absences)
+
+    seven_day_blocks = sum(r["days"] // streak_days for r in runs)
+    seven_day_rate = max((r["sevenDayBonus"] for r in runs), default=0.0)
+    diligence_rate = max((r["diligenceBonus"] for r in runs), default=0.0)
+    diligence_eligible = absence_days <= max_absences
+
+    return {
+        "guardId": guard_id,
+        "guardName": runs[-1]["guardName"],
+        "firstWorkDay": first_day.isoformat(),
+        "workedDays": worked_days,
+        "absenceDays": absence_days,
+        "longestStreak": max(r["days"] for r in runs),
+        "runs": [
+            {"start": r["start"].isoformat(), "end": r["end"].isoformat(), "days": r["days"]}
+            for r in runs
+        ],
+        "absences": absences,
+        "sevenDayBlocks": seven_day_blocks,
+        "sevenDayBonus": round(seven_day_blocks * seven_day_rate, 2),
+        "diligenceEligible": diligence_eligible,
+        "diligenceBonus": round(diligence_rate, 2) if diligence_eligible else 0.0
+    }
+
+
+async def compute_streaks(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    guard_ids: Optional[Iterable[str]] = None,
+    streak_days: int = 7,
+    max_absences: int = 0
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Streaks and bonus eligibility per guard for a period (one SQL pass)
+
+    Runs are clipped to the period - a streak that started last month counts
+    only its days inside [date_from, date_to].
+    """
+    params: Dict[str, Any] = {"date_from": date_from, "date_to": date_to}
+    guard_filter = ""
+    if guard_ids is not None:
+        params["guard_ids"] = list(guard_ids)
+        guard_filter = 'AND "guardId" = ANY(:guard_ids)'
+
+    result = await db.execute(text(STREAK_SQL.format(guard_filter=guard_filter)), params)
+
+    by_guard: Dict[str, List[Dict[str, Any]]] = {}
+    for r in result.all():
+        by_guard.setdefault(r.guard_id, []).append({
+            "guardName": r.guard_name,
+            "start": r.run_start,
+            "end": r.run_end,
+            "days": r.run_days,
+            "sevenDayBonus": float(r.seven_day_bonus or 0),
+            "diligenceBonus": float(r.diligence_bonus or 0)
+        })
+
+    return {
+        guard_id: _summarize(guard_id, runs, date_from, date_to, streak_days, max_absences)
+        for guard_id, runs in by_guard.items()
+    }
+
+
+class StreakCache:
+    """
+    ผล streak ต่อช่วงวันที่ + รายชื่อพนักงานที่ต้องคำนวณใหม่
+
+    Schedule writes mark the affected guards dirty (ผ่าน schedule change feed
+    จึงครอบคลุมทุก worker); the next read recomputes only those guards.
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._entries: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+
+    def invalidate(self, guard_ids: Optional[Iterable[str]], schedule_date: Optional[date] = None) -> None:
+        """guard_ids = None -> ล้างทั้งหมด (เช่นหลัง resync)"""
+        if guard_ids is None:
+            self._entries.clear()
+            return
+        keys = set(guard_ids)
+        for (date_from, date_to, *_), entry in self._entries.items():
+            if schedule_date is None or date_from <= schedule_date <= date_to:
+                entry["dirty"] |= keys
+
+    async def get(
+        self,
+        db: AsyncSession,
+        date_from: date,
+        date_to: date,
+        streak_days: int = 7,
+        max_absences: int = 0
+    ) -> Dict[str, Dict[str, Any]]:
+        key = (date_from, date_to, streak_days, max_absences)
+        entry = self._entries.get(key)
+        if entry is None or entry["guards"] is None:
+            if len(self._entries) >= self.maxsize and key not in self._entries:
+                self._entries.pop(next(iter(self._entries)))
+            # ลงทะเบียนก่อนคำนวณ - การแก้ไขระหว่างคำนวณจะถูกเก็บใน dirty
+            entry = {"guards": None, "dirty": set()}
+            self._entries[key] = entry
+            entry["guards"] = await compute_streaks(db, date_from, date_to, None, streak_days, max_absences)
+            if not entry["dirty"]:
+                return entry["guards"]
+
+        if entry["dirty"]:
+            dirty: Set[str] = entry["dirty"]
+            entry["dirty"] = set()
+            updated = await compute_streaks(db, date_from, date_to, dirty, streak_days, max_absences)
+            for guard_id in dirty:
+                if guard_id in updated:
+                    entry["guards"][guard_id] = updated[guard_id]
+                else:
+                    entry["guards"].pop(guard_id, None)
+        return entry["guards"]
+
+
+# Global cache instance (invalidated from schedule events)
+streak_cache = StreakCache()
+
+
+def _on_schedule_event(event: Dict[str, Any]) -> None:
+    if event.get("type") == "resync":
+        streak_cache.invalidate(None)
+        return
+    if event.get("type") == "names_changed" and event.get("table") == "schedule_guards":
+        # guardName มาจาก schedule_guards
+        streak_cache.invalidate(None)
+        return
+    if event.get("type") == "shifts_changed":
+        # shiftStart / shiftEnd ของทุกวันที่ที่ใช้กะนี้ถูกคำนวณใหม่
+        streak_cache.invalidate(None)
+        return
+    if "scheduleId" not in event:
+        return
+    try:
+        schedule_date = date.fromisoformat(event["scheduleDate"])
+    except (KeyError, ValueError):
+        streak_cache.invalidate(None)
+        return
+    streak_cache.invalidate(event.get("guards") or [], schedule_date)
+
+
+schedule_events.add_handler(_on_schedule_event)
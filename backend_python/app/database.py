@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from starlette.requests import HTTPConnection
 from app.config import settings
 
 
@@ -22,14 +23,20 @@ async_session_maker = async_sessionmaker(
 Base = declarative_base()
 
 
-async def get_db():
+async def get_db(connection: HTTPConnection):
     """
     Dependency for getting database session
     
     Usage in FastAPI endpoints:
         async def endpoint(db: AsyncSession = Depends(get_db)):
             ...
+
+    Sub-request ของ POST /api/batch ใช้ session ร่วมของ batch (ปิดโดย batch เอง)
     """
+    batch = connection.scope.get("batch")
+    if batch is not None:
+        yield batch.session
+        return
     async with async_session_maker() as session:
         try:
             yield session
@@ -1,11 +1,16 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
-from app.database import init_db, close_db
-from app.api import auth, users, master_data, schedules, audit_logs
+from app.database import init_db, close_db, engine
+from app.api import auth, users, master_data, schedules, audit_logs, reports, reference, sync, search, maintenance, data_quality, alerts, batch
 from app.config import settings
+from app.core.schedule_events import schedule_events
+from app.core.periodic import periodic_jobs
+from app.core.previews import shutdown_pool as shutdown_preview_pool
+from app.core import metrics
+from app.core.query_stats import QueryStatsMiddleware
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,8 +23,16 @@ async def lifespan(app: FastAPI):
     """
     # Startup - Initialize database tables
     await init_db()
+    # Live schedule change feed (LISTEN/NOTIFY)
+    schedule_events.start()
+    # งานที่รันเป็นรอบ (ตรวจชื่อที่คัดลอกไว้, แจ้งเตือนวันหมดอายุ)
+    periodic_jobs.start()
     yield
     # Shutdown - Close database connection
+    await periodic_jobs.stop()
+    shutdown_preview_pool()
+    metrics.mark_process_dead()
+    await schedule_events.stop()
     await close_db()
 
 
@@ -40,8 +53,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Page-Count"],
 )
 
+# Prometheus metrics (latency ต่อ route, SQL, connection pool)
+metrics.instrument_engine(engine)
+app.add_middleware(metrics.MetricsMiddleware)
+# จำนวนคำสั่ง SQL ต่อ request (Server-Timing header + log request ที่ query มากผิดปกติ)
+app.add_middleware(QueryStatsMiddleware)
+
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -49,6 +69,14 @@ app.include_router(users.router, prefix="/api/users", tags=["Users & Roles"])
 app.include_router(master_data.router, prefix="/api", tags=["Master Data"])
 app.include_router(schedules.router, prefix="/api", tags=["Schedules"])
 app.include_router(audit_logs.router, prefix="/api/audit", tags=["Audit Logs"])
+app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
+app.include_router(reference.router, prefix="/api/reference", tags=["Reference Data"])
+app.include_router(sync.router, prefix="/api/sync", tags=["Sync"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(maintenance.router, prefix="/api/maintenance", tags=["Maintenance"])
+app.include_router(data_quality.router, prefix="/api/data-quality", tags=["Data Quality"])
+app.include_router(alerts.router, prefix="/api/alerts", tags=["Alerts"])
+app.include_router(batch.router, prefix="/api/batch", tags=["Batch"])
 
 
 # Custom exception handler for validation errors
@@ -110,3 +138,12 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "database": "PostgreSQL"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus metrics (รวมทุก worker เมื่อตั้ง PROMETHEUS_MULTIPROC_DIR)"""
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Not authenticated"})
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -11,6 +11,12 @@ from app.models.bank import Bank
 from app.models.product import Product
 from app.models.service import Service
 from app.models.schedule import Schedule
+from app.models.schedule_guard import ScheduleGuard
+from app.models.reference_version import ReferenceVersion
+from app.models.change_log import ChangeLog, ChangeLogCheckpoint
+from app.models.data_quality import DataQualityIssue, DataQualityScan
+from app.models.alert import Alert
+from app.models.consistency_cursor import ConsistencyCursor
 
 __all__ = [
     "User",
@@ -22,5 +28,13 @@ __all__ = [
     "Bank",
     "Product",
     "Service",
-    "Schedule"
+    "Schedule",
+    "ScheduleGuard",
+    "ReferenceVersion",
+    "ChangeLog",
+    "ChangeLogCheckpoint",
+    "DataQualityIssue",
+    "DataQualityScan",
+    "Alert",
+    "ConsistencyCursor"
 ]
\ No newline at end of file
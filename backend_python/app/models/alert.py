@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Alert(Base):
+    """
+    รายการที่ใกล้หมดอายุ (materialized โดยงาน expiry_alerts - ไม่แก้ไขจากแอปโดยตรง)
+    """
+    __tablename__ = "alerts"
+    
+    id = Column(Integer, primary_key=True)
+    type = Column(String(50), nullable=False)  # license_expiry, contract_end
+    entity = Column(String(50), nullable=False)  # guards, sites
+    entityId = Column(Integer, nullable=False)
+    code = Column(String(50), nullable=True)  # guardId / siteCode
+    name = Column(String(255), nullable=True)
+    expiresOn = Column(Date, nullable=False)
+    refreshedAt = Column(DateTime(timezone=True), server_default=func.now())
+
+
+Index("idx_alerts_expires_on", Alert.expiresOn)
@@ -0,0 +1,132 @@
+from sqlalchemy import Column, BigInteger, Boolean, Integer, String, DateTime, Index, DDL, event, inspect, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+# ตารางที่บันทึกการเปลี่ยนแปลงสำหรับ GET /api/sync/{entity}
+TRACKED_TABLES = ("customers", "sites", "guards", "staff", "schedules")
+
+# ตารางที่แจ้งทุก worker ผ่าน NOTIFY เมื่อมีการเขียน (ใช้ invalidate cache ของรายงาน)
+# หนึ่ง NOTIFY ต่อ statement - payload ซ้ำใน transaction เดียวกัน PostgreSQL ส่งครั้งเดียว
+TABLE_CHANGE_CHANNEL = "table_changes"
+NOTIFY_TABLES = ("sites", "schedule_guards")
+
+
+class ChangeLog(Base):
+    """
+    Row-level change log (เขียนโดย trigger ไม่ใช่โดยแอป)
+
+    txid = transaction ที่แก้ไข ใช้เป็น watermark แทนเวลา (ไม่ขึ้นกับนาฬิกาของ worker)
+    """
+    __tablename__ = "change_log"
+    
+    id = Column(BigInteger, primary_key=True)
+    entity = Column(String(50), nullable=False)  # ชื่อตาราง
+    entityId = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # INSERT, UPDATE, DELETE
+    txid = Column(BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text::bigint)"))
+    changedAt = Column(DateTime(timezone=True), server_default=func.now())
+
+
+Index("idx_change_log_entity_txid", ChangeLog.entity, ChangeLog.txid)
+
+
+class ChangeLogCheckpoint(Base):
+    """
+    xmin ของ snapshot ณ แต่ละรอบของงาน change_log_retention (ใช้หา txid ของ N วันก่อน)
+    pruned = แถว change_log ที่ txid ต่ำกว่านี้ถูกลบแล้ว
+    """
+    __tablename__ = "change_log_checkpoints"
+
+    id = Column(BigInteger, primary_key=True)
+    txid = Column(BigInteger, nullable=False)
+    pruned = Column(Boolean, nullable=False, default=False)
+    createdAt = Column(DateTime(timezone=True), server_default=func.now())
+
+
+CHANGE_LOG_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION log_row_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO change_log (entity, "entityId", operation)
+    VALUES (TG_TABLE_NAME, CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END, TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def change_log_trigger_ddl(table: str) -> list:
+    return [
+        f"DROP TRIGGER IF EXISTS trg_{table}_change_log ON {table}",
+        f"""CREATE TRIGGER trg_{table}_change_log
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION log_row_change()""",
+    ]
+
+
+TABLE_CHANGE_FUNCTION_DDL = f"""
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{TABLE_CHANGE_CHANNEL}', json_build_object('table', TG_TABLE_NAME)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def table_change_trigger_ddl(table: str) -> list:
+    return [
+        f"DROP TRIGGER IF EXISTS trg_{table}_notify_change ON {table}",
+        f"""CREATE TRIGGER trg_{table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()""",
+    ]
+
+
+def table_change_ddl() -> list:
+    """DDL ของ trigger แจ้งการเปลี่ยนแปลงระดับตาราง (ใช้ทั้งตอน create_all และใน migration V24)"""
+    statements = [TABLE_CHANGE_FUNCTION_DDL]
+    for table in NOTIFY_TABLES:
+        statements.extend(table_change_trigger_ddl(table))
+    return statements
+
+
+def change_log_ddl() -> list:
+    """DDL ทั้งหมดของ trigger (ใช้ทั้งตอน create_all และใน migration V18)"""
+    statements = [CHANGE_LOG_FUNCTION_DDL]
+    for table in TRACKED_TABLES:
+        statements.extend(change_log_trigger_ddl(table))
+    return statements
+
+
+# create_all (init_db) ติดตั้ง trigger ที่ยังไม่มีให้ฐานข้อมูลใหม่ด้วย
+@event.listens_for(Base.metadata, "after_create")
+def _install_change_log_triggers(target, connection, **kw):
+    tables = set(inspect(connection).get_table_names())
+    if "change_log" not in tables:
+        return
+    installed = set(connection.execute(
+        text("SELECT tgname FROM pg_trigger WHERE tgname LIKE 'trg\\_%\\_change\\_log'")
+    ).scalars())
+    missing = [t for t in TRACKED_TABLES if t in tables and f"trg_{t}_change_log" not in installed]
+    if not missing:
+        return
+    connection.execute(DDL(CHANGE_LOG_FUNCTION_DDL))
+    for table in missing:
+        for statement in change_log_trigger_ddl(table):
+            connection.execute(DDL(statement))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_table_change_triggers(target, connection, **kw):
+    tables = set(inspect(connection).get_table_names())
+    installed = set(connection.execute(
+        text("SELECT tgname FROM pg_trigger WHERE tgname LIKE 'trg\\_%\\_notify\\_change'")
+    ).scalars())
+    missing = [t for t in NOTIFY_TABLES if t in tables and f"trg_{t}_notify_change" not in installed]
+    if not missing:
+        return
+    connection.execute(DDL(TABLE_CHANGE_FUNCTION_DDL))
+    for table in missing:
+        for statement in table_change_trigger_ddl(table):
+            connection.execute(DDL(statement))
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime
+from app.database import Base
+
+
+class ConsistencyCursor(Base):
+    """
+    ตำแหน่งที่ ConsistencyChecker ตรวจถึงของแต่ละ propagation
+    ใช้ร่วมกันทุก worker (อัปเดตใน session ที่ถือ advisory lock ของตัวตรวจ)
+    """
+    __tablename__ = "consistency_cursors"
+    
+    name = Column(String(100), primary_key=True)  # Propagation.name เช่น sites.customer
+    lastId = Column(BigInteger, nullable=False, default=0)  # id สุดท้ายของตารางปลายทางที่ตรวจแล้ว
+    repaired = Column(BigInteger, nullable=False, default=0)
+    sweeps = Column(Integer, nullable=False, default=0)  # จำนวนรอบที่ตรวจครบทั้งตาราง
+    checkedAt = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class DataQualityIssue(Base):
+    """ปัญหาคุณภาพข้อมูลที่พบจากการสแกน (หนึ่งแถวต่อ entity + rule + field)"""
+    __tablename__ = "data_quality_issues"
+    
+    id = Column(BigInteger, primary_key=True)
+    entity = Column(String(50), nullable=False)  # guards, staff
+    entityId = Column(Integer, nullable=False)
+    code = Column(String(50), nullable=True)  # guardId / staffId
+    rule = Column(String(50), nullable=False)  # id_card_invalid, phone_invalid, bank_code_unknown, license_expired
+    field = Column(String(50), nullable=False)
+    value = Column(String(200), nullable=True)
+    message = Column(String(200), nullable=False)
+    detectedAt = Column(DateTime(timezone=True), server_default=func.now())
+
+
+Index("idx_data_quality_issue_rule", DataQualityIssue.entity, DataQualityIssue.rule)
+Index("idx_data_quality_issue_entity", DataQualityIssue.entity, DataQualityIssue.entityId)
+
+
+class DataQualityScan(Base):
+    """ประวัติการสแกน - watermark ใช้เป็นจุดเริ่มของการสแกนแบบ incremental ครั้งถัดไป"""
+    __tablename__ = "data_quality_scans"
+    
+    id = Column(Integer, primary_key=True)
+    mode = Column(String(20), nullable=False)  # full, incremental
+    watermark = Column(BigInteger, nullable=False)  # xmin ของ snapshot ณ เวลาเริ่มสแกน (change_log.txid)
+    bankCodes = Column(Text, nullable=True)  # รหัสธนาคารที่ใช้ตรวจ (คั่นด้วย ,) - banks ไม่อยู่ใน change_log
+    scanned = Column(Integer, nullable=False, default=0)
+    issues = Column(Integer, nullable=False, default=0)
+    startedAt = Column(DateTime(timezone=True), server_default=func.now())
+    finishedAt = Column(DateTime(timezone=True), nullable=True)
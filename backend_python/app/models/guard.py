@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Numeric
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Numeric, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -59,3 +59,7 @@ class Guard(Base):
     isActive = Column(Boolean, default=True)
     createdAt = Column(DateTime(timezone=True), server_default=func.now())
     updatedAt = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# range scan ของการแจ้งเตือนวันหมดอายุ (app/core/expiry_alerts.py)
+Index('idx_guards_license_expiry', Guard.licenseExpiry)
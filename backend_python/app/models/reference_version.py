@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, Sequence
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+# Global counter shared by all reference tables (ทุก worker เห็นค่าเดียวกัน)
+reference_version_seq = Sequence("reference_version_seq", metadata=Base.metadata)
+
+
+class ReferenceVersion(Base):
+    """Latest change version of a reference-data table (banks, shifts, ...)"""
+    __tablename__ = "reference_versions"
+    
+    entity = Column(String(50), primary_key=True)  # banks, shifts, products, services, roles, companyPrefixes
+    version = Column(BigInteger, nullable=False, default=0)
+    updatedAt = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -3,7 +3,7 @@
 Schedule Models
 ตารางงานสำหรับจัดพนักงานตามหน่วยงานและวันที่
 """
-from sqlalchemy import Column, Integer, String, Date, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -32,6 +32,7 @@ class Schedule(Base):
 
     # Metadata
     isActive = Column(Boolean, default=True, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False, comment="เพิ่มขึ้นทุกครั้งที่แก้ไข (ใช้กับ live change feed)")
     createdAt = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updatedAt = Column(DateTime(timezone=True), onupdate=func.now())
     createdBy = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -39,3 +40,7 @@ class Schedule(Base):
 
     def __repr__(self):
         return f"<Schedule(id={self.id}, date={self.scheduleDate}, site={self.siteName})>"
+
+
+# หนึ่งหน่วยงานมีตารางงานได้หนึ่งรายการต่อวัน (รวมที่ถูก soft delete)
+Index('uq_schedule_site_date', Schedule.siteId, Schedule.scheduleDate, unique=True)
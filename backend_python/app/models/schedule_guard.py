@@ -68,10 +68,20 @@ class ScheduleGuard(Base):
     
     # Shift Information
     shift = Column(
-        String(20),
+        String(50),
         nullable=False,
         index=True,
-        comment="กะงาน: day หรือ night"
+        comment="รหัสกะงาน (shiftCode)"
+    )
+    shiftStart = Column(
+        DateTime,
+        nullable=True,
+        comment="เวลาเริ่มกะจริง (วันที่ + Shift.startTime)"
+    )
+    shiftEnd = Column(
+        DateTime,
+        nullable=True,
+        comment="เวลาสิ้นสุดกะจริง (กะข้ามคืนจะเป็นวันถัดไป)"
     )
     position = Column(
         String(100),
@@ -149,3 +159,9 @@ Index('idx_schedule_guard_date_range',
       ScheduleGuard.guardId,
       ScheduleGuard.scheduleDate,
       ScheduleGuard.shift)
+
+# ใช้ตรวจสอบการจัดพนักงานซ้อนกะ (guard + ช่วงเวลากะ)
+Index('idx_schedule_guard_interval',
+      ScheduleGuard.guardId,
+      ScheduleGuard.shiftStart,
+      ScheduleGuard.shiftEnd)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Date, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -43,3 +43,7 @@ class Site(Base):
     isActive = Column(Boolean, default=True)
     createdAt = Column(DateTime(timezone=True), server_default=func.now())
     updatedAt = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# range scan ของการแจ้งเตือนวันหมดอายุ (app/core/expiry_alerts.py)
+Index('idx_sites_contract_end', Site.contractEndDate)
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal
+
+
+# จำนวน sub-request สูงสุดต่อหนึ่ง batch
+MAX_BATCH_REQUESTS = 20
+
+
+class BatchSubRequest(BaseModel):
+    id: str = Field(..., max_length=50, description="ชื่อที่ใช้จับคู่ผลลัพธ์ เช่น site, shifts")
+    method: Literal["GET"] = "GET"
+    path: str = Field(..., max_length=2000, description="path + query string เช่น /api/sites/1")
+
+    @field_validator("path")
+    @classmethod
+    def validate_path(cls, v: str) -> str:
+        if not v.startswith("/api/") or v.split("?", 1)[0].rstrip("/") == "/api/batch":
+            raise ValueError("path ต้องขึ้นต้นด้วย /api/ และไม่ใช่ /api/batch")
+        return v
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=MAX_BATCH_REQUESTS)
+
+    @field_validator("requests")
+    @classmethod
+    def validate_unique_ids(cls, v: List[BatchSubRequest]) -> List[BatchSubRequest]:
+        if len({r.id for r in v}) != len(v):
+            raise ValueError("id ของ sub-request ต้องไม่ซ้ำกัน")
+        return v
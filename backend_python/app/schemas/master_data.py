@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing import Optional, List
 from decimal import Decimal
 from datetime import datetime, date
@@ -673,4 +673,65 @@ class ShiftResponse(BaseModel):
     startTime: Optional[str] = None
     endTime: Optional[str] = None
     isActive: bool
-    createdAt: Optional[datetime] = None
\ No newline at end of file
+    createdAt: Optional[datetime] = None
+
+# ========== BATCH UPDATE SCHEMAS (guards / staff) ==========
+
+class PersonnelBatchFilter(BaseModel):
+    """เลือกแถวด้วยค่าที่ตรงกันทุกฟิลด์ที่ระบุ"""
+    model_config = ConfigDict(extra="forbid")
+
+    isActive: Optional[bool] = None
+    bankCode: Optional[str] = None
+    position: Optional[str] = None
+    department: Optional[str] = None
+
+
+class GuardBatchChanges(BaseModel):
+    """ฟิลด์ที่แก้ไขแบบกลุ่มได้ (ไม่รวมรหัส ชื่อ และเลขบัตร/บัญชีที่เป็นของแต่ละคน)"""
+    model_config = ConfigDict(extra="forbid")
+
+    isActive: Optional[bool] = None
+    bankCode: Optional[str] = None
+    position: Optional[str] = None
+    department: Optional[str] = None
+    salary: Optional[Decimal] = None
+    salaryType: Optional[str] = None
+    paymentMethod: Optional[str] = None
+    licenseExpiry: Optional[date] = None
+
+
+class StaffBatchChanges(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    isActive: Optional[bool] = None
+    bankCode: Optional[str] = None
+    position: Optional[str] = None
+    department: Optional[str] = None
+    salary: Optional[Decimal] = None
+
+
+class GuardBatchUpdate(BaseModel):
+    """ระบุ ids หรือ filter อย่างใดอย่างหนึ่ง"""
+    ids: Optional[List[str]] = Field(None, max_length=5000)
+    filter: Optional[PersonnelBatchFilter] = None
+    changes: GuardBatchChanges
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError('ต้องระบุ ids หรือ filter อย่างใดอย่างหนึ่ง')
+        if self.filter is not None and not self.filter.model_fields_set:
+            raise ValueError('filter ต้องมีอย่างน้อยหนึ่งเงื่อนไข')
+        if not self.changes.model_fields_set:
+            raise ValueError('ต้องระบุฟิลด์ที่ต้องการแก้ไขอย่างน้อยหนึ่งฟิลด์')
+        return self
+
+
+class StaffBatchUpdate(GuardBatchUpdate):
+    changes: StaffBatchChanges  # type: ignore[assignment]
+
+
+class BatchUpdateResponse(BaseModel):
+    updated: int
+    ids: List[str]
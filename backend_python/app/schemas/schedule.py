@@ -60,6 +60,7 @@ class ScheduleResponse(BaseModel):
     totalGuardsNight: int
     totalGuards: int
     isActive: bool
+    version: int = 1
     createdAt: datetime
     updatedAt: Optional[datetime] = None
     createdBy: Optional[int] = None
@@ -76,3 +77,37 @@ class ScheduleListItem(BaseModel):
     totalGuardsNight: int
     totalGuards: int
     isActive: bool
+    version: int = 1
+
+
+class ScheduleDateCount(BaseModel):
+    """จำนวนตารางงาน/พนักงาน ต่อวันที่"""
+    scheduleDate: date
+    schedules: int
+    guards: int
+
+
+class ScheduleSiteCount(BaseModel):
+    """จำนวนตารางงาน/พนักงาน ต่อหน่วยงาน"""
+    siteId: int
+    siteName: str
+    schedules: int
+    guards: int
+
+
+class ScheduleSummary(BaseModel):
+    """สรุปจำนวนตารางงาน (GET /schedules?summary=true)"""
+    totalSchedules: int
+    totalGuards: int
+    byDate: List[ScheduleDateCount]
+    bySite: List[ScheduleSiteCount]
+
+
+# ========== AUTO ROSTER SCHEMAS ==========
+
+class AutoRosterRequest(BaseModel):
+    """ขอข้อเสนอการจัดตารางงานอัตโนมัติ"""
+    startDate: date = Field(..., description="วันที่เริ่มต้น")
+    endDate: date = Field(..., description="วันที่สิ้นสุด")
+    siteIds: Optional[List[int]] = Field(None, description="หน่วยงานที่ต้องการจัด (ไม่ระบุ = ทุกหน่วยงาน)")
+    lookbackDays: int = Field(14, ge=0, le=90, description="จำนวนวันย้อนหลังสำหรับความต่อเนื่องของพนักงาน")
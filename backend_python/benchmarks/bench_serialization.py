@@ -0,0 +1,87 @@
+"""
+Benchmark: list endpoint serialization
+เปรียบเทียบจำนวนแถวต่อวินาทีระหว่างวิธีเดิม (สร้าง dict ต่อแถว + validate กับ
+response_model + jsonable_encoder + json.dumps) กับ RowSerializer + orjson
+
+ใช้ข้อมูลจำลองในหน่วยความจำ (ไม่ต้องต่อฐานข้อมูล)
+
+Usage:
+    python benchmarks/bench_serialization.py [rows]
+"""
+import json
+import sys
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import List
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.serialization import RowSerializer, dumps
+from app.schemas.master_data import GuardResponse
+
+
+def make_rows(count: int) -> List[dict]:
+    created = datetime(2025, 1, 1, 8, 30, tzinfo=timezone.utc)
+    return [
+        {
+            "id": i, "guardId": f"PG-{i:05d}", "title": "นาย", "firstName": f"สมชาย{i}",
+            "lastName": "ใจดี", "birthDate": date(1990, 1, 1), "nationality": "ไทย",
+            "religion": "พุทธ", "idCardNumber": "1234567890123",
+            "addressIdCard": "99/1 ถนนสุขุมวิท กรุงเทพฯ", "addressCurrent": "99/1 ถนนสุขุมวิท กรุงเทพฯ",
+            "phone": "0812345678", "education": "ม.6", "licenseNumber": f"L{i}",
+            "licenseExpiry": date(2027, 1, 1), "startDate": date(2024, 1, 1), "isActive": True,
+            "bankAccountName": "สมชาย ใจดี", "bankAccountNo": "1234567890", "bankCode": "KBANK",
+            "maritalStatus": "โสด", "spouseName": None, "emergencyContactName": "สมหญิง",
+            "emergencyContactPhone": "0898765432", "emergencyContactRelation": "มารดา",
+            "createdAt": created,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def current_path(rows: List[dict]) -> bytes:
+    """เหมือน get_guards เดิม: dict ต่อแถว -> validate -> jsonable_encoder -> json.dumps"""
+    adapter = TypeAdapter(List[GuardResponse])
+    content = [{**row, "id": str(row["id"])} for row in rows]
+    validated = adapter.validate_python(content)
+    encoded = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(rows: List[dict]) -> bytes:
+    serializer = RowSerializer(GuardResponse, {"id": str})
+    return dumps(serializer.to_dicts(rows))
+
+
+def measure(label: str, func, rows: List[dict], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - started)
+    rate = len(rows) / best
+    print(f"   {label:<16} {best * 1000:8.1f} ms   {rate:12,.0f} rows/s")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = make_rows(count)
+
+    if json.loads(current_path(rows[:100])) != json.loads(fast_path(rows[:100])):
+        print("❌ Output mismatch between current and fast path")
+        sys.exit(1)
+
+    print(f"🚀 Serializing {count:,} guards")
+    before = measure("current path", current_path, rows)
+    after = measure("fast path", fast_path, rows)
+    print(f"✅ Speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
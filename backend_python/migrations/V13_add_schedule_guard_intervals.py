@@ -0,0 +1,88 @@
+"""
+Migration V13: Add shift interval columns to schedule_guards and backfill from schedules
+ใช้สำหรับตรวจสอบการจัดพนักงานซ้อนกะข้ามหน่วยงาน
+"""
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, insert
+from app.database import engine, Base
+from app.models.schedule_guard import ScheduleGuard
+from app.core.schedule_conflicts import build_guard_rows
+
+
+BATCH_SIZE = 500
+
+
+async def run_migration():
+    """Add shiftStart/shiftEnd columns, interval index and backfill rows"""
+
+    # สร้างตาราง schedule_guards ถ้ายังไม่มี
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V13: Add schedule guard intervals...")
+        await conn.run_sync(Base.metadata.create_all, tables=[ScheduleGuard.__table__])
+
+        await conn.execute(text('ALTER TABLE schedule_guards ADD COLUMN IF NOT EXISTS "shiftStart" TIMESTAMP'))
+        await conn.execute(text('ALTER TABLE schedule_guards ADD COLUMN IF NOT EXISTS "shiftEnd" TIMESTAMP'))
+        await conn.execute(text('ALTER TABLE schedule_guards ALTER COLUMN shift TYPE VARCHAR(50)'))
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_schedule_guard_interval
+            ON schedule_guards("guardId", "shiftStart", "shiftEnd")
+        """))
+        print("✅ Added shiftStart/shiftEnd columns and interval index")
+
+        result = await conn.execute(text('SELECT "shiftCode", "startTime", "endTime" FROM shifts'))
+        shift_times = {code: (start, end) for code, start, end in result.all()}
+
+    # Backfill ทีละ batch (แต่ละ batch commit แยกกัน)
+    last_id = 0
+    total_schedules = 0
+    total_rows = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
+                SELECT id, "scheduleDate", "siteId", "siteName", shifts
+                FROM schedules
+                WHERE id > :last_id AND "isActive" = true
+                ORDER BY id
+                LIMIT :limit
+            """), {"last_id": last_id, "limit": BATCH_SIZE})
+            schedules = result.all()
+            if not schedules:
+                break
+
+            ids = [s.id for s in schedules]
+            await conn.execute(
+                text('DELETE FROM schedule_guards WHERE "scheduleId" = ANY(:ids)'),
+                {"ids": ids}
+            )
+
+            rows = []
+            for s in schedules:
+                try:
+                    shifts_data = json.loads(s.shifts) if s.shifts else {}
+                except ValueError:
+                    print(f"⚠️ Schedule {s.id}: invalid shifts JSON, skipped")
+                    continue
+                for row in build_guard_rows(s.scheduleDate, s.siteId, s.siteName, shifts_data, shift_times):
+                    rows.append({**row, "scheduleId": s.id})
+
+            if rows:
+                await conn.execute(insert(ScheduleGuard), rows)
+
+            last_id = ids[-1]
+            total_schedules += len(schedules)
+            total_rows += len(rows)
+            print(f"   ... {total_schedules} schedules, {total_rows} guard rows")
+
+    print(f"✅ Backfilled {total_rows} guard rows from {total_schedules} schedules")
+    print("✅ Migration V13 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
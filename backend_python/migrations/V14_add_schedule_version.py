@@ -0,0 +1,29 @@
+"""
+Migration V14: Add version column to schedules
+ใช้สำหรับ live change feed - client เทียบ version เพื่อโหลดเฉพาะตารางงานที่เปลี่ยน
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Add schedules.version (default 1)"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V14: Add schedule version...")
+        await conn.execute(text(
+            'ALTER TABLE schedules ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1'
+        ))
+        print("✅ Added version column to schedules")
+
+    print("✅ Migration V14 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
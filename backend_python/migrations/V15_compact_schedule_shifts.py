@@ -0,0 +1,75 @@
+"""
+Migration V15: Convert Schedule.shifts to the compact reference format
+เก็บเฉพาะ reference ของพนักงาน + ค่าที่ต่างจากอัตราของหน่วยงาน (ดู app/core/schedule_codec.py)
+"""
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, bindparam
+from app.database import engine
+from app.core.schedule_codec import rate_card, encode_shifts, is_compact
+
+
+BATCH_SIZE = 500
+
+
+async def run_migration():
+    """Re-encode every schedule in batches (แต่ละ batch commit แยกกัน - รันซ้ำได้)"""
+    print("🚀 Starting migration V15: Compact schedule shifts...")
+
+    last_id = 0
+    converted = 0
+    bytes_before = 0
+    bytes_after = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
+                SELECT s.id, s.shifts, site."employmentDetails"
+                FROM schedules s
+                LEFT JOIN sites site ON site.id = s."siteId"
+                WHERE s.id > :last_id
+                ORDER BY s.id
+                LIMIT :limit
+            """), {"last_id": last_id, "limit": BATCH_SIZE})
+            schedules = result.all()
+            if not schedules:
+                break
+
+            updates = []
+            for s in schedules:
+                try:
+                    stored = json.loads(s.shifts) if s.shifts else {}
+                    details = json.loads(s.employmentDetails) if s.employmentDetails else []
+                except ValueError:
+                    print(f"⚠️ Schedule {s.id}: invalid JSON, skipped")
+                    continue
+                if is_compact(stored):
+                    continue
+                encoded = json.dumps(encode_shifts(stored, rate_card(details)), ensure_ascii=False)
+                updates.append({"schedule_id": s.id, "shifts": encoded})
+                bytes_before += len(s.shifts.encode("utf-8"))
+                bytes_after += len(encoded.encode("utf-8"))
+
+            if updates:
+                await conn.execute(
+                    text("UPDATE schedules SET shifts = :shifts WHERE id = :schedule_id").bindparams(
+                        bindparam("schedule_id"), bindparam("shifts")
+                    ),
+                    updates
+                )
+
+            last_id = schedules[-1].id
+            converted += len(updates)
+            print(f"   ... up to id {last_id}, {converted} converted")
+
+    print(f"✅ Converted {converted} schedules ({bytes_before:,} → {bytes_after:,} bytes)")
+    print("✅ Migration V15 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
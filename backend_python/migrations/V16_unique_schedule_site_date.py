@@ -0,0 +1,49 @@
+"""
+Migration V16: Unique index on schedules (siteId, scheduleDate)
+ลบตารางงานซ้ำของหน่วยงาน/วันเดียวกันก่อนสร้าง unique index
+(เก็บรายการที่ active และแก้ไขล่าสุดไว้)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Remove duplicate schedules then create uq_schedule_site_date"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V16: Unique schedule per site and date...")
+
+        result = await conn.execute(text("""
+            WITH ranked AS (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY "siteId", "scheduleDate"
+                    ORDER BY "isActive" DESC, COALESCE("updatedAt", "createdAt") DESC, id DESC
+                ) AS rn
+                FROM schedules
+            )
+            DELETE FROM schedules
+            WHERE id IN (SELECT id FROM ranked WHERE rn > 1)
+            RETURNING id, "siteId", "scheduleDate"
+        """))
+        removed = result.all()
+        for row in removed:
+            print(f"   🗑️ Removed duplicate schedule {row.id} (site {row.siteId}, {row.scheduleDate})")
+        print(f"✅ Removed {len(removed)} duplicate schedules")
+
+        await conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_schedule_site_date
+            ON schedules("siteId", "scheduleDate")
+        """))
+        print("✅ Created unique index uq_schedule_site_date")
+
+    print("✅ Migration V16 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
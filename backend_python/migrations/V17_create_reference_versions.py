@@ -0,0 +1,38 @@
+"""
+Migration V17: Reference-data versions
+สร้าง sequence และตาราง reference_versions สำหรับ cache ข้อมูลอ้างอิง
+(ธนาคาร, กะ, สินค้า, บริการ, สิทธิ์, prefix บริษัท)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Create reference_version_seq and reference_versions"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V17: Reference-data versions...")
+
+        await conn.execute(text("CREATE SEQUENCE IF NOT EXISTS reference_version_seq"))
+        print("✅ Created sequence reference_version_seq")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS reference_versions (
+                entity VARCHAR(50) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0,
+                "updatedAt" TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )
+        """))
+        print("✅ Created table reference_versions")
+
+    print("✅ Migration V17 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -0,0 +1,47 @@
+"""
+Migration V18: Change log for delta sync
+สร้างตาราง change_log และ trigger บันทึกการเปลี่ยนแปลงของ customers, sites,
+guards, staff และ schedules (ใช้โดย GET /api/sync/{entity})
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+from app.models.change_log import change_log_ddl
+
+
+async def run_migration():
+    """Create change_log + triggers"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V18: Change log...")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                id BIGSERIAL PRIMARY KEY,
+                entity VARCHAR(50) NOT NULL,
+                "entityId" INTEGER NOT NULL,
+                operation VARCHAR(10) NOT NULL,
+                txid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+                "changedAt" TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )
+        """))
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_change_log_entity_txid
+            ON change_log (entity, txid)
+        """))
+        print("✅ Created table change_log")
+
+        for statement in change_log_ddl():
+            await conn.execute(text(statement))
+        print("✅ Installed change log triggers")
+
+    print("✅ Migration V18 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -0,0 +1,39 @@
+"""
+Migration V19: Trigram search indexes
+ติดตั้ง pg_trgm, ฟังก์ชัน search_normalize() และ GIN index สำหรับ GET /api/search
+ถ้าติดตั้ง pg_trgm ไม่ได้ (ไม่มี extension หรือไม่มีสิทธิ์) API จะใช้ index ในหน่วยความจำแทน
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+from app.core.search import search_index_ddl
+
+
+async def run_migration():
+    """Create pg_trgm extension + search indexes"""
+    print("🚀 Starting migration V19: Search indexes...")
+
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        print("✅ Installed extension pg_trgm")
+    except Exception as e:
+        print(f"⚠️  pg_trgm not available ({e}) - /api/search will use the in-memory index")
+        return
+
+    async with engine.begin() as conn:
+        for statement in search_index_ddl():
+            await conn.execute(text(statement))
+    print("✅ Created search_normalize() and trigram indexes")
+
+    print("✅ Migration V19 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
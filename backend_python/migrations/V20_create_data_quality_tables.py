@@ -0,0 +1,61 @@
+"""
+Migration V20: Data quality scanner
+สร้างตาราง data_quality_issues และ data_quality_scans (ใช้โดย /api/data-quality)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Create data quality tables"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V20: Data quality tables...")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS data_quality_issues (
+                id BIGSERIAL PRIMARY KEY,
+                entity VARCHAR(50) NOT NULL,
+                "entityId" INTEGER NOT NULL,
+                code VARCHAR(50),
+                rule VARCHAR(50) NOT NULL,
+                field VARCHAR(50) NOT NULL,
+                value VARCHAR(200),
+                message VARCHAR(200) NOT NULL,
+                "detectedAt" TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )
+        """))
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_data_quality_issue_rule
+            ON data_quality_issues (entity, rule)
+        """))
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_data_quality_issue_entity
+            ON data_quality_issues (entity, "entityId")
+        """))
+        print("✅ Created table data_quality_issues")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS data_quality_scans (
+                id SERIAL PRIMARY KEY,
+                mode VARCHAR(20) NOT NULL,
+                "changeLogId" BIGINT NOT NULL,
+                scanned INTEGER NOT NULL DEFAULT 0,
+                issues INTEGER NOT NULL DEFAULT 0,
+                "startedAt" TIMESTAMP WITH TIME ZONE DEFAULT now(),
+                "finishedAt" TIMESTAMP WITH TIME ZONE
+            )
+        """))
+        print("✅ Created table data_quality_scans")
+
+    print("✅ Migration V20 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
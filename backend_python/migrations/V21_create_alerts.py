@@ -0,0 +1,54 @@
+"""
+Migration V21: Expiry alerts
+สร้างตาราง alerts และ index ของ guards."licenseExpiry" / sites."contractEndDate"
+(ใช้โดยงาน expiry_alerts และ GET /api/alerts)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Create alerts table + expiry indexes"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V21: Expiry alerts...")
+
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_guards_license_expiry
+            ON guards ("licenseExpiry")
+        """))
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_sites_contract_end
+            ON sites ("contractEndDate")
+        """))
+        print("✅ Created expiry indexes")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS alerts (
+                id SERIAL PRIMARY KEY,
+                type VARCHAR(50) NOT NULL,
+                entity VARCHAR(50) NOT NULL,
+                "entityId" INTEGER NOT NULL,
+                code VARCHAR(50),
+                name VARCHAR(255),
+                "expiresOn" DATE NOT NULL,
+                "refreshedAt" TIMESTAMP WITH TIME ZONE DEFAULT now()
+            )
+        """))
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_alerts_expires_on
+            ON alerts ("expiresOn")
+        """))
+        print("✅ Created table alerts")
+
+    print("✅ Migration V21 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -0,0 +1,47 @@
+"""
+Migration V22: Content-addressed contract files
+ย้ายเอกสารสัญญาแบบเดิม (uploads/contracts/<siteCode>_<uuid>.<ext>) ไปเก็บตาม SHA-256
+(uploads/contracts/<2 ตัวแรก>/<sha256>) และอัปเดต sites."contractFilePath"
+ไฟล์เดิมถูกลบโดยงาน contract_file_gc หลังย้ายแล้ว
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+from app.core.file_store import write_object, content_hash
+
+
+async def run_migration():
+    """Rehash legacy contract files"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V22: Content-addressed contract files...")
+
+        result = await conn.execute(text("""
+            SELECT id, "contractFilePath" FROM sites WHERE "contractFilePath" IS NOT NULL
+        """))
+        moved = missing = 0
+        for site_id, path in result.all():
+            if content_hash(path):
+                continue
+            if not os.path.exists(path):
+                missing += 1
+                continue
+            with open(path, "rb") as source:
+                stored = write_object(source)
+            await conn.execute(
+                text("""UPDATE sites SET "contractFilePath" = :path WHERE id = :id"""),
+                {"path": stored.path, "id": site_id}
+            )
+            moved += 1
+        print(f"✅ Moved {moved} contract files ({missing} missing)")
+
+    print("✅ Migration V22 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -0,0 +1,45 @@
+"""
+Migration V23: Data quality scan watermark
+เปลี่ยน data_quality_scans."changeLogId" (change_log.id) เป็น "watermark" (xmin ของ snapshot
+เทียบกับ change_log.txid เหมือน /api/sync) - id เรียงตามลำดับที่จอง ไม่ใช่ลำดับที่ commit
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Rename changeLogId -> watermark"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V23: Data quality scan watermark...")
+
+        columns = set((await conn.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'data_quality_scans'
+        """))).scalars().all())
+        if "watermark" in columns:
+            print("⏭️  Column watermark already exists")
+        else:
+            await conn.execute(text("""
+                ALTER TABLE data_quality_scans RENAME COLUMN "changeLogId" TO watermark
+            """))
+            # แปลง id เป็น txid: การเปลี่ยนแปลงแรกที่ยังไม่ถูกสแกน (ไม่มี = xmin ปัจจุบัน)
+            await conn.execute(text("""
+                UPDATE data_quality_scans s SET watermark = COALESCE(
+                    (SELECT min(txid) FROM change_log WHERE id > s.watermark),
+                    pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+                )
+            """))
+            print("✅ Renamed changeLogId -> watermark")
+
+    print("✅ Migration V23 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
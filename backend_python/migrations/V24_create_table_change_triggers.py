@@ -0,0 +1,31 @@
+"""
+Migration V24: Table change notifications
+ติดตั้ง trigger ระดับ statement ที่ส่ง NOTIFY table_changes เมื่อ sites / schedule_guards
+ถูกเขียน (ใช้ invalidate cache ของ GET /api/reports/coverage แทนการนับแถวทุกครั้ง)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+from app.models.change_log import table_change_ddl
+
+
+async def run_migration():
+    """Install notify_table_change triggers"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V24: Table change notifications...")
+
+        for statement in table_change_ddl():
+            await conn.execute(text(statement))
+        print("✅ Installed table change triggers")
+
+    print("✅ Migration V24 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
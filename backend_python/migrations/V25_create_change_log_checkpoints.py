@@ -0,0 +1,36 @@
+"""
+Migration V25: Change log retention
+สร้างตาราง change_log_checkpoints ที่งาน change_log_retention (app.core.change_log)
+ใช้หา txid ของ N วันก่อน และบันทึก horizon ที่แถว change_log ก่อนหน้าถูกลบแล้ว
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Create change_log_checkpoints table"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V25: Change log retention...")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS change_log_checkpoints (
+                id BIGSERIAL PRIMARY KEY,
+                txid BIGINT NOT NULL,
+                pruned BOOLEAN NOT NULL DEFAULT FALSE,
+                "createdAt" TIMESTAMPTZ DEFAULT NOW()
+            )
+        """))
+        print("✅ Created change_log_checkpoints table")
+
+    print("✅ Migration V25 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
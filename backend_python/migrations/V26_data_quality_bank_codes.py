@@ -0,0 +1,31 @@
+"""
+Migration V26: Data quality scan bank codes
+เพิ่ม data_quality_scans."bankCodes" - รหัสธนาคารที่ใช้ตรวจในการสแกนแต่ละครั้ง
+(ตาราง banks ไม่อยู่ใน change_log การสแกนแบบ incremental จึงเทียบค่านี้เพื่อตรวจกฎธนาคารใหม่ทุกแถว)
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Add bankCodes to data_quality_scans"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V26: Data quality scan bank codes...")
+
+        await conn.execute(text("""
+            ALTER TABLE data_quality_scans ADD COLUMN IF NOT EXISTS "bankCodes" TEXT
+        """))
+        print("✅ Added bankCodes column")
+
+    print("✅ Migration V26 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -0,0 +1,37 @@
+"""
+Migration V27: Consistency checker cursors
+สร้างตาราง consistency_cursors - ตำแหน่งที่ตัวตรวจชื่อที่คัดลอกไว้ (app.core.denormalized)
+ตรวจถึง ใช้ร่วมกันทุก worker แทนการเก็บในหน่วยความจำของแต่ละ worker
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+
+async def run_migration():
+    """Create consistency_cursors table"""
+    async with engine.begin() as conn:
+        print("🚀 Starting migration V27: Consistency checker cursors...")
+
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS consistency_cursors (
+                name VARCHAR(100) PRIMARY KEY,
+                "lastId" BIGINT NOT NULL DEFAULT 0,
+                repaired BIGINT NOT NULL DEFAULT 0,
+                sweeps INTEGER NOT NULL DEFAULT 0,
+                "checkedAt" TIMESTAMPTZ
+            )
+        """))
+        print("✅ Created consistency_cursors table")
+
+    print("✅ Migration V27 completed successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
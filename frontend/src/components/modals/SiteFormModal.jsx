@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { PlusCircle, Trash2, Clock, GripVertical, Upload, Download, FileText, X, Eye } from 'lucide-react';
 import api from '../../config/api';
+import { fetchReferenceData } from '../../hooks/useReferenceData';
 import { DndContext, closestCenter, KeyboardSensor, PointerSensor, useSensor, useSensors } from '@dnd-kit/core';
 import { arrayMove, SortableContext, sortableKeyboardCoordinates, useSortable, verticalListSortingStrategy } from '@dnd-kit/sortable';
 import { CSS } from '@dnd-kit/utilities';
@@ -200,13 +201,10 @@ export default function SiteFormModal({ isOpen, onClose, site, onSave, customers
     useEffect(() => {
         const fetchData = async () => {
             try {
-                // Fetch services and shifts in parallel
-                const [servicesRes, shiftsRes] = await Promise.all([
-                    api.get('/services'),
-                    api.get('/shifts')
-                ]);
-                setServices(servicesRes.data);
-                setShifts(shiftsRes.data.filter(s => s.isActive));
+                // services และ shifts จาก reference cache (รับเฉพาะตารางที่เปลี่ยน)
+                const tables = await fetchReferenceData();
+                setServices(tables.services || []);
+                setShifts((tables.shifts || []).filter(s => s.isActive));
                 
                 // ตรวจสอบว่ากะไหนมีคนจัดแล้ว (เฉพาะตอนแก้ไข)
                 if (site?.id) {
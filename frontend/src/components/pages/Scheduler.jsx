@@ -3,6 +3,7 @@ import api from '../../config/api'; // เรียกใช้ API Config
 import { Search, X, GripVertical, Trash2 } from 'lucide-react';
 import { FullPageLoading } from '../common/LoadingSpinner';
 import { useToast } from '../../hooks/useToast';
+import { useScheduleEvents } from '../../hooks/useScheduleEvents';
 
 export default function Scheduler() {
     const toast = useToast();
@@ -56,16 +57,24 @@ export default function Scheduler() {
             const firstDay = new Date(year, month, 1);
             const lastDay = new Date(year, month + 1, 0);
             
-            const response = await api.get('/schedules', {
-                params: {
-                    start_date: firstDay.toISOString().split('T')[0],
-                    end_date: lastDay.toISOString().split('T')[0]
-                }
-            });
+            // โหลดทีละหน้า (keyset cursor จาก header X-Next-Cursor)
+            const rows = [];
+            let cursor = null;
+            do {
+                const response = await api.get('/schedules', {
+                    params: {
+                        start_date: firstDay.toISOString().split('T')[0],
+                        end_date: lastDay.toISOString().split('T')[0],
+                        ...(cursor ? { cursor } : {})
+                    }
+                });
+                rows.push(...response.data);
+                cursor = response.headers['x-next-cursor'];
+            } while (cursor);
             
             // แปลง array เป็น object grouped by date
             const schedulesByDate = {};
-            response.data.forEach(s => {
+            rows.forEach(s => {
                 const dateKey = s.scheduleDate;
                 if (!schedulesByDate[dateKey]) {
                     schedulesByDate[dateKey] = {};
@@ -74,7 +83,8 @@ export default function Scheduler() {
                     scheduleId: s.id,
                     siteId: s.siteId,
                     siteName: s.siteName,
-                    totalGuards: s.totalGuards
+                    totalGuards: s.totalGuards,
+                    version: s.version
                 };
             });
             
@@ -91,7 +101,8 @@ export default function Scheduler() {
             try {
                 const [sitesRes, guardsRes] = await Promise.all([
                     api.get('/sites'),
-                    api.get('/guards')
+                    // ใช้เฉพาะฟิลด์ที่ตัวเลือกพนักงานต้องการ
+                    api.get('/guards', { params: { fields: 'id,guardId,title,firstName,lastName,isActive' } })
                 ]);
                 setAllSites(sitesRes.data);
 
@@ -112,6 +123,55 @@ export default function Scheduler() {
         fetchData();
     }, [currentDate.getMonth(), currentDate.getFullYear()]);
 
+    // Live updates จาก dispatcher คนอื่น - โหลดเฉพาะช่องที่เปลี่ยน
+    const monthStart = new Date(currentDate.getFullYear(), currentDate.getMonth(), 1).toISOString().split('T')[0];
+    const monthEnd = new Date(currentDate.getFullYear(), currentDate.getMonth() + 1, 0).toISOString().split('T')[0];
+
+    useScheduleEvents({
+        from: monthStart,
+        to: monthEnd,
+        onEvent: async (event) => {
+            if (event.type === 'resync') {
+                await fetchMonthSchedules(currentDate);
+                return;
+            }
+
+            const dateKey = event.scheduleDate;
+            const siteKey = String(event.siteId);
+            const current = schedule[dateKey]?.[siteKey];
+            if (current?.scheduleId === event.scheduleId && current.version >= event.version) return;
+
+            if (event.type === 'deleted') {
+                setSchedule(prev => {
+                    const { [siteKey]: _removed, ...rest } = prev[dateKey] || {};
+                    return { ...prev, [dateKey]: rest };
+                });
+                return;
+            }
+
+            try {
+                const { data } = await api.get(`/schedules/${event.scheduleId}`);
+                setSchedule(prev => ({
+                    ...prev,
+                    [dateKey]: {
+                        ...(prev[dateKey] || {}),
+                        [siteKey]: {
+                            ...(prev[dateKey]?.[siteKey] || {}),
+                            scheduleId: data.id,
+                            siteId: data.siteId,
+                            siteName: data.siteName,
+                            totalGuards: data.totalGuards,
+                            shifts: data.shifts,
+                            version: data.version
+                        }
+                    }
+                }));
+            } catch (error) {
+                console.error('Error refreshing schedule:', error);
+            }
+        }
+    });
+
     const handleDateClick = async (day) => {
         const date = new Date(currentDate.getFullYear(), currentDate.getMonth(), day);
         setSelectedDate(date);
@@ -0,0 +1,58 @@
+// frontend/src/hooks/useReferenceData.js
+import { useState, useEffect } from 'react';
+import api from '../config/api';
+
+/**
+ * Reference data (banks, shifts, products, services, roles, companyPrefixes)
+ * เก็บไว้ใน memory ร่วมกันทุก component - โหลดครั้งแรกทั้งหมด ครั้งต่อไปส่ง version
+ * ของแต่ละตาราง (versions=banks:5,shifts:6) เพื่อรับเฉพาะตารางที่เปลี่ยน
+ */
+const store = { versions: null, tables: {} };
+let pending = null;
+
+export const fetchReferenceData = () => {
+    if (!pending) {
+        const params = store.versions !== null
+            ? { versions: Object.entries(store.versions).map(([table, version]) => `${table}:${version}`).join(',') }
+            : {};
+        pending = api.get('/reference', { params })
+            .then((response) => {
+                store.versions = response.data.versions;
+                store.tables = { ...store.tables, ...response.data.tables };
+                return store.tables;
+            })
+            .finally(() => {
+                pending = null;
+            });
+    }
+    return pending;
+};
+
+export const useReferenceData = (table) => {
+    const [data, setData] = useState(store.tables[table] || []);
+    const [loading, setLoading] = useState(!store.tables[table]);
+    const [error, setError] = useState(null);
+
+    useEffect(() => {
+        let active = true;
+        fetchReferenceData()
+            .then((tables) => {
+                if (active) {
+                    setData(tables[table] || []);
+                    setError(null);
+                }
+            })
+            .catch((err) => {
+                console.error(`Error fetching reference data (${table}):`, err);
+                if (active) setError(err);
+            })
+            .finally(() => {
+                if (active) setLoading(false);
+            });
+        return () => {
+            active = false;
+        };
+    }, [table]);
+
+    return { data, loading, error };
+};
@@ -0,0 +1,84 @@
+// frontend/src/hooks/useScheduleEvents.js
+import { useEffect, useRef } from 'react';
+import api from '../config/api';
+
+const RECONNECT_DELAY = 3000;
+
+/**
+ * Live schedule change feed (Server-Sent Events)
+ * ใช้ fetch แทน EventSource เพื่อส่ง Authorization header ได้
+ *
+ * onEvent({ type, scheduleId, siteId, scheduleDate, version })
+ * type: created / updated / deleted / resync
+ */
+export const useScheduleEvents = ({ from, to, siteIds, onEvent }) => {
+    const onEventRef = useRef(onEvent);
+    onEventRef.current = onEvent;
+
+    const siteKey = siteIds ? siteIds.join(',') : '';
+
+    useEffect(() => {
+        const controller = new AbortController();
+        let reconnectTimer = null;
+        let connectedOnce = false;
+
+        const connect = async () => {
+            const params = new URLSearchParams();
+            if (from) params.set('from', from);
+            if (to) params.set('to', to);
+            if (siteKey) params.set('siteIds', siteKey);
+
+            try {
+                const response = await fetch(`${api.defaults.baseURL}/schedules/events?${params}`, {
+                    headers: {
+                        Authorization: `Bearer ${localStorage.getItem('token')}`,
+                        Accept: 'text/event-stream'
+                    },
+                    signal: controller.signal
+                });
+                if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+                // เชื่อมต่อใหม่หลังหลุด - อาจพลาดเหตุการณ์ระหว่างนั้น
+                if (connectedOnce) onEventRef.current?.({ type: 'resync' });
+                connectedOnce = true;
+
+                const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += value;
+                    const messages = buffer.split('\n\n');
+                    buffer = messages.pop();
+                    messages.forEach(message => {
+                        const data = message
+                            .split('\n')
+                            .filter(line => line.startsWith('data:'))
+                            .map(line => line.slice(5).trim())
+                            .join('\n');
+                        if (!data) return;
+                        try {
+                            onEventRef.current?.(JSON.parse(data));
+                        } catch (err) {
+                            console.error('Invalid schedule event:', err);
+                        }
+                    });
+                }
+            } catch (err) {
+                if (controller.signal.aborted) return;
+                console.error('Schedule event stream error:', err);
+            }
+
+            if (!controller.signal.aborted) {
+                reconnectTimer = setTimeout(connect, RECONNECT_DELAY);
+            }
+        };
+
+        connect();
+
+        return () => {
+            controller.abort();
+            clearTimeout(reconnectTimer);
+        };
+    }, [from, to, siteKey]);
+};